@@ -1,3 +1,4 @@
 from django.contrib import admin
+from commons.models import ImportUpload
 
-# Register your models here.
+admin.site.register(ImportUpload)
@@ -0,0 +1,105 @@
+import hashlib
+import uuid
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+
+
+def data_version_key(model):
+    return f'data_version:{model._meta.label_lower}'
+
+
+def bump_data_version(model):
+    # a fresh token instead of a counter, so an evicted version can never come back with an old value
+    cache.set(data_version_key(model), uuid.uuid4().hex, None)
+
+
+def flush_data_version_bumps():
+    models = getattr(connection, 'pending_data_version_bumps', None)
+    if not models:
+        return
+    del connection.pending_data_version_bumps
+
+    for model in models:
+        bump_data_version(model)
+
+
+def bump_data_version_on_commit(*models):
+    # bumping before the commit would let another process cache a count of the old rows under the new version.
+    # collected per connection like transacts.rollups, so rows written one by one bump their model once
+    pending = getattr(connection, 'pending_data_version_bumps', None)
+    if pending is None:
+        pending = connection.pending_data_version_bumps = set()
+    pending.update(models)
+
+    # registered on every call, the callbacks of a savepoint that rolls back are dropped
+    transaction.on_commit(flush_data_version_bumps)
+
+
+def get_data_versions(models):
+    keys = {data_version_key(model): model for model in models}
+    versions = cache.get_many(keys.keys())
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in sorted(keys)]
+
+
+def get_data_version(model):
+    return get_data_versions([model])[0]
+
+
+def models_in_sql(sql):
+    return [
+        model for model in apps.get_models(include_auto_created=True)
+        if f'"{model._meta.db_table}"' in sql
+    ]
+
+
+def cached_count(queryset):
+    """
+    COUNT(*) of the queryset, cached per normalized query and invalidated whenever
+    any table the query touches gets a new data version (see commons.signals).
+    """
+    try:
+        sql = str(queryset.order_by().query)
+    except EmptyResultSet:
+        return 0
+
+    versions = get_data_versions(models_in_sql(sql))
+    digest = hashlib.sha1(
+        '|'.join([sql, *versions]).encode()).hexdigest()
+    key = f'count:{queryset.model._meta.label_lower}:{digest}'
+
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+
+    return count
+
+
+def table_count(model):
+    """
+    Row count of the whole table for DataTables recordsTotal.
+    Large tables use the planner estimate from pg_class instead of a full COUNT(*).
+    A partitioned table has no estimate of its own, so its partitions' are summed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN c.relkind = 'p' THEN ("
+            "    SELECT COALESCE(SUM(GREATEST(p.reltuples, 0)), 0)::bigint FROM pg_inherits i"
+            "    JOIN pg_class p ON p.oid = i.inhrelid WHERE i.inhparent = c.oid"
+            ") ELSE c.reltuples::bigint END FROM pg_class c WHERE c.oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+
+    estimate = row[0] if row else -1
+    if estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+        return estimate
+
+    return cached_count(model.objects.all())
@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.conf import settings
+from openpyxl import Workbook
+from commons.progress import progress_meta
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_DIR = 'exports'
+# rows per arrow record batch, and so per parquet row group
+EXPORT_BATCH_SIZE = 50000
+# export format -> file extension. parquet and arrow are the columnar formats, arrow being an IPC stream
+EXPORT_FORMATS = {
+    'xlsx': 'xlsx',
+    'parquet': 'parquet',
+    'arrow': 'arrows',
+}
+
+
+def export_file_path(filename):
+    # finished exports live under MEDIA_ROOT so nginx serves the download, not a web worker
+    directory = os.path.join(settings.MEDIA_ROOT, EXPORT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def export_file_url(filename):
+    return f'{settings.MEDIA_URL}{EXPORT_DIR}/{filename}'
+
+
+def export_task_progress(task, total):
+    # progress callback for export_queryset_to_xlsx that reports through the celery task state
+    started = time.monotonic()
+
+    def progress(rows):
+        task.update_state(state='PROGRESS', meta=progress_meta(rows, total, started))
+
+    return progress
+
+
+def get_export_format(params):
+    # export format of the request, xlsx unless asked otherwise. None when it is not one of EXPORT_FORMATS
+    export_format = params.get('format') or 'xlsx'
+    return export_format if export_format in EXPORT_FORMATS else None
+
+
+def export_stats(file_path, rows, started):
+    seconds = time.monotonic() - started
+    stats = {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(rows / seconds, 1) if seconds else rows,
+    }
+    logger.info(
+        f"Exported {rows} rows to {file_path} in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec)")
+
+    return stats
+
+
+def export_queryset_to_xlsx(file_path, headers, queryset, to_row, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Stream the queryset into a write-only workbook, chunk_size rows per database fetch.
+    Neither the rows nor the sheet are held in memory, so peak memory stays flat regardless of row count.
+    to_row maps one object to a list of cell values in the same order as headers.
+    progress, if given, is called with the number of rows written after every chunk.
+    """
+    started = time.monotonic()
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(headers)
+
+    rows = 0
+    if progress:
+        progress(rows)
+
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        ws.append(to_row(obj))
+        rows += 1
+
+        if progress and rows % chunk_size == 0:
+            progress(rows)
+
+    wb.save(file_path)
+
+    return export_stats(file_path, rows, started)
+
+
+def export_queryset_to_arrow(file_path, schema, queryset, to_record, export_format='parquet',
+                             chunk_size=EXPORT_CHUNK_SIZE, batch_size=EXPORT_BATCH_SIZE, progress=None):
+    """
+    Stream the queryset into a Parquet file or an Arrow IPC stream, one record batch per batch_size rows.
+    to_record maps one object to a list of values in the order and types of the schema's fields,
+    e.g. date for pa.date32() and Decimal for pa.decimal128(), so readers get typed columns instead of text.
+    Only one batch is held in memory at a time. progress works as in export_queryset_to_xlsx.
+    """
+    started = time.monotonic()
+
+    if export_format == 'parquet':
+        writer = pq.ParquetWriter(file_path, schema)
+    elif export_format == 'arrow':
+        writer = pa.ipc.new_stream(file_path, schema)
+    else:
+        raise ValueError(f"Unknown columnar export format {export_format}")
+
+    def write(records):
+        columns = zip(*records)
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+
+    rows = 0
+    if progress:
+        progress(rows)
+
+    with writer:
+        records = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            records.append(to_record(obj))
+            rows += 1
+
+            if len(records) >= batch_size:
+                write(records)
+                records = []
+
+            if progress and rows % chunk_size == 0:
+                progress(rows)
+
+        if records:
+            write(records)
+
+    return export_stats(file_path, rows, started)
+
+
+def export_queryset(file_path, export_format, headers, schema, queryset, to_row, to_record, progress=None):
+    # xlsx through to_row and headers, the columnar formats through to_record and schema
+    if export_format == 'xlsx':
+        return export_queryset_to_xlsx(file_path, headers, queryset, to_row, progress=progress)
+
+    return export_queryset_to_arrow(file_path, schema, queryset, to_record, export_format, progress=progress)
@@ -0,0 +1,150 @@
+import time
+import pandas as pd
+from django.core.management.base import CommandError
+from django.db import transaction
+from openpyxl import load_workbook
+from commons.metrics import task_phase
+from commons.progress import progress_meta
+from commons.validation import FIRST_SHEET_ROW
+
+
+# rows per chunk the imports validate and write at a time
+IMPORT_CHUNK_SIZE = 5000
+
+
+def read_xlsx_chunks(file_path, chunk_size, dtype=None):
+    # rows of the first sheet streamed by openpyxl in read only mode, empty rows skipped
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        columns = [f'Unnamed: {i}' if column is None else column for i, column in enumerate(header)]
+        width = len(columns)
+
+        records, positions = [], []
+        # the index is the row position after the header, as pd.read_excel numbers them
+        for position, row in enumerate(rows):
+            if all(value is None for value in row):
+                continue
+            records.append((tuple(sheet_cell(value) for value in row) + (None,) * width)[:width])
+            positions.append(position)
+
+            if len(records) == chunk_size:
+                yield sheet_frame(records, columns, positions, dtype)
+                records, positions = [], []
+
+        if records:
+            yield sheet_frame(records, columns, positions, dtype)
+    finally:
+        wb.close()
+
+
+def sheet_cell(value):
+    # whole floats read as int, as pd.read_excel does
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def sheet_frame(records, columns, positions, dtype):
+    if dtype is str:
+        # like pd.read_excel(dtype=str) the cells are converted one by one, so a date keeps its time, blanks stay missing
+        records = [tuple(None if value is None else str(value) for value in record) for record in records]
+        return pd.DataFrame.from_records(records, columns=columns, index=positions).astype(object)
+    return pd.DataFrame.from_records(records, columns=columns, index=positions)
+
+
+def read_sheet_chunks(file_path, chunk_size=IMPORT_CHUNK_SIZE, dtype=None, metrics=None):
+    """
+    DataFrames of at most chunk_size rows of an import file, so memory stays at one chunk whatever the file size
+    and the first rows can be validated and written while the rest is still unread.
+    .xlsx is streamed with openpyxl in read only mode, .csv with the pandas C engine in chunks.
+    Other files are read whole by pd.read_excel and then sliced.
+    Every chunk is indexed by row position after the header, sheet row = index + 2, see commons.validation.
+    metrics, a commons.metrics.TaskMetrics, gets the time spent reading as its read phase.
+    """
+    name = str(file_path).lower()
+    if name.endswith('.csv'):
+        chunks = pd.read_csv(file_path, chunksize=chunk_size, dtype=dtype)
+    elif name.endswith(('.xlsx', '.xlsm')):
+        chunks = read_xlsx_chunks(file_path, chunk_size, dtype)
+    else:
+        df = pd.read_excel(file_path, dtype=dtype)
+        chunks = (df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size))
+
+    while True:
+        with task_phase(metrics, 'read'):
+            df = next(chunks, None)
+        if df is None:
+            return
+        yield df
+
+
+def estimate_sheet_rows(file_path):
+    # rows after the header without reading the sheet: the xlsx dimension or the csv line count. None if unknown
+    name = str(file_path).lower()
+    if name.endswith('.csv'):
+        with open(file_path, 'rb') as f:
+            lines = 0
+            last = b'\n'
+            for block in iter(lambda: f.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+        # quoted line breaks count too, it is an estimate
+        return max(lines + (last != b'\n') - 1, 0)
+
+    if name.endswith(('.xlsx', '.xlsm')):
+        wb = load_workbook(file_path, read_only=True)
+        try:
+            max_row = wb.worksheets[0].max_row
+        finally:
+            wb.close()
+        return max(max_row - 1, 0) if max_row else None
+
+    return None
+
+
+def import_task_progress(task, file_path):
+    """
+    progress callback for import_sheet that reports through the celery task state: rows read so far, the rows
+    of them checked and written (saved when the whole sheet commits), the estimated total and an ETA.
+    """
+    total = estimate_sheet_rows(file_path)
+    started = time.monotonic()
+
+    def progress(rows, rows_read):
+        task.update_state(state='PROGRESS', meta=progress_meta(rows, total, started, rows_read=rows_read))
+
+    return progress
+
+
+def import_sheet(file_path, import_chunk, chunk_size=IMPORT_CHUNK_SIZE, dtype=None, metrics=None, progress=None):
+    """
+    Run import_chunk(df), e.g. insert_excel_items, on every chunk of the file as it is read, all in one transaction,
+    so the sheet is still saved whole or not at all: a chunk that fails its checks rolls back the chunks before it.
+    Later chunks are checked against the rows the earlier ones wrote, which catches duplicates across chunks.
+    An import_chunk returning False fails the import too. Returns the rows read and the result of every chunk.
+    progress, if given, is called with the rows done and the rows read before and after every chunk.
+    """
+    rows = 0
+    results = []
+
+    with transaction.atomic():
+        for df in read_sheet_chunks(file_path, chunk_size, dtype, metrics):
+            if progress:
+                progress(rows, rows + len(df))
+
+            result = import_chunk(df)
+            if result is False:
+                raise CommandError(
+                    f"The import failed on sheet rows {df.index[0] + FIRST_SHEET_ROW}-{df.index[-1] + FIRST_SHEET_ROW}, nothing was saved.")
+
+            rows += len(df)
+            results.append(result)
+            if progress:
+                progress(rows, rows)
+
+    return rows, results
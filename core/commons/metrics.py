@@ -0,0 +1,136 @@
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from django.conf import settings
+from django.db import connection
+from prometheus_client import Counter, Gauge, Histogram
+from commons.queries import QueryCounter
+
+
+logger = logging.getLogger(__name__)
+
+# labelled by url name (app:name), never by path, so ids in urls cannot blow up the series count
+VIEW_LATENCY = Histogram(
+    'tsmb_view_latency_seconds', 'Time to produce the response, by view.',
+    ['view', 'method', 'status'])
+VIEW_QUERIES = Histogram(
+    'tsmb_view_queries', 'SQL statements run per request, by view.',
+    ['view'], buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float('inf')))
+VIEW_SQL_SECONDS = Histogram(
+    'tsmb_view_sql_seconds', 'Time spent in SQL per request, by view.',
+    ['view'])
+VIEW_QUERY_BUDGET_EXCEEDED = Counter(
+    'tsmb_view_query_budget_exceeded', 'Requests that ran more SQL statements than their view budget.',
+    ['view'])
+
+# celery imports and exports, by task and phase (read, verify, resolve, write, ...). see TaskMetrics
+TASK_PHASE_SECONDS = Histogram(
+    'tsmb_task_phase_seconds', 'Time spent in each phase of a celery task run.',
+    ['task', 'phase'], buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, float('inf')))
+TASK_SECONDS = Histogram(
+    'tsmb_task_seconds', 'Time of a whole celery task run.',
+    ['task'], buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, float('inf')))
+TASK_ROWS = Counter(
+    'tsmb_task_rows', 'Rows processed by celery tasks.',
+    ['task'])
+TASK_ROWS_PER_SECOND = Gauge(
+    'tsmb_task_rows_per_second', 'Rows per second of the last run of a celery task.',
+    ['task'], multiprocess_mode='mostrecent')
+
+
+def get_view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def get_query_budget(view):
+    # QUERY_BUDGETS maps url names to the most statements one request should need, QUERY_BUDGET_DEFAULT the rest
+    return settings.QUERY_BUDGETS.get(view, settings.QUERY_BUDGET_DEFAULT)
+
+
+class QueryMetricsMiddleware:
+    """
+    Records latency, SQL statement count and SQL time of every request per view, for the /metrics endpoint.
+    A request over its view's query budget logs a warning, which is how an N+1 shows up.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        started = time.monotonic()
+
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+
+        seconds = time.monotonic() - started
+        view = get_view_name(request)
+
+        VIEW_LATENCY.labels(view, request.method, response.status_code).observe(seconds)
+        VIEW_QUERIES.labels(view).observe(counter.count)
+        VIEW_SQL_SECONDS.labels(view).observe(counter.seconds)
+
+        budget = get_query_budget(view)
+        if budget is not None and counter.count > budget:
+            VIEW_QUERY_BUDGET_EXCEEDED.labels(view).inc()
+            logger.warning(
+                f"{view} ran {counter.count} SQL statements, over its budget of {budget} ({request.method} {request.get_full_path()[:200]})")
+
+        return response
+
+
+class TaskMetrics:
+    """
+    Phase timings and row throughput of one celery task run, e.g.
+
+        metrics = TaskMetrics('import_items')
+        with metrics.phase('read'):
+            df = pd.read_excel(file_path)
+        ...
+        return metrics.finish(len(df))
+
+    A phase entered more than once adds up. finish() records the run in the tsmb_task_* metrics
+    and returns the figures for the task result, so a failed run is only logged, not measured.
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.phases = {}
+        self.started = time.monotonic()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + time.monotonic() - started
+
+    def finish(self, rows):
+        seconds = time.monotonic() - self.started
+        rows_per_sec = round(rows / seconds, 1) if seconds else rows
+
+        for name, phase_seconds in self.phases.items():
+            TASK_PHASE_SECONDS.labels(self.task, name).observe(phase_seconds)
+        TASK_SECONDS.labels(self.task).observe(seconds)
+        TASK_ROWS.labels(self.task).inc(rows)
+        TASK_ROWS_PER_SECOND.labels(self.task).set(rows_per_sec)
+
+        stats = {
+            'rows': rows,
+            'seconds': round(seconds, 3),
+            'rows_per_sec': rows_per_sec,
+            'phases': {name: round(phase_seconds, 3) for name, phase_seconds in self.phases.items()},
+        }
+        logger.info(
+            f"{self.task} processed {rows} rows in {stats['seconds']}s ({rows_per_sec} rows/sec) {stats['phases']}")
+
+        return stats
+
+
+def task_phase(metrics, name):
+    # metrics.phase(name), or nothing when the caller (a management command) is not measuring
+    return metrics.phase(name) if metrics else nullcontext()
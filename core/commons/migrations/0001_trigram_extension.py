@@ -0,0 +1,15 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        # gin_trgm_ops for the search indexes of the other apps
+        TrigramExtension(),
+    ]
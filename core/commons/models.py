@@ -1,3 +1,33 @@
+from django.contrib.auth.models import User
 from django.db import models
 
-# Create your models here.
+
+class ImportUpload(models.Model):
+    """
+    Registry of uploaded import files by content hash, see commons.uploads.start_import.
+    One row per file content and kind of import (e.g. items.INSERT), holding the last task started for it
+    and its outcome, so the same file uploaded again reuses the task instead of importing it twice.
+    """
+    sha256 = models.CharField(max_length=64)
+    kind = models.CharField(max_length=50)
+    # name of the last upload, the file itself is stored as uploads/<sha256><extension>
+    file_name = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True)
+    task_id = models.CharField(max_length=255, db_index=True)
+    # PENDING, STARTED, SUCCESS or FAILURE, written by the celery signals of commons.signals
+    status = models.CharField(max_length=50, default='PENDING')
+    # what the task returned, or the error message of a failed one
+    result = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sha256', 'kind'], name='unique_importupload_sha256_kind')
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.file_name} ({self.status})'
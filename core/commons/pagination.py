@@ -0,0 +1,94 @@
+import datetime
+from decimal import Decimal
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+
+
+CURSOR_SALT = 'commons.pagination.keyset'
+
+
+def encode_cursor(order_field, order_direction, value, pk):
+    """
+    Opaque, signed cursor pointing right after the (value, pk) row of the given ordering.
+    """
+    if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+        value = value.isoformat()
+    elif isinstance(value, Decimal):
+        value = str(value)
+
+    return signing.dumps([order_field, order_direction, value, pk], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    try:
+        return signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def is_nullable(model, order_field):
+    # only local columns can be told apart, a field across a relation or an annotation may be NULL
+    try:
+        return model._meta.get_field(order_field).null
+    except FieldDoesNotExist:
+        return True
+
+
+def seek_filter(order_field, order_direction, value, pk, nullable=True):
+    # rows after (value, pk) when ordering by order_field with nulls last, then by id
+    after = 'lt' if order_direction == 'desc' else 'gt'
+
+    if not nullable:
+        return Q(**{f'{order_field}__{after}': value}) | Q(**{order_field: value, f'id__{after}': pk})
+
+    if value is None:
+        return Q(**{f'{order_field}__isnull': True, f'id__{after}': pk})
+
+    return (
+        Q(**{f'{order_field}__{after}': value}) |
+        Q(**{order_field: value, f'id__{after}': pk}) |
+        Q(**{f'{order_field}__isnull': True})
+    )
+
+
+def keyset_paginate(queryset, order_field, order_direction, length, cursor=None):
+    """
+    Seek (keyset) pagination for the DataTables endpoints.
+    Rows are ordered by order_field then id, and a page starts right after the row the cursor points to
+    instead of OFFSET-scanning the rows before it, so deep pages cost the same as page one.
+    order_field should already be whitelisted by the caller.
+    Returns the page rows and the cursor of the next page, None if it is the last page.
+    """
+    queryset = queryset.annotate(keyset_value=F(order_field))
+    nullable = is_nullable(queryset.model, order_field)
+
+    if not nullable:
+        # NOT NULL columns order without NULLS LAST, so an index on (order_field, id) serves both directions
+        if order_direction == 'desc':
+            queryset = queryset.order_by(f'-{order_field}', '-id')
+        else:
+            queryset = queryset.order_by(order_field, 'id')
+    elif order_direction == 'desc':
+        queryset = queryset.order_by(
+            F(order_field).desc(nulls_last=True), '-id')
+    else:
+        queryset = queryset.order_by(
+            F(order_field).asc(nulls_last=True), 'id')
+
+    # a cursor from a different sorting is stale, start from the first page
+    position = decode_cursor(cursor) if cursor else None
+    if position and position[:2] == [order_field, order_direction]:
+        queryset = queryset.filter(seek_filter(
+            order_field, order_direction, position[2], position[3], nullable))
+
+    rows = list(queryset[:length + 1])
+
+    next_cursor = None
+    if len(rows) > length:
+        rows = rows[:length]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            order_field, order_direction, last.keyset_value, last.pk)
+
+    return rows, next_cursor
@@ -0,0 +1,51 @@
+import time
+from celery import current_app
+from commons.uploads import get_import_outcome
+
+
+def progress_meta(rows, total, started, **extra):
+    """
+    PROGRESS state meta of a task that has done rows of about total (None when unknown) since started,
+    a time.monotonic(). rows_per_sec and eta_seconds are None until there is a rate to go by.
+    """
+    seconds = time.monotonic() - started
+    rate = rows / seconds if rows and seconds else None
+    remaining = max(total - rows, 0) if total else None
+
+    return {
+        'rows': rows,
+        'total': total,
+        'percent': round(min(rows / total, 1) * 100, 1) if total else None,
+        'elapsed_seconds': round(seconds, 1),
+        'rows_per_sec': round(rate, 1) if rate else None,
+        'eta_seconds': round(remaining / rate) if rate and remaining is not None else None,
+        **extra,
+    }
+
+
+def get_task_status(task_id):
+    """
+    Status of a celery task for the ajx_tasks_status views, read once from the result backend.
+    status is PENDING (unknown or not picked up yet), STARTED, PROGRESS, SUCCESS or FAILURE.
+    progress is the PROGRESS meta (see progress_meta), result the dict a finished task returned,
+    message the error of a failed one. A finished import whose result expired is answered from the upload registry.
+    """
+    meta = current_app.backend.get_task_meta(task_id)
+    if meta['status'] == 'PENDING':
+        # the backend forgets results after CELERY_RESULT_EXPIRES, the import upload registry keeps the outcome
+        meta = {**meta, **(get_import_outcome(task_id) or {})}
+    status = meta['status']
+    result = meta.get('result')
+    date_done = meta.get('date_done')
+    # the registry keeps the error of a failed import as {'message': ...}
+    error = result.get('message') if isinstance(result, dict) else result
+
+    return {
+        'status': status,
+        'task_id': task_id,
+        'task': meta.get('task_name') or meta.get('name'),
+        'message': str(error) if status == 'FAILURE' else '',
+        'progress': result if status == 'PROGRESS' and isinstance(result, dict) else None,
+        'result': result if status == 'SUCCESS' and isinstance(result, dict) else None,
+        'date_done': date_done.isoformat() if hasattr(date_done, 'isoformat') else date_done,
+    }
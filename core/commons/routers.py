@@ -0,0 +1,20 @@
+class TaskResultRouter:
+    # the django_celery_results models go through the celery_results connection, see settings.DATABASES
+    app_label = 'django_celery_results'
+    database = 'celery_results'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return self.database
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == self.app_label:
+            return self.database
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # one database, migrated through default only
+        if db == self.database:
+            return False
+        return None
@@ -0,0 +1,62 @@
+from celery.signals import task_prerun, task_postrun
+from django.apps import apps
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.utils import timezone
+from commons.counts import bump_data_version_on_commit
+from commons.models import ImportUpload
+from commons.uploads import finish_import
+
+
+# the tables cached counts, item searches and pivots read, see commons.counts.cached_count.
+# writes to anything else (sessions, task results, import uploads, ...) leave the cached data alone
+VERSIONED_MODELS = [
+    'items.Item', 'items.ItemUnit', 'items.ItemPriceAdjustment',
+    'transacts.TransactHeader', 'transacts.TransactDetail', 'transacts.TransactDailyRollup', 'transacts.TransactStatus',
+    'companies.Company', 'locations.Location',
+    'employees.Employee', 'employees.EmployeeStatus', 'employees.EmployeeJob', 'employees.EmployeeJobLevel',
+    'employees.EmployeeJobSpecialty', 'auth.User',
+]
+
+
+def bump_data_version_on_save(sender, update_fields=None, **kwargs):
+    # a login only stamps the user's last_login, no cached query reads it
+    if update_fields == {'last_login'}:
+        return
+    bump_data_version_on_commit(sender)
+
+
+def bump_data_version_on_delete(sender, **kwargs):
+    bump_data_version_on_commit(sender)
+
+
+def bump_data_version_on_m2m_change(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_data_version_on_commit(sender, instance.__class__)
+
+
+for label in VERSIONED_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(bump_data_version_on_save, sender=model)
+    post_delete.connect(bump_data_version_on_delete, sender=model)
+    for field in model._meta.local_many_to_many:
+        m2m_changed.connect(bump_data_version_on_m2m_change, sender=field.remote_field.through)
+
+
+# the import upload registry follows its tasks, see commons.uploads. the other tasks are left alone
+IMPORT_TASKS = [
+    'items.tasks.import_items_task',
+    'employees.tasks.import_employees_task',
+    'transacts.tasks.import_transacts_task',
+]
+
+
+@task_prerun.connect
+def mark_import_started(sender, task_id, **kwargs):
+    if sender.name in IMPORT_TASKS:
+        ImportUpload.objects.filter(task_id=task_id).update(status='STARTED', updated_at=timezone.now())
+
+
+@task_postrun.connect
+def mark_import_finished(sender, task_id, retval=None, state=None, **kwargs):
+    if sender.name in IMPORT_TASKS and state in ('SUCCESS', 'FAILURE'):
+        finish_import(task_id, state, retval)
@@ -0,0 +1,100 @@
+import datetime
+import hashlib
+import os
+import tempfile
+import uuid
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from commons.models import ImportUpload
+
+
+UPLOAD_DIR = 'uploads'
+
+
+def handle_uploaded_file(f):
+    """
+    Store an uploaded file under MEDIA_ROOT/uploads/<sha256><extension>, hashing it while it is written.
+    Files are named by their content, so two uploads of the same name never overwrite each other mid-import
+    and the same content is kept once. Returns the path and the sha256.
+    """
+    directory = os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR)
+    os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.part', delete=False) as destination:
+        for chunk in f.chunks():
+            digest.update(chunk)
+            destination.write(chunk)
+
+    sha256 = digest.hexdigest()
+    file_path = os.path.join(directory, sha256 + os.path.splitext(f.name)[1].lower())
+    if os.path.exists(file_path):
+        os.remove(destination.name)
+    else:
+        os.replace(destination.name, file_path)
+
+    return file_path, sha256
+
+
+def is_reusable(upload):
+    # a finished import, or one still queued or running that has not been at it for longer than IMPORT_TASK_STALE_AFTER.
+    # a failed one runs again, the data it failed on may have been fixed since
+    if upload.status == 'SUCCESS':
+        return True
+    if upload.status in ('PENDING', 'STARTED'):
+        return timezone.now() - upload.updated_at < datetime.timedelta(seconds=settings.IMPORT_TASK_STALE_AFTER)
+    return False
+
+
+def start_import(f, kind, start, user=None):
+    """
+    Store the upload and start its import, unless the same content was already imported as kind
+    (e.g. items.INSERT), in which case that task is returned and nothing runs again.
+    start(file_path, task_id) queues the task, e.g. import_items_task.apply_async((file_path, 'INSERT'), task_id=task_id).
+    It runs once the registry row commits, so the task always finds its row to record the outcome on.
+    Returns the ImportUpload and whether a new task was started.
+    """
+    file_path, sha256 = handle_uploaded_file(f)
+
+    with transaction.atomic():
+        upload, created = ImportUpload.objects.select_for_update().get_or_create(
+            sha256=sha256, kind=kind, defaults={'file_name': f.name, 'size': f.size, 'uploaded_by': user})
+        if not created and is_reusable(upload):
+            return upload, False
+
+        upload.file_name = f.name
+        upload.size = f.size
+        upload.uploaded_by = user
+        upload.task_id = str(uuid.uuid4())
+        upload.status = 'PENDING'
+        upload.result = None
+        upload.finished_at = None
+        upload.save()
+
+        def queue():
+            try:
+                start(file_path, upload.task_id)
+            except Exception as e:
+                # never queued, the next upload of the file must not wait on it
+                finish_import(upload.task_id, 'FAILURE', e)
+                raise
+
+        transaction.on_commit(queue)
+
+    return upload, True
+
+
+def finish_import(task_id, status, result):
+    # record the outcome of an import task on its registry row, if it has one
+    ImportUpload.objects.filter(task_id=task_id).update(
+        status=status,
+        result=result if isinstance(result, dict) else {'message': str(result)},
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def get_import_outcome(task_id):
+    # status and result the registry holds for a finished import task, None if it is not one
+    return ImportUpload.objects.filter(task_id=task_id, finished_at__isnull=False).values('status', 'result').first()
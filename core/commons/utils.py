@@ -1,43 +1,69 @@
 import pandas as pd
 import datetime
 from django.utils.regex_helper import _lazy_re_compile
-from django.db.models import Q
+from django.db import connection
 from django.core.management.base import CommandError
 
 
 date_re = _lazy_re_compile(
     r"(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})$")
 
+# values per existence query, each sent as one array parameter
+EXISTENCE_CHECK_CHUNK_SIZE = 10000
 
-def get_existing_names_case_insensitive(model, field_name, values):
+
+def get_existing_names_case_insensitive(model, field_name, values, chunk_size=EXISTENCE_CHECK_CHUNK_SIZE):
     """
     Perform a case-insensitive filter on the given model's field for the provided list of values.
     Returns a list of matching values that exist in the database.
+    The upper cased values go as one array per chunk, UPPER(field) = ANY(%s), an index scan of the
+    UPPER(field) btree every checked model has (see the models' Meta.indexes), however many values there are.
     """
-    query = Q()
-    for value in values:
-        query |= Q(**{f"{field_name}__iexact": value})
+    values = sorted({str(value).upper() for value in values})
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field_name).column)
 
-    return model.objects.filter(query).values_list(field_name, flat=True)
+    existing = []
+    with connection.cursor() as cursor:
+        for start in range(0, len(values), chunk_size):
+            cursor.execute(
+                f"SELECT {column} FROM {table} WHERE UPPER({column}) = ANY(%s)", [values[start:start + chunk_size]])
+            existing.extend(row[0] for row in cursor.fetchall())
 
+    return existing
 
-def should_be(mode, model, model_name, field_name, column_records):
-    records_results = get_existing_names_case_insensitive(
-        model, field_name, column_records)
+
+def get_should_be_violations(mode, model, field_name, column_records):
+    """
+    The values of column_records (upper cased sheet values) that break the should_be mode,
+    matched case insensitively against model.field_name. An empty set when there are none.
+    """
+    if not len(column_records):
+        return set()
+
+    existing = {name.upper() for name in get_existing_names_case_insensitive(
+        model, field_name, column_records)}
 
     if mode.upper() == 'NOT EXISTING':
         # eg. use for checking if values are already existing so we can safely insert new records
-        if records_results:
-            raise CommandError(f"The following {model_name}.{field_name} values already exist: {
-                               ', '.join(records_results)}")
+        return {value for value in column_records if value.upper() in existing}
     elif mode.upper() == 'EXISTING':
         # eg. use for checking if values are existing for updating records. Can also be used for checking if foreign key values do exist
-        missing_records = set(column_records) - \
-            {name.upper() for name in records_results}
+        return set(column_records) - existing
+
+    return set()
+
+
+def should_be(mode, model, model_name, field_name, column_records):
+    violations = get_should_be_violations(
+        mode, model, field_name, column_records)
 
-        if missing_records:
-            raise CommandError(f"The following {model_name}.{field_name} values do not exist: {
-                ', '.join(missing_records)}")
+    if violations and mode.upper() == 'NOT EXISTING':
+        raise CommandError(f"The following {model_name}.{field_name} values already exist: {
+                           ', '.join(sorted(violations))}")
+    elif violations:
+        raise CommandError(f"The following {model_name}.{field_name} values do not exist: {
+            ', '.join(sorted(violations))}")
 
 
 def parse_date(date_str):
@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from django.core.management.base import CommandError
+from commons.utils import get_should_be_violations
+
+
+# sheet rows listed per problem in the error message, the count of the rest follows
+VALIDATION_ROWS_SHOWN = 20
+# the header is row 1 of the sheet, so the record at index 0 is row 2. chunks of commons.imports keep their sheet index
+FIRST_SHEET_ROW = 2
+
+
+class SheetValidationError(CommandError):
+    # every problem found in an import sheet, as (column, message, sheet rows)
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__(format_problems(problems))
+
+
+def format_problems(problems):
+    lines = []
+    for column, message, rows in problems:
+        shown = ', '.join(str(row) for row in rows[:VALIDATION_ROWS_SHOWN])
+        more = f" and {len(rows) - VALIDATION_ROWS_SHOWN} more" if len(rows) > VALIDATION_ROWS_SHOWN else ''
+        lines.append(f"{column} {message} (row {shown}{more})")
+
+    return f"{len(problems)} problem(s) found in the sheet: " + ' | '.join(lines)
+
+
+def per_value(values, clean):
+    # clean, a function of a Series, run once per distinct value since sheets repeat most of theirs
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    cleaned = clean(pd.Series(uniques, dtype=object)).to_numpy()
+    return pd.Series(cleaned[codes], index=values.index)
+
+
+def blank_cells(values, unparsed):
+    # empty cells, and the unparsed ones that are blank text, the only text a date or number column may have
+    blank = values.isna().to_numpy()
+    text = np.asarray(unparsed, dtype=bool) & ~blank
+    if text.any():
+        blank[text] = (values[text].astype(str).str.strip() == '').to_numpy()
+    return blank
+
+
+def require_columns(df, columns):
+    # a missing column fails the sheet at once, no other check can run without it
+    missing_columns = [col for col in columns if col not in df.columns]
+    if missing_columns:
+        raise CommandError(
+            f"Missing required columns: {', '.join(missing_columns)}")
+
+
+class SheetValidation:
+    """
+    Vectorized checks of an import sheet. Every check works on whole columns with pandas masks and
+    records the sheet rows it fails on, so one run reports every bad row and column at once:
+
+        validation = SheetValidation(df, ['NAME', 'COMPANY'])
+        validation.clean_text(['NAME', 'COMPANY'], upper=True)
+        validation.check_required(['NAME', 'COMPANY'])
+        validation.check_existing('COMPANY', Company, 'Company', 'name')
+        validation.raise_problems()
+
+    Missing columns raise at once, see require_columns.
+    """
+
+    def __init__(self, df, required_columns):
+        require_columns(df, required_columns)
+
+        self.df = df
+        self.problems = []
+
+    def add_problem(self, column, message, mask):
+        # mask is a boolean array over the rows of df
+        rows = (self.df.index[np.asarray(mask, dtype=bool)] + FIRST_SHEET_ROW).tolist()
+        if rows:
+            self.problems.append((column, message, rows))
+
+    def clean_text(self, columns, upper=False):
+        # blanks become '', numbers their text, surrounding spaces go
+        def clean(values):
+            values = values.where(values.notna(), '').astype(str).str.strip()
+            return values.str.upper() if upper else values
+
+        for col in columns:
+            self.df[col] = per_value(self.df[col], clean)
+
+    def check_required(self, columns):
+        for col in columns:
+            self.add_problem(col, "is required", self.df[col].isna() | (self.df[col] == ''))
+
+    def clean_dates(self, columns, required=True):
+        """
+        Parse the columns to datetime.date, or None for a blank optional cell.
+        A value that is not a date is a problem, and so is a blank required cell.
+        """
+        def clean(values):
+            dates = pd.to_datetime(values, errors='coerce')
+            return dates.dt.date.astype(object).where(dates.notna(), None)
+
+        for col in columns:
+            values = self.df[col]
+            dates = per_value(values, clean)
+            blank = blank_cells(values, dates.isna())
+
+            self.add_problem(col, "is not a date", dates.isna() & ~blank)
+            if required:
+                self.add_problem(col, "is required", blank)
+
+            self.df[col] = dates
+
+    def clean_numbers(self, columns, default=0):
+        # blanks become default, a value that is not a number is a problem
+        for col in columns:
+            values = self.df[col]
+            numbers = pd.to_numeric(values, errors='coerce')
+            blank = blank_cells(values, numbers.isna())
+
+            self.add_problem(col, "is not a number", numbers.isna() & ~blank)
+            self.df[col] = numbers.fillna(default)
+
+    def check_choices(self, column, choices):
+        # blanks are left to check_required
+        values = self.df[column]
+        self.add_problem(
+            column, f"must be one of {', '.join(choices)}", ~values.isin(choices) & (values != ''))
+
+    def check_unique(self, column):
+        # the same value on several rows of the sheet
+        values = self.df[column]
+        self.add_problem(column, "is repeated in the sheet", values.duplicated(keep=False) & (values != ''))
+
+    def check_existing(self, column, model, model_name, field_name, mode='EXISTING', separator=None):
+        """
+        Rows whose value does not exist (mode EXISTING) or already exists (mode NOT EXISTING)
+        in model.field_name, matched case insensitively, see commons.utils.get_should_be_violations.
+        With a separator a cell holds several values (e.g. comma separated specialties), each one checked.
+        Blank cells are skipped.
+        """
+        cells = self.df[column]
+        distinct = pd.Series(cells[cells.notna() & (cells != '')].unique(), dtype=object)
+        values = distinct.str.split(separator).explode().str.strip() if separator else distinct
+        values = values[values != '']
+
+        violations = get_should_be_violations(mode, model, field_name, values.unique())
+        if not violations:
+            return
+
+        # explode keeps the position of the distinct cell each value came from
+        bad_cells = distinct[values.index[values.isin(violations)].unique()]
+        message = "does not exist" if mode.upper() == 'EXISTING' else "already exists"
+        self.add_problem(
+            column, f"{message} as {model_name}.{field_name} ({', '.join(sorted(violations)[:VALIDATION_ROWS_SHOWN])})",
+            cells.isin(bad_cells))
+
+    def raise_problems(self):
+        if self.problems:
+            raise SheetValidationError(self.problems)
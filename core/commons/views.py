@@ -1,3 +1,33 @@
-from django.shortcuts import render
+import hmac
+import os
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
 
-# Create your views here.
+
+def get_metrics_registry():
+    # with several gunicorn workers each one writes its samples under PROMETHEUS_MULTIPROC_DIR, merged here
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+
+    return REGISTRY
+
+
+def is_metrics_authorized(request):
+    # a staff session, or the prometheus scraper sending Authorization: Bearer <METRICS_TOKEN>
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+
+def metrics(request):
+    # prometheus exposition of commons.metrics and the process/celery metrics
+    if not is_metrics_authorized(request):
+        return HttpResponse('Forbidden', status=403)
+
+    return HttpResponse(generate_latest(get_metrics_registry()), content_type=CONTENT_TYPE_LATEST)
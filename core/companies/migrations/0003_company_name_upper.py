@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:36
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='company_name_upper'),
+        ),
+    ]
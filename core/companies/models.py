@@ -1,8 +1,19 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 
 
 class Company(models.Model):
     name = models.CharField(max_length=200)
 
+    class Meta:
+        indexes = [
+            # trigram index behind name__icontains searches
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='company_name_trgm'),
+            # UPPER(name) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('name'), name='company_name_upper'),
+        ]
+
     def __str__(self):
         return f'{self.name}'
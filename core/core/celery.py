@@ -1,6 +1,7 @@
 from __future__ import absolute_import, unicode_literals
 import os
 from celery import Celery
+from celery.signals import worker_ready
 
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -13,3 +14,14 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks()
+
+
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    # the tsmb_task_* metrics live in the worker process, so prometheus scrapes the worker on its own port.
+    # one registry is enough with -P threads, a prefork pool would need PROMETHEUS_MULTIPROC_DIR
+    from django.conf import settings
+    from prometheus_client import start_http_server
+
+    if settings.TASK_METRICS_PORT:
+        start_http_server(settings.TASK_METRICS_PORT)
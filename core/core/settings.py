@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'core',
     'crispy_forms',
@@ -72,6 +73,8 @@ if DEBUG:
     INSTALLED_APPS += ['debug_toolbar']
 
 MIDDLEWARE = [
+    # first, so the statements of every other middleware are counted too
+    'commons.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -131,6 +134,13 @@ DATABASES = {
         'PORT': config('DATABASE_TSMBSYS_PORT', default=5432),
     }
 }
+# the same database on its own connection, for the celery task results. an import runs in one transaction,
+# its PROGRESS states have to be written outside of it to be seen before it commits. see commons.routers
+DATABASES['celery_results'] = {
+    **DATABASES['default'],
+    'TEST': {'MIRROR': 'default'},
+}
+DATABASE_ROUTERS = ['commons.routers.TaskResultRouter']
 
 
 # Password validation
@@ -173,13 +183,63 @@ if DOCKER_ENV:
     CELERY_RESULT_SERIALIZER = 'json'
 else:
     CELERY_BROKER_URL = 'amqp://localhost'
-# CELERY_RESULT_BACKEND = 'django-db'
-CELERY_RESULT_BACKEND = 'rpc://'
+# task states and results in the database, so any web process can poll them, kept for CELERY_RESULT_EXPIRES seconds.
+# the expired ones are deleted by the celery.backend_cleanup task beat runs daily, see the celery service of docker-compose
+CELERY_RESULT_BACKEND = 'django-db'
+CELERY_RESULT_EXTENDED = True
+CELERY_RESULT_EXPIRES = config('CELERY_RESULT_EXPIRES', default=60 * 60 * 24, cast=int)
+# a task shows STARTED once a worker picks it up, not PENDING until it finishes
+CELERY_TASK_TRACK_STARTED = True
 
 
 print(f'CELERY_BROKER_URL {CELERY_BROKER_URL}')
 
 
+# Cache shared by every gunicorn and celery process. Run createcachetable once after migrate
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
+# DataTables record counts. see commons.counts
+COUNT_CACHE_TIMEOUT = 60 * 60
+# tables estimated above this many rows report recordsTotal from pg_class statistics
+COUNT_ESTIMATE_THRESHOLD = 100000
+
+# per-item price history and remarks. see items.utils.get_price_timelines
+PRICE_TIMELINE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# item picker search results, also dropped whenever an item changes. see items.utils.search_items
+ITEM_SEARCH_CACHE_TIMEOUT = 60 * 60
+
+# /metrics is open to staff sessions and to the scraper sending this bearer token. see commons.views.metrics
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# most SQL statements one request of a view (by url name) should need, a warning is logged above it.
+# the lists run 6-9 with a warm cache (session and user included), a page with an N+1 runs 50 more.
+# views not listed use QUERY_BUDGET_DEFAULT, None for no budget. see commons.metrics
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGETS = {
+    'transacts:ajx_transact_list': 15,
+    'transacts:ajx_transact_detail_list': 15,
+    'items:ajx_item_list': 15,
+    'items:ajx_item_price_adjustment_list': 15,
+    'employees:ajx_employee_list': 15,
+    'locations:ajx_location_list': 15,
+}
+# an uploaded import file already queued or running is not started again for this many seconds, see commons.uploads
+IMPORT_TASK_STALE_AFTER = config('IMPORT_TASK_STALE_AFTER', default=60 * 60 * 6, cast=int)
+# port the celery worker serves its import/export task metrics on, 0 to not serve them. see core.celery
+TASK_METRICS_PORT = config('TASK_METRICS_PORT', default=0, cast=int)
+
+# location/item x day pivots, also rebuilt whenever the rollups change. see transacts.pivots.get_pivot
+PIVOT_CACHE_TIMEOUT = 60 * 60
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
@@ -214,6 +274,8 @@ DEBUG_TOOLBAR_CONFIG = {
 DBBACKUP_STORAGE = 'django.core.files.storage.FileSystemStorage'
 DBBACKUP_STORAGE_OPTIONS = {'location': 'backup/'}
 DBBACKUP_COMPRESS = False
+# celery_results is the default database again
+DBBACKUP_DATABASES = ['default']
 
 # default is 1k. Increased to 3k to cater viewing tables with 365 days columns for datatables
 DATA_UPLOAD_MAX_NUMBER_FIELDS = 3000
@@ -21,6 +21,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from users.forms import CustomLoginForm
+from commons.views import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -43,6 +44,8 @@ urlpatterns = [
     # Include Django auth URLs for login/logout
     path('accounts/', include('django.contrib.auth.urls')),
 
+    path('metrics', metrics, name='metrics'),
+
     path('', include('pages.urls')),
 ]
 
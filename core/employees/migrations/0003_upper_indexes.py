@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:36
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_employee_regular_date_employee_separation_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(django.db.models.functions.text.Upper('company_id'), name='employee_company_id_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='employeejob',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='employeejob_name_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='employeejobspecialty',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='jobspecialty_name_upper'),
+        ),
+        migrations.AddIndex(
+            model_name='employeestatus',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='employeestatus_name_upper'),
+        ),
+    ]
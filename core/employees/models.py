@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.db.models.functions import Upper
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
@@ -16,6 +17,12 @@ class EmployeeStatus(models.Model):
     name = models.CharField(max_length=50, unique=True)
     # PROBATION, REGULAR, RESIGNED, TERMINATED, SEPARATED
 
+    class Meta:
+        indexes = [
+            # UPPER(name) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('name'), name='employeestatus_name_upper'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -23,6 +30,12 @@ class EmployeeStatus(models.Model):
 class EmployeeJob(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
+    class Meta:
+        indexes = [
+            # UPPER(name) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('name'), name='employeejob_name_upper'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -37,6 +50,12 @@ class EmployeeJobLevel(models.Model):
 class EmployeeJobSpecialty(models.Model):
     name = models.CharField(max_length=100, unique=True)
 
+    class Meta:
+        indexes = [
+            # UPPER(name) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('name'), name='jobspecialty_name_upper'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -63,5 +82,11 @@ class Employee(models.Model):
     position_specialties = models.ManyToManyField(
         EmployeeJobSpecialty, blank=True)
 
+    class Meta:
+        indexes = [
+            # UPPER(company_id) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('company_id'), name='employee_company_id_upper'),
+        ]
+
     def __str__(self):
         return self.company_id
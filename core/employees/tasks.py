@@ -1,21 +1,57 @@
-import pandas as pd
 from celery import shared_task
 from celery.exceptions import SoftTimeLimitExceeded
 from django.core.management.base import CommandError
-from employees.utils import insert_excel_employees, update_excel_employees
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from commons.counts import cached_count
+from commons.imports import import_sheet, import_task_progress
+from commons.exports import EXPORT_FORMATS, get_export_format, export_file_path, export_file_url, export_task_progress
+from commons.metrics import TaskMetrics
+from employees.utils import insert_excel_employees, update_excel_employees, get_employee_export_queryset, export_employees
 
 
-@shared_task()
-def import_employees_task(file_path, mode='INSERT'):
+@shared_task(bind=True)
+def import_employees_task(self, file_path, mode='INSERT'):
     # notes
     # returning pass, True, False, or nothing at all will still mark the task SUCCESS.
     # raise an Exception or CommandError here or inside called functions to force FAILURE on celery task
     # raise CommandError(f"Testing commanderror")
 
-    df = pd.read_excel(file_path)
+    # the phase timings and rows/sec end up in the task result and in the tsmb_task_* metrics
     if mode == 'INSERT':
-        insert_excel_employees(df)
+        import_chunk = insert_excel_employees
     elif mode == 'UPDATE':
-        update_excel_employees(df)
+        import_chunk = update_excel_employees
     else:
         raise Exception("TE01: Mode expecting INSERT or UPDATE only.")
+
+    metrics = TaskMetrics('import_employees')
+    # the sheet is read and written chunk by chunk, all in one transaction, see commons.imports.import_sheet.
+    # the rows done and the ETA are reported as the PROGRESS state after every chunk
+    rows, results = import_sheet(
+        file_path, lambda df: import_chunk(df, metrics=metrics), metrics=metrics, progress=import_task_progress(self, file_path))
+
+    return metrics.finish(rows)
+
+
+@shared_task(bind=True)
+def export_employees_task(self, params, filtered=False):
+    # params is dict(request.GET.lists()) from the export view, so getlist() keeps working on multi-value filters
+    params = MultiValueDict(params)
+    export_format = get_export_format(params)
+    if export_format is None:
+        raise ValueError(f"Unknown export format {params.get('format')}")
+    employees = get_employee_export_queryset(params, filtered=filtered)
+    metrics = TaskMetrics('export_employees')
+    with metrics.phase('count'):
+        total = cached_count(employees)
+
+    prefix = 'filtered_' if filtered else ''
+    filename = f"{prefix}employee_records_{
+        timezone.now().strftime('%Y%m%d_%H%M%S')}_{self.request.id[:8]}.{EXPORT_FORMATS[export_format]}"
+
+    with metrics.phase('write'):
+        stats = export_employees(
+            employees, export_file_path(filename), progress=export_task_progress(self, total), export_format=export_format)
+
+    return {'filename': filename, 'url': export_file_url(filename), **metrics.finish(stats['rows'])}
@@ -1,17 +1,20 @@
 import random
 import string
-import os
 import pandas as pd
+import pyarrow as pa
 import datetime
-from django.conf import settings
 from django.utils.regex_helper import _lazy_re_compile
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, Value, TextField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.aggregates import StringAgg
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.management.base import CommandError
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from commons.utils import should_be, parse_date
+from commons.validation import SheetValidation
+from commons.counts import bump_data_version_on_commit
+from commons.exports import export_queryset
+from commons.metrics import task_phase
 from employees.models import Employee, EmployeeJob, EmployeeJobLevel, EmployeeJobSpecialty, EmployeeStatus
 
 
@@ -87,187 +90,120 @@ def load_foreign_keys():
 def verify_excel_employees(df, mode='INSERT'):
     required_columns = ['COMPANY ID', 'FIRST NAME', 'LAST NAME', 'GENDER',
                         'CONTACT', 'ADDRESS', 'BIRTH DATE', 'START DATE', 'STATUS', 'POSITION']
+    # every problem of the sheet is collected and raised together, see commons.validation
+    validation = SheetValidation(df, required_columns)
 
-    # for column in required_columns:
-    #     if column not in df.columns:
-    #         raise CommandError(f"Missing required column: {column}")
-
-    if not all(col in df.columns for col in required_columns):
-        missing_columns = [
-            col for col in required_columns if col not in df.columns]
-        raise CommandError(f"Missing required columns: {
-                           ', '.join(missing_columns)}")
-
-    # print(df)
-
-    df['COMPANY ID'] = df['COMPANY ID'].fillna(
-        '').astype(str).str.strip().str.upper().replace(" ", "-", regex=True)
-    df['FIRST NAME'] = df['FIRST NAME'].fillna('').str.strip()
-    df['LAST NAME'] = df['LAST NAME'].fillna('').str.strip()
-    df['GENDER'] = df['GENDER'].fillna('').str.strip().str.upper()
-    df['CONTACT'] = df['CONTACT'].fillna('').astype(str).str.strip()
-    df['ADDRESS'] = df['ADDRESS'].fillna('').str.strip()
-    df['POSITION'] = df['POSITION'].fillna('').str.strip().str.upper()
-    df['STATUS'] = df['STATUS'].fillna('').str.strip().str.upper()
-    df['BIRTH DATE'] = pd.to_datetime(df['BIRTH DATE'], errors='coerce')
-    df['BIRTH DATE'] = df['BIRTH DATE'].map(lambda x: x.strftime('%Y-%m-%d'))
-    df['START DATE'] = pd.to_datetime(df['START DATE'], errors='coerce')
-    df['START DATE'] = df['START DATE'].map(lambda x: x.strftime('%Y-%m-%d'))
+    validation.clean_text(['COMPANY ID', 'GENDER', 'STATUS', 'POSITION'], upper=True)
+    validation.clean_text(['FIRST NAME', 'LAST NAME', 'CONTACT', 'ADDRESS'])
+    df['COMPANY ID'] = df['COMPANY ID'].str.replace(' ', '-')
 
-    #
-    if 'REGULAR DATE' in df.columns:
-        df['REGULAR DATE'] = pd.to_datetime(
-            df['REGULAR DATE'], errors='coerce')
-        df['REGULAR DATE'] = df['REGULAR DATE'].map(
-            lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else None)
-    if 'SEPARATION DATE' in df.columns:
-        df['SEPARATION DATE'] = pd.to_datetime(
-            df['SEPARATION DATE'], errors='coerce')
-        df['SEPARATION DATE'] = df['SEPARATION DATE'].map(
-            lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else None)
+    # dates become datetime.date, the optional ones None when blank
+    validation.clean_dates(['BIRTH DATE', 'START DATE'])
+    validation.clean_dates(
+        [col for col in ['REGULAR DATE', 'SEPARATION DATE'] if col in df.columns], required=False)
 
     # Validate required columns should have values
-    for col in required_columns:
-        for _, row in df.iterrows():
-            if row[col] == '':
-                raise CommandError(f"Missing values in some {col} rows.")
+    validation.check_required(
+        [col for col in required_columns if col not in ['BIRTH DATE', 'START DATE']])
 
     # check columns that should be unique
-    columns_to_check = ['COMPANY ID']
-    for column in columns_to_check:
-        column_records = df[column].unique()
-        field_name = 'name'
-        if column == 'COMPANY ID':
-            field_name = 'company_id'
+    validation.check_unique('COMPANY ID')
     if mode == 'INSERT':
-        should_be('NOT EXISTING', Employee, 'Employee',
-                  field_name, column_records)
+        validation.check_existing(
+            'COMPANY ID', Employee, 'Employee', 'company_id', mode='NOT EXISTING')
     elif mode == 'UPDATE':
-        should_be('EXISTING', Employee, 'Employee', field_name, column_records)
+        validation.check_existing(
+            'COMPANY ID', Employee, 'Employee', 'company_id')
 
-    # Validate gender and boolean fields
-    if not df['GENDER'].isin(['MALE', 'FEMALE']).all():
-        raise CommandError("Invalid GENDER value. Must be 'MALE' or 'FEMALE'.")
-
-    # a single blank value will auto convert every value to float. As of now, this is how we clean it.
-    # df['IS LOCAL'] = df['IS LOCAL'].replace({'': 'TRUE'})
-    # df['IS LOCAL'] = df['IS LOCAL'].replace({'1.0': 'TRUE'})
-    # df['IS LOCAL'] = df['IS LOCAL'].replace({'0.0': 'FALSE'})
-    # if not df['IS LOCAL'].isin(['TRUE', 'FALSE']).all():
-    #     raise CommandError("Invalid IS LOCAL value. Must be 'TRUE' or 'FALSE'.")
+    # Validate gender
+    validation.check_choices('GENDER', ['MALE', 'FEMALE'])
 
     # Verify if values exists
-    columns_to_check = ['STATUS', 'POSITION']
-    for column in columns_to_check:
-        column_records = df[column].unique()
-        field_name = 'name'
-        if column == 'STATUS':
-            model = EmployeeStatus
-            model_name = 'EmployeeStatus'
-        elif column == 'POSITION':
-            model = EmployeeJob
-            model_name = 'EmployeeJob'
-
-        should_be('EXISTING', model, model_name, field_name, column_records)
+    validation.check_existing(
+        'STATUS', EmployeeStatus, 'EmployeeStatus', 'name')
+    validation.check_existing('POSITION', EmployeeJob, 'EmployeeJob', 'name')
 
     # Verify value ONLY IF column is exisiting in file
-    columns_to_check = ['POSITION SPECIALTIES']
-    for column in columns_to_check:
-        if column in df.columns:
-            #
-            df[column] = df[column].replace({None: ''})
-            df[column] = df[column].fillna('')
-            df[column] = df[column].str.strip().str.upper()
-            df[column] = df[column].replace({'': None})
-
-            #
-            column_records = df[column].unique()
-            column_records = column_records[~pd.isnull(column_records)]
-
-            if not pd.isna(column_records).any():
-                field_name = 'name'
-                if column == 'POSITION SPECIALTIES':
-                    model = EmployeeJobSpecialty
-                    model_name = 'EmployeeJobSpecialty'
-
-                    # employee can have multiple EmployeeJobSpecialty as to why we need to split it
-                    split_records = []
-                    for record in column_records:
-                        # Split the record by comma and strip any whitespace
-                        split_records.extend([r.strip()
-                                             for r in record.split(',')])
-
-                    # Remove duplicates and convert to a numpy array or list
-                    column_records = pd.unique(split_records)
-
-                should_be('EXISTING', model, model_name,
-                          field_name, column_records)
+    if 'POSITION SPECIALTIES' in df.columns:
+        column = 'POSITION SPECIALTIES'
+        validation.clean_text([column], upper=True)
+
+        # employee can have multiple EmployeeJobSpecialty, comma separated, each checked on its own
+        validation.check_existing(
+            column, EmployeeJobSpecialty, 'EmployeeJobSpecialty', 'name', separator=',')
+        df[column] = df[column].replace({'': None})
+
+    validation.raise_problems()
 
     return df
 
 
-def insert_excel_employees(df):
+def insert_excel_employees(df, metrics=None):
+    # metrics, a commons.metrics.TaskMetrics, times the verify, resolve and write phases
 
     # First, verify and clean the input DataFrame
-    df = verify_excel_employees(df, 'INSERT')
+    with task_phase(metrics, 'verify'):
+        df = verify_excel_employees(df, 'INSERT')
 
-    # Load foreign key references
-    foreign_keys = load_foreign_keys()
-
-    # Insert new employees
-    users = []
-    employees = []
-    default_password = make_password('welcome01')
-
-    for _, row in df.iterrows():
-        # Create User instance
-        username = generate_username(row['FIRST NAME'])
-        first_name = row['FIRST NAME']
-        last_name = row['LAST NAME']
-        user = User(username=username, password=default_password,
-                    first_name=first_name, last_name=last_name)
-
-        if 'EMAIL' in df.columns and pd.notnull(row['EMAIL']):
-            user.email = row['EMAIL']
-
-        users.append(user)
-
-        # Create Employee instance
-        employee = Employee(
-            user=user,
-            company_id=row['COMPANY ID'],
-            contact='' if pd.isna(row.get('CONTACT', None)
-                                  ) else row.get('CONTACT', None),
-            middle_name='' if pd.isna(
-                row.get('MIDDLE NAME', None)) else row.get('MIDDLE NAME', None),
-            gender=row['GENDER'],
-            address='' if pd.isna(row.get('ADDRESS', None)
-                                  ) else row.get('ADDRESS', None),
-            birth_date=parse_date(row.get('BIRTH DATE')),
-            start_date=parse_date(row.get('START DATE')),
-            status=foreign_keys['statuses'].get(row['STATUS'].upper()),
-            position=foreign_keys['positions'].get(row['POSITION'].upper()),
-            position_level=None if pd.isna(foreign_keys['levels'].get(
-                row['POSITION LEVEL'], None)) else foreign_keys['levels'].get(row['POSITION LEVEL'].upper(), None),
-            regular_date=parse_date(row.get('REGULAR DATE')),
-            separation_date=parse_date(row.get('SEPARATION DATE')),
-        )
+    with task_phase(metrics, 'resolve'):
+        # Load foreign key references
+        foreign_keys = load_foreign_keys()
 
-        employees.append(employee)
+        # Insert new employees
+        users = []
+        employees = []
+        default_password = make_password('welcome01')
 
-    # print(f'-------hermit3---------')
-    # print(users)
-    # print(f'-------hermit3---------')
-    # print(f'-------hermit5---------')
-    # print(employees) # your model should have def __str__(self) to easily see contents for debugging
-    # print(f'-------hermit5---------')
-
-    with transaction.atomic():
+        for _, row in df.iterrows():
+            # Create User instance
+            username = generate_username(row['FIRST NAME'])
+            first_name = row['FIRST NAME']
+            last_name = row['LAST NAME']
+            user = User(username=username, password=default_password,
+                        first_name=first_name, last_name=last_name)
+
+            if 'EMAIL' in df.columns and pd.notnull(row['EMAIL']):
+                user.email = row['EMAIL']
+
+            users.append(user)
+
+            # Create Employee instance
+            employee = Employee(
+                user=user,
+                company_id=row['COMPANY ID'],
+                contact='' if pd.isna(row.get('CONTACT', None)
+                                      ) else row.get('CONTACT', None),
+                middle_name='' if pd.isna(
+                    row.get('MIDDLE NAME', None)) else row.get('MIDDLE NAME', None),
+                gender=row['GENDER'],
+                address='' if pd.isna(row.get('ADDRESS', None)
+                                      ) else row.get('ADDRESS', None),
+                birth_date=row['BIRTH DATE'],
+                start_date=row['START DATE'],
+                status=foreign_keys['statuses'].get(row['STATUS'].upper()),
+                position=foreign_keys['positions'].get(row['POSITION'].upper()),
+                position_level=None if pd.isna(foreign_keys['levels'].get(
+                    row['POSITION LEVEL'], None)) else foreign_keys['levels'].get(row['POSITION LEVEL'].upper(), None),
+                regular_date=row.get('REGULAR DATE'),
+                separation_date=row.get('SEPARATION DATE'),
+            )
+
+            employees.append(employee)
+
+        # print(f'-------hermit3---------')
+        # print(users)
+        # print(f'-------hermit3---------')
+        # print(f'-------hermit5---------')
+        # print(employees) # your model should have def __str__(self) to easily see contents for debugging
+        # print(f'-------hermit5---------')
+
+    with task_phase(metrics, 'write'), transaction.atomic():
         # Save users and employees
         User.objects.bulk_create(users)
         for i, employee in enumerate(employees):
             employee.user = users[i]
         Employee.objects.bulk_create(employees)
+        bump_data_version_on_commit(User, Employee)
 
         # Add specialties to each employee after bulk creation
         for i, employee in enumerate(employees):
@@ -283,13 +219,16 @@ def insert_excel_employees(df):
     return True
 
 
-def update_excel_employees(df):
+def update_excel_employees(df, metrics=None):
+    # metrics, a commons.metrics.TaskMetrics, times the verify, resolve and write phases
 
     # First, verify and clean the input DataFrame
-    df = verify_excel_employees(df, 'UPDATE')
+    with task_phase(metrics, 'verify'):
+        df = verify_excel_employees(df, 'UPDATE')
 
     # Load foreign key references
-    foreign_keys = load_foreign_keys()
+    with task_phase(metrics, 'resolve'):
+        foreign_keys = load_foreign_keys()
 
     # Prepare lists for bulk updates
     users_to_update = []
@@ -297,84 +236,86 @@ def update_excel_employees(df):
 
     try:
         with transaction.atomic():
-            for _, row in df.iterrows():
-                try:
-                    # Fetch the existing Employee record by unique identifier
-                    employee = Employee.objects.select_related(
-                        'user').get(company_id=row['COMPANY ID'])
-
-                    # Update User information if necessary
-                    user = employee.user
-                    if 'EMAIL' in df.columns and pd.notnull(row['EMAIL']):
-                        user.email = row['EMAIL']
-                    if 'FIRST NAME' in df.columns and pd.notnull(row['FIRST NAME']):
-                        user.first_name = row['FIRST NAME']
-                    if 'LAST NAME' in df.columns and pd.notnull(row['LAST NAME']):
-                        user.last_name = row['LAST NAME']
-
-                    users_to_update.append(user)
-
-                    # Update Employee fields
-                    employee.contact = '' if pd.isna(
-                        row.get('CONTACT', None)) else row.get('CONTACT', None)
-                    employee.middle_name = '' if pd.isna(
-                        row.get('MIDDLE NAME', None)) else row.get('MIDDLE NAME', None)
-                    employee.gender = row['GENDER']
-                    employee.address = '' if pd.isna(
-                        row.get('ADDRESS', None)) else row.get('ADDRESS', None)
-                    employee.birth_date = parse_date(row.get('BIRTH DATE'))
-                    employee.start_date = parse_date(row.get('START DATE'))
-                    employee.status = foreign_keys['statuses'].get(
-                        row['STATUS'].upper())
-                    employee.position = foreign_keys['positions'].get(
-                        row['POSITION'].upper())
-                    employee.position_level = None if pd.isna(foreign_keys['levels'].get(
-                        row['POSITION LEVEL'], None)) else foreign_keys['levels'].get(row['POSITION LEVEL'].upper(), None)
-                    employee.regular_date = parse_date(row.get('REGULAR DATE'))
-                    employee.separation_date = parse_date(
-                        row.get('SEPARATION DATE'))
-
-                    employees_to_update.append(employee)
-
-                except ObjectDoesNotExist:
-                    # Handle the case where an employee does not exist, if needed
-                    continue
-
-            # Perform bulk update on Users and Employees
-            # Add other fields as needed
-            User.objects.bulk_update(users_to_update, [
-                'email',
-                'first_name',
-                'last_name'
-            ])
-            Employee.objects.bulk_update(employees_to_update, [
-                'contact',
-                'middle_name',
-                'gender',
-                'address',
-                'birth_date',
-                'start_date',
-                'status',
-                'position',
-                'position_level',
-                'regular_date',
-                'separation_date'
-            ])
-
-            # Update specialties for each employee
-            for employee in employees_to_update:
-                row = df[df['COMPANY ID'] == employee.company_id].iloc[0]
-                specialties = row.get('POSITION SPECIALTIES', '')
-
-                # Always clear existing specialties
-                employee.position_specialties.clear()
-
-                # If there are new specialties, add them
-                if pd.notna(specialties) and specialties.strip() != '':
-                    specialty_list = [specialty.strip()
-                                      for specialty in specialties.split(',')]
-                    employee.position_specialties.add(
-                        *EmployeeJobSpecialty.objects.filter(name__in=specialty_list))
+            with task_phase(metrics, 'resolve'):
+                for _, row in df.iterrows():
+                    try:
+                        # Fetch the existing Employee record by unique identifier
+                        employee = Employee.objects.select_related(
+                            'user').get(company_id=row['COMPANY ID'])
+
+                        # Update User information if necessary
+                        user = employee.user
+                        if 'EMAIL' in df.columns and pd.notnull(row['EMAIL']):
+                            user.email = row['EMAIL']
+                        if 'FIRST NAME' in df.columns and pd.notnull(row['FIRST NAME']):
+                            user.first_name = row['FIRST NAME']
+                        if 'LAST NAME' in df.columns and pd.notnull(row['LAST NAME']):
+                            user.last_name = row['LAST NAME']
+
+                        users_to_update.append(user)
+
+                        # Update Employee fields
+                        employee.contact = '' if pd.isna(
+                            row.get('CONTACT', None)) else row.get('CONTACT', None)
+                        employee.middle_name = '' if pd.isna(
+                            row.get('MIDDLE NAME', None)) else row.get('MIDDLE NAME', None)
+                        employee.gender = row['GENDER']
+                        employee.address = '' if pd.isna(
+                            row.get('ADDRESS', None)) else row.get('ADDRESS', None)
+                        employee.birth_date = row['BIRTH DATE']
+                        employee.start_date = row['START DATE']
+                        employee.status = foreign_keys['statuses'].get(
+                            row['STATUS'].upper())
+                        employee.position = foreign_keys['positions'].get(
+                            row['POSITION'].upper())
+                        employee.position_level = None if pd.isna(foreign_keys['levels'].get(
+                            row['POSITION LEVEL'], None)) else foreign_keys['levels'].get(row['POSITION LEVEL'].upper(), None)
+                        employee.regular_date = row.get('REGULAR DATE')
+                        employee.separation_date = row.get('SEPARATION DATE')
+
+                        employees_to_update.append(employee)
+
+                    except ObjectDoesNotExist:
+                        # Handle the case where an employee does not exist, if needed
+                        continue
+
+            with task_phase(metrics, 'write'):
+                # Perform bulk update on Users and Employees
+                # Add other fields as needed
+                User.objects.bulk_update(users_to_update, [
+                    'email',
+                    'first_name',
+                    'last_name'
+                ])
+                Employee.objects.bulk_update(employees_to_update, [
+                    'contact',
+                    'middle_name',
+                    'gender',
+                    'address',
+                    'birth_date',
+                    'start_date',
+                    'status',
+                    'position',
+                    'position_level',
+                    'regular_date',
+                    'separation_date'
+                ])
+                bump_data_version_on_commit(User, Employee)
+
+                # Update specialties for each employee
+                for employee in employees_to_update:
+                    row = df[df['COMPANY ID'] == employee.company_id].iloc[0]
+                    specialties = row.get('POSITION SPECIALTIES', '')
+
+                    # Always clear existing specialties
+                    employee.position_specialties.clear()
+
+                    # If there are new specialties, add them
+                    if pd.notna(specialties) and specialties.strip() != '':
+                        specialty_list = [specialty.strip()
+                                          for specialty in specialties.split(',')]
+                        employee.position_specialties.add(
+                            *EmployeeJobSpecialty.objects.filter(name__in=specialty_list))
 
         return True
 
@@ -383,9 +324,139 @@ def update_excel_employees(df):
         return False
 
 
-def handle_uploaded_file(f):
-    file_path = os.path.join(settings.MEDIA_ROOT, 'uploads', f.name)
-    with open(file_path, 'wb+') as destination:
-        for chunk in f.chunks():
-            destination.write(chunk)
-    return file_path
+EMPLOYEE_EXPORT_HEADERS = ['COMPANY ID', 'FIRST NAME', 'LAST NAME', 'MIDDLE NAME', 'GENDER', 'EMAIL', 'CONTACT', 'ADDRESS',
+                           'BIRTH DATE', 'START DATE', 'STATUS', 'POSITION', 'POSITION LEVEL', 'POSITION SPECIALTIES',
+                           'REGULAR DATE', 'SEPARATION DATE']
+EMPLOYEE_EXPORT_SCHEMA = pa.schema([
+    ('company_id', pa.string()),
+    ('first_name', pa.string()),
+    ('last_name', pa.string()),
+    ('middle_name', pa.string()),
+    ('gender', pa.string()),
+    ('email', pa.string()),
+    ('contact', pa.string()),
+    ('address', pa.string()),
+    ('birth_date', pa.date32()),
+    ('start_date', pa.date32()),
+    ('status', pa.string()),
+    ('position', pa.string()),
+    ('position_level', pa.string()),
+    ('position_specialties', pa.string()),
+    ('regular_date', pa.date32()),
+    ('separation_date', pa.date32()),
+])
+
+
+def export_employees(employees, file_path, progress=None, export_format='xlsx'):
+    # employees must carry the specialties_agg annotation so specialties come from the same query
+
+    def to_row(employee):
+        return [
+            employee.company_id,
+            employee.user.first_name,
+            employee.user.last_name,
+            employee.middle_name,
+            employee.gender,
+            employee.user.email,
+            employee.contact,
+            employee.address,
+            employee.birth_date,
+            employee.start_date,
+            employee.status.name if employee.status else '',
+            employee.position.name if employee.position else '',
+            employee.position_level.name if employee.position_level else '',
+            employee.specialties_agg,
+            employee.regular_date,
+            employee.separation_date if employee.separation_date else '',
+        ]
+
+    def to_record(employee):
+        return [
+            employee.company_id,
+            employee.user.first_name,
+            employee.user.last_name,
+            employee.middle_name,
+            employee.gender,
+            employee.user.email,
+            employee.contact,
+            employee.address,
+            employee.birth_date,
+            employee.start_date,
+            employee.status.name if employee.status else None,
+            employee.position.name if employee.position else None,
+            employee.position_level.name if employee.position_level else None,
+            employee.specialties_agg,
+            employee.regular_date,
+            employee.separation_date,
+        ]
+
+    return export_queryset(
+        file_path, export_format, EMPLOYEE_EXPORT_HEADERS, EMPLOYEE_EXPORT_SCHEMA,
+        employees.select_related('status', 'position', 'position_level', 'user'), to_row, to_record, progress=progress)
+
+
+def get_employee_export_queryset(params, filtered=True):
+    # params holds the DataTables request parameters (request.GET or the dict passed to the export task)
+    employees = Employee.objects.select_related(
+        'status', 'position', 'position_level', 'user'
+    )
+
+    if filtered:
+        #
+        search_value = params.get('search[value]', '')
+        #
+        position_filter = params.getlist('position[]', [])
+        specialty_filter = params.getlist('specialty[]', [])
+        gender_filter = params.getlist('gender[]', [])
+        employee_status_filter = params.getlist('employee_status[]', [])
+
+        # Apply search filtering
+        if search_value:
+            employees = employees.filter(
+
+                Q(company_id__icontains=search_value) |
+                Q(user__last_name__icontains=search_value) |
+                Q(user__first_name__icontains=search_value) |
+                Q(middle_name__icontains=search_value) |
+                Q(position__name__icontains=search_value) |
+                Q(position_specialties__name__icontains=search_value) |
+                Q(position_level__name__icontains=search_value) |
+                Q(gender__icontains=search_value) |
+                Q(status__name__icontains=search_value)
+
+            ).distinct()
+
+        if position_filter:
+            employees = employees.filter(position__name__in=position_filter)
+
+        if specialty_filter:
+            employees = employees.filter(
+                position_specialties__name__in=specialty_filter)
+
+        if gender_filter:
+            employees = employees.filter(gender__in=gender_filter)
+
+        if employee_status_filter:
+            employees = employees.filter(
+                status__name__in=employee_status_filter)
+
+    #
+    employees = employees.filter(
+        user__is_active=True, user__is_superuser=False)
+
+    # every specialty of the employee, from its own subquery. aggregating over position_specialties would reuse
+    # the join of the specialty filters above and list only the specialties that matched
+    specialties = Employee.position_specialties.through.objects.filter(
+        employee=OuterRef('pk')
+    ).order_by().values('employee').annotate(
+        names=StringAgg('employeejobspecialty__name', ', ', distinct=True)
+    ).values('names')
+    employees = employees.annotate(
+        specialties_agg=Coalesce(
+            Subquery(specialties),
+            Value(''),
+            output_field=TextField()
+        )
+    )
+
+    return employees
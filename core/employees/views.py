@@ -1,7 +1,11 @@
-import pandas as pd
 import os
 from django.shortcuts import render, redirect, reverse
 from django.core.paginator import Paginator
+from commons.pagination import keyset_paginate
+from commons.counts import cached_count, table_count
+from commons.exports import get_export_format
+from commons.progress import get_task_status
+from commons.uploads import start_import
 from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.utils import timezone
@@ -15,9 +19,8 @@ from django.db.models.functions import Coalesce
 from django.contrib.postgres.aggregates import StringAgg
 from employees.models import Employee, EmployeeJobSpecialty, EmployeeJobLevel, EmployeeJob, EmployeeStatus
 from employees.forms import EmployeeCreationForm, EmployeeUpdateForm, EmployeeExcelUploadForm
-from employees.utils import insert_excel_employees, update_excel_employees, handle_uploaded_file
-from employees.tasks import import_employees_task
-from celery.result import AsyncResult
+from employees.utils import insert_excel_employees, update_excel_employees
+from employees.tasks import import_employees_task, export_employees_task
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 
 
@@ -172,9 +175,23 @@ def ajx_employee_list(request):
         'status', 'position', 'position_level', 'user')
     employees = employees.prefetch_related('position_specialties')
 
-    paginator = Paginator(employees, length)
-    total_records = paginator.count
-    employees_page = paginator.get_page(start // length + 1)
+    records_total = cached_count(Employee.objects.filter(
+        user__is_active=True, user__is_superuser=False))
+    records_filtered = cached_count(employees)
+
+    if request.GET.get('pagination') == 'keyset':
+        # seek pagination on the whitelisted sort column plus id. the front end sends back next_cursor
+        order_field = order_column.lstrip('-')
+        if order_field not in ('id', 'company_id', 'start_date', 'user__last_name', 'user__first_name', 'middle_name', 'position', 'specialties_agg', 'position_level', 'gender', 'status'):
+            order_field = 'id'
+        employees_page, next_cursor = keyset_paginate(
+            employees, order_field, order_direction, length, request.GET.get('cursor'))
+    else:
+        paginator = Paginator(employees, length)
+        # reuse the cached count instead of another COUNT(*)
+        paginator.count = records_filtered
+        employees_page = paginator.get_page(start // length + 1)
+        next_cursor = None
 
     #
     data = []
@@ -200,8 +217,9 @@ def ajx_employee_list(request):
 
     response = {
         'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'next_cursor': next_cursor,
         'data': data
     }
 
@@ -210,146 +228,26 @@ def ajx_employee_list(request):
 
 @login_required
 def ajx_export_excel_all_employees(request):
+    # the worker builds the queryset and writes the file, the request only queues it
+    if get_export_format(request.GET) is None:
+        return JsonResponse({'status': 'error', 'message': "EV40: Unknown export format."})
 
-    #
-    employees = Employee.objects.all()
-
-    #
-    employees = employees.filter(
-        user__is_active=True, user__is_superuser=False)
-
-    #
-    employees = employees.select_related(
-        'status', 'position', 'position_level', 'user')
-    employees = employees.prefetch_related('position_specialties')
-
-    # Data to be exported
-    data = []
-    for employee in employees:
-        specialties = ', '.join([specialty.name for specialty in employee.position_specialties.all(
-        )]) if employee.position_specialties else ''
-
-        data.append({
-            'COMPANY ID': employee.company_id,
-            'FIRST NAME': employee.user.first_name,
-            'LAST NAME': employee.user.last_name,
-            'MIDDLE NAME': employee.middle_name,
-            'GENDER': employee.gender,
-            'EMAIL': employee.user.email,
-            'CONTACT': employee.contact,
-            'ADDRESS': employee.address,
-            'BIRTH DATE': employee.birth_date,
-            'START DATE': employee.start_date,
-            'STATUS': employee.status.name if employee.status else '',
-            'POSITION': employee.position.name if employee.position else '',
-            'POSITION LEVEL': employee.position_level.name if employee.position_level else '',
-            'POSITION SPECIALTIES': specialties,
-            'REGULAR DATE': employee.regular_date,
-            'SEPARATION DATE': employee.separation_date if employee.separation_date else '',
-        })
-
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
-
-    # Generate the Excel file
-    filename = f"employee_records_{
-        timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    df.to_excel(os.path.join('media', filename), index=False)
+    task = export_employees_task.delay(
+        dict(request.GET.lists()), filtered=False)
 
-    return JsonResponse({'filename': filename, 'status': 'success'})
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Export Process TaskID {task.id} started. Please wait..."})
 
 
 @login_required
 def ajx_export_excel_filtered_employees(request):
-    #
-    search_value = request.GET.get('search[value]', '')
-    #
-    position_filter = request.GET.getlist('position[]', [])
-    specialty_filter = request.GET.getlist('specialty[]', [])
-    gender_filter = request.GET.getlist('gender[]', [])
-    employee_status_filter = request.GET.getlist('employee_status[]', [])
+    # the worker rebuilds the same filtered queryset from the DataTables parameters
+    if get_export_format(request.GET) is None:
+        return JsonResponse({'status': 'error', 'message': "EV40: Unknown export format."})
 
-    # Initial query with select_related for reducing the number of queries
-    employees = Employee.objects.select_related(
-        'status', 'position', 'position_level', 'user'
-    ).prefetch_related('position_specialties')
+    task = export_employees_task.delay(
+        dict(request.GET.lists()), filtered=True)
 
-    # Apply search filtering
-    if search_value:
-        employees = employees.filter(
-
-            Q(company_id__icontains=search_value) |
-            Q(user__last_name__icontains=search_value) |
-            Q(user__first_name__icontains=search_value) |
-            Q(middle_name__icontains=search_value) |
-            Q(position__name__icontains=search_value) |
-            Q(position_specialties__name__icontains=search_value) |
-            Q(position_level__name__icontains=search_value) |
-            Q(gender__icontains=search_value) |
-            Q(status__name__icontains=search_value)
-
-        ).distinct()
-
-    if position_filter:
-        employees = employees.filter(position__name__in=position_filter)
-
-    if specialty_filter:
-        employees = employees.filter(
-            position_specialties__name__in=specialty_filter)
-
-    if gender_filter:
-        employees = employees.filter(gender__in=gender_filter)
-
-    if employee_status_filter:
-        employees = employees.filter(status__name__in=employee_status_filter)
-
-    #
-    employees = employees.filter(
-        user__is_active=True, user__is_superuser=False)
-
-    #
-    employees = employees.annotate(
-        specialties_agg=Coalesce(
-            StringAgg('position_specialties__name', ', ', distinct=True),
-            Value(''),
-            output_field=TextField()
-        )
-    )
-
-    # Data to be exported
-    data = []
-    for employee in employees:
-        specialties = ', '.join([specialty.name for specialty in employee.position_specialties.all(
-        )]) if employee.position_specialties else ''
-
-        data.append({
-            'COMPANY ID': employee.company_id,
-            'FIRST NAME': employee.user.first_name,
-            'LAST NAME': employee.user.last_name,
-            'MIDDLE NAME': employee.middle_name,
-            'GENDER': employee.gender,
-            'EMAIL': employee.user.email,
-            'CONTACT': employee.contact,
-            'ADDRESS': employee.address,
-            'BIRTH DATE': employee.birth_date,
-            'START DATE': employee.start_date,
-            'STATUS': employee.status.name if employee.status else '',
-            'POSITION': employee.position.name if employee.position else '',
-            'POSITION LEVEL': employee.position_level.name if employee.position_level else '',
-            'POSITION SPECIALTIES': specialties,
-            'REGULAR DATE': employee.regular_date,
-            'SEPARATION DATE': employee.separation_date if employee.separation_date else '',
-        })
-
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
-
-    # Generate the Excel file
-    filename = f"filtered_employee_records_{
-        timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    df.to_excel(os.path.join('media', filename), index=False)
-
-    return JsonResponse({'filename': filename, 'status': 'success'})
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Export Process TaskID {task.id} started. Please wait..."})
 
 
 @login_required
@@ -360,17 +258,14 @@ def ajx_import_insert_excel_employees_celery(request):
         if form.is_valid():
             file = request.FILES['file']
             try:
-                # upload the file first in our system so we can have a path
-                file_path = handle_uploaded_file(file)
-
-                # start import of data using celery
-                # this returns a task.id even if import_employees_task def has only pass. This means that we don't need to return anything from this def because .delay still returns a task even if there's none. It also doesn't matter if we return True or False to the function that we're calling
-                # return JsonResponse({'status': 'testing', 'message': f"task is {task} and task.id is {task.id}"})
-                task = import_employees_task.delay(file_path, mode='INSERT')
+                # upload the file first in our system so we can have a path, then start import of data using celery.
+                # the same file already imported, or still importing, returns that task instead, see commons.uploads.start_import
+                upload, started = start_import(
+                    file, 'employees.INSERT', lambda file_path, task_id: import_employees_task.apply_async((file_path, 'INSERT'), task_id=task_id), request.user)
 
-                return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Import Insert Process TaskID {task.id} started. Please wait..."})
+                return JsonResponse({'status': 'started', 'task_id': upload.task_id, 'duplicate': not started, 'message': f"Import Insert Process TaskID {upload.task_id} started. Please wait..." if started else f"The same file was already uploaded, TaskID {upload.task_id} ({upload.status})."})
             except FileNotFoundError:
-                # mostly it goes here if media/uploads directory doesn't exist or handle_uploaded_file not able to upload the file correctly
+                # mostly it goes here if the upload could not be stored in media/uploads
                 return JsonResponse({'status': 'error', 'message': f"EV31: {str(FileNotFoundError)}. Check file or directory location"})
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': f"EV30: {type(e)} | {str(e)}"})
@@ -386,10 +281,10 @@ def ajx_import_update_excel_employees_celery(request):
         if form.is_valid():
             file = request.FILES['file']
             try:
-                file_path = handle_uploaded_file(file)
-                task = import_employees_task.delay(file_path, mode='UPDATE')
+                upload, started = start_import(
+                    file, 'employees.UPDATE', lambda file_path, task_id: import_employees_task.apply_async((file_path, 'UPDATE'), task_id=task_id), request.user)
 
-                return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Import Update Process TaskID {task.id} started. Please wait..."})
+                return JsonResponse({'status': 'started', 'task_id': upload.task_id, 'duplicate': not started, 'message': f"Import Update Process TaskID {upload.task_id} started. Please wait..." if started else f"The same file was already uploaded, TaskID {upload.task_id} ({upload.status})."})
             except FileNotFoundError:
                 return JsonResponse({'status': 'error', 'message': f"EV33: {str(FileNotFoundError)}. Check file or directory location"})
             except Exception as e:
@@ -400,16 +295,11 @@ def ajx_import_update_excel_employees_celery(request):
 
 @login_required
 def ajx_tasks_status(request, task_id):
-    # task.state might return PENDING, SUCCESS, or FAILURE
-    # FAILURE triggers when function called by .delay raise an error
-    task = AsyncResult(task_id)
-
-    return JsonResponse({
-        'status': task.state,
-        'task_id': task_id,
-        # task.result has value only when function called by .delay raise an error
-        'message': str(task.result),
-    })
+    # status might be PENDING, STARTED, PROGRESS, SUCCESS, or FAILURE
+    # FAILURE triggers when function called by .delay raise an error, message has the error then
+    # progress has the rows done, estimated total and ETA while an import or export is running,
+    # result the counts of a finished import or the download reference of a finished export
+    return JsonResponse(get_task_status(task_id))
 
 # @login_required
 # def ajx_tasks_status(request, task_id):
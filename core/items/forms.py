@@ -1,4 +1,6 @@
 from django import forms
+from django.urls import reverse
+from django.utils.safestring import mark_safe
 from items.models import ItemUnit, Item, ItemPriceAdjustment
 from decimal import Decimal
 from datetime import datetime
@@ -72,5 +74,62 @@ class ItemPriceAdjustmentForm(forms.ModelForm):
         return cleaned_data
 
 
+class ItemPickerWidget(forms.Select):
+    """
+    Select that renders only the selected item instead of the whole catalog, plus a search box.
+    js/item_picker.js fills the options from items:ajx_item_search as the user types.
+    items maps item id to Item for the labels and is set through ItemChoiceField.set_items(), formsets share
+    one dict for all their rows, see transacts.forms.BaseTransactInlineFormSet. ids missing from it render no option
+    """
+
+    def __init__(self, attrs=None):
+        super().__init__(attrs={'class': 'item-picker', **(attrs or {})})
+        self.items = {}
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-url'] = reverse(
+            'items:ajx_item_search')
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        options = [self.create_option(
+            name, '', '---------', not any(value), 0)]
+
+        for index, item_id in enumerate(value, start=1):
+            if not item_id.isdigit():
+                continue
+            item = self.items.get(int(item_id))
+            if item is not None:
+                options.append(self.create_option(
+                    name, item_id, str(item), True, index))
+
+        return [(None, options, 0)]
+
+    def render(self, name, value, attrs=None, renderer=None):
+        search = '<input type="search" class="form-control form-control-sm mb-1 item-picker-search" placeholder="Search item..." autocomplete="off">'
+        return mark_safe(search + super().render(name, value, attrs, renderer))
+
+
+class ItemChoiceField(forms.ModelChoiceField):
+    # ModelChoiceField that validates against a preloaded items dict first, one get() per value otherwise
+    widget = ItemPickerWidget
+
+    def __init__(self, queryset=None, **kwargs):
+        super().__init__(queryset if queryset is not None else Item.objects.all(), **kwargs)
+        self.items = {}
+
+    def set_items(self, items):
+        self.items = items
+        self.widget.items = items
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if str(value).isdigit() and int(value) in self.items:
+            return self.items[int(value)]
+        return super().to_python(value)
+
+
 class ItemExcelUploadForm(forms.Form):
     file = forms.FileField()
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:48
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commons', '0001_trigram_extension'),
+        ('companies', '0002_search_indexes'),
+        ('items', '0002_itempriceadjustment_unique_item_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='item_name_trgm'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:36
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('items', '0004_item_name_prefix'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itemunit',
+            index=models.Index(django.db.models.functions.text.Upper('name'), name='itemunit_name_upper'),
+        ),
+    ]
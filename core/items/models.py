@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from companies.models import Company
 from decimal import Decimal
 from datetime import datetime
@@ -9,6 +11,12 @@ class ItemUnit(models.Model):
     name = models.CharField(max_length=20, unique=True)
     # CASE, ...
 
+    class Meta:
+        indexes = [
+            # UPPER(name) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('name'), name='itemunit_name_upper'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -34,6 +42,16 @@ class Item(models.Model):
         default=Decimal("0.00")
     )
 
+    class Meta:
+        indexes = [
+            # trigram index behind name__icontains searches
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='item_name_trgm'),
+            # istartswith prefix scans of the item picker, and the UPPER(name) = ANY(...) existence checks of the imports
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'),
+                         name='item_name_prefix'),
+        ]
+
     def __str__(self):
         return self.name
 
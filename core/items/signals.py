@@ -0,0 +1,33 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from items.models import Item, ItemPriceAdjustment
+from items.utils import invalidate_price_timelines
+
+
+@receiver(post_save, sender=Item)
+def invalidate_price_timeline_on_item_save(sender, instance, created, **kwargs):
+    # the original price is part of the timeline
+    if not created:
+        invalidate_price_timelines([instance.id])
+
+
+@receiver(pre_save, sender=ItemPriceAdjustment)
+def remember_price_adjustment_item(sender, instance, **kwargs):
+    # an adjustment moved to another item changes the history of both
+    if instance.pk:
+        instance._previous_item_id = ItemPriceAdjustment.objects.filter(
+            pk=instance.pk).values_list('item_id', flat=True).first()
+
+
+@receiver(post_save, sender=ItemPriceAdjustment)
+def invalidate_price_timeline_on_adjustment_save(sender, instance, **kwargs):
+    item_ids = [instance.item_id]
+    if getattr(instance, '_previous_item_id', None):
+        item_ids.append(instance._previous_item_id)
+
+    invalidate_price_timelines(item_ids)
+
+
+@receiver(post_delete, sender=ItemPriceAdjustment)
+def invalidate_price_timeline_on_adjustment_delete(sender, instance, **kwargs):
+    invalidate_price_timelines([instance.item_id])
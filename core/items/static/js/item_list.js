@@ -126,6 +126,8 @@ $(document).ready(function() {
     }
 
     function handleExport(url) {
+        // xlsx, or parquet / arrow for a typed columnar file
+        url += (url.indexOf('?') === -1 ? '?' : '&') + 'format=' + $('#export-format').val();
         $.ajax({
             url: url,
             method: 'GET',
@@ -136,19 +138,18 @@ $(document).ready(function() {
                 $("#message").removeClass();
             },
             success: function (data) {
-                $('#loader').hide();
-                if (data.status === 'success') {
-                    let downloadLink = document.getElementById('download-link');
-                    downloadLink.href = '/media/' + data.filename; 
-                    downloadLink.download = data.filename; 
-                    downloadLink.click();
-                    $("#message").addClass("alert alert-success");
-                    $('#message').text('File generated and downloaded successfully.');
-                    $('#message').show().delay(5000).slideUp(500);
+                if (data.status === 'started') {
+                    // the file is written by a celery worker, poll until it is ready
+                    $("#message").addClass("alert alert-info");
+                    $('#message').text(data.message);
+                    $('#message').show();
+                    checkExportStatus(data.task_id);
                 } else {
+                    $('#loader').hide();
                     $("#message").addClass("alert alert-warning");
                     $('#message').text('An error occurred while generating the file.');
                     $('#message').show();
+                    enableControls();
                 }
             },
             error: function () {
@@ -156,8 +157,44 @@ $(document).ready(function() {
                 $("#message").addClass("alert alert-warning");
                 $('#message').text('An error occurred while generating the file.');
                 $('#message').show();
+                enableControls();
             },
-            complete: function() {
+            complete: function() {}
+        });
+    }
+
+    function checkExportStatus(taskId) {
+        $.get('/items/ajx_tasks_status/' + taskId, function(data) {
+            if (data.status == 'SUCCESS') {
+                let downloadLink = document.getElementById('download-link');
+                downloadLink.href = data.result.url;
+                downloadLink.download = data.result.filename;
+                downloadLink.click();
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-success");
+                $('#message').text('File generated and downloaded successfully. ' + data.result.rows + ' rows.');
+                $('#message').show().delay(5000).slideUp(500);
+
+                enableControls();
+            }
+            else if (data.status == 'PENDING' || data.status == 'STARTED' || data.status == 'PROGRESS') {
+                if (data.progress) {
+                    $('#message').text('Exporting... ' + data.progress.rows + ' of about ' + data.progress.total + ' rows written.');
+                }
+                setTimeout(function() {
+                    checkExportStatus(taskId);
+                }, 2000);
+            }
+            else {
+                error_msg = data.message ?? '';
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-warning");
+                $('#message').text('An error occurred while generating the file. ' + error_msg);
+
                 enableControls();
             }
         });
@@ -235,6 +272,7 @@ $(document).ready(function() {
     function disableControls() {
         $('#export-all-btn').prop('disabled', true);
         $('#export-filtered-btn').prop('disabled', true);
+        $('#export-format').prop('disabled', true);
         $('#import-new-item-btn').prop('disabled', true);
         $('#import-update-item-btn').prop('disabled', true);
     }
@@ -242,6 +280,7 @@ $(document).ready(function() {
     function enableControls() {
         $('#export-all-btn').prop('disabled', false);
         $('#export-filtered-btn').prop('disabled', false);
+        $('#export-format').prop('disabled', false);
         $('#import-new-item-btn').prop('disabled', false);
         $('#import-update-item-btn').prop('disabled', false);
     }
@@ -263,8 +302,12 @@ $(document).ready(function() {
 
                 enableControls();
             } 
-            else if (data.status == 'PENDING') {
+            else if (data.status == 'PENDING' || data.status == 'STARTED' || data.status == 'PROGRESS') {
                 console.log('PENDING efg');
+                if (data.progress) {
+                    $('#message').text('Importing... ' + data.progress.rows + ' of about ' + (data.progress.total ?? '?') + ' rows done'
+                        + (data.progress.eta_seconds != null ? ', about ' + data.progress.eta_seconds + 's left.' : '.'));
+                }
                 setTimeout(function() {
                     checkTaskStatus(taskId);
                 }, 2000);
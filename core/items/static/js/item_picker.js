@@ -0,0 +1,36 @@
+$(document).ready(function() {
+    console.log('item_picker.js ready');
+
+    let searchTimer = null;
+
+    // delegated, so formset rows added later pick it up too
+    $(document).on('input', '.item-picker-search', function() {
+        let search = $(this);
+        let select = search.parent().find('select.item-picker').first();
+
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(function() {
+            let q = search.val().trim();
+            if (!q) {
+                return;
+            }
+
+            $.get(select.data('url'), { q: q }, function(data) {
+                // keep the current choice selectable, the rest of the options are the search results
+                let selected = select.val();
+                let selectedText = select.find('option:selected').text();
+
+                select.empty();
+                select.append($('<option>', { value: '', text: '---------' }));
+                if (selected && !data.results.some(function(item) { return String(item.id) === selected; })) {
+                    select.append($('<option>', { value: selected, text: selectedText }));
+                }
+                data.results.forEach(function(item) {
+                    select.append($('<option>', { value: item.id, text: item.text }));
+                });
+                select.val(selected);
+            });
+        }, 250);
+    });
+
+});
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from items.views import ItemListView, ItemCreateView, ItemDetailView, ItemUpdateView, ItemPriceAdjustmentListView, ItemPriceAdjustmentCreateView, ItemPriceAdjustmentDetailView, ItemPriceAdjustmentUpdateView, ajx_item_list, ajx_item_price_adjustment_list, ajx_export_excel_all_items, ajx_export_excel_filtered_items, ajx_import_insert_excel_items_celery, ajx_import_update_excel_items_celery, ajx_tasks_status
+from items.views import ItemListView, ItemCreateView, ItemDetailView, ItemUpdateView, ItemPriceAdjustmentListView, ItemPriceAdjustmentCreateView, ItemPriceAdjustmentDetailView, ItemPriceAdjustmentUpdateView, ajx_item_list, ajx_item_search, ajx_item_price_adjustment_list, ajx_export_excel_all_items, ajx_export_excel_filtered_items, ajx_import_insert_excel_items_celery, ajx_import_update_excel_items_celery, ajx_tasks_status
 
 app_name = 'items'
 
@@ -18,6 +18,7 @@ urlpatterns = [
          ItemPriceAdjustmentUpdateView.as_view(), name='item-price-adjustment-update'),
 
     path('ajx_item_list/', ajx_item_list, name='ajx_item_list'),
+    path('ajx_item_search/', ajx_item_search, name='ajx_item_search'),
     path('ajx_item_price_adjustment_list/', ajx_item_price_adjustment_list,
          name='ajx_item_price_adjustment_list'),
     path('ajx_export_excel_all_items/', ajx_export_excel_all_items,
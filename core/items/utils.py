@@ -1,15 +1,22 @@
+import hashlib
 import random
 import string
-import os
 import pandas as pd
+import pyarrow as pa
 import datetime
+from bisect import bisect_right
 from django.conf import settings
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.management.base import CommandError
-from commons.utils import should_be, parse_date
+from commons.validation import SheetValidation
+from commons.counts import bump_data_version_on_commit, get_data_version
+from commons.exports import export_queryset
+from commons.metrics import task_phase
 from items.models import Item, ItemPriceAdjustment, ItemUnit
+from transacts.models import TransactHeader, TransactDetail
+from transacts.rollups import mark_rollups_dirty
 from companies.models import Company
 
 
@@ -29,164 +36,141 @@ def load_foreign_keys():
 def verify_excel_items(df, mode='INSERT'):
     required_columns = ['NAME', 'COMPANY', 'UNIT',
                         'NUM PER UNIT', 'WEIGHT', 'ORIGINAL PRICE']
+    # every problem of the sheet is collected and raised together, see commons.validation
+    validation = SheetValidation(df, required_columns)
 
-    if not all(col in df.columns for col in required_columns):
-        missing_columns = [
-            col for col in required_columns if col not in df.columns]
-        raise CommandError(f"Missing required columns: {
-                           ', '.join(missing_columns)}")
-
-    df['NAME'] = df['NAME'].fillna('').astype(str).str.strip().str.upper()
-    df['COMPANY'] = df['COMPANY'].fillna(
-        '').astype(str).str.strip().str.upper()
-    df['UNIT'] = df['UNIT'].fillna('').astype(str).str.strip().str.upper()
-    df['NUM PER UNIT'] = df['NUM PER UNIT'].fillna(0)
-    df['WEIGHT'] = df['WEIGHT'].fillna(0)
-    df['ORIGINAL PRICE'] = df['ORIGINAL PRICE'].fillna(0)
-
-    # Validate required columns should have values
-    for col in required_columns:
-        for _, row in df.iterrows():
-            if row[col] == '':
-                raise CommandError(f"Missing values in some {col} rows.")
+    validation.clean_text(['NAME', 'COMPANY', 'UNIT'], upper=True)
+    validation.clean_numbers(['NUM PER UNIT', 'WEIGHT', 'ORIGINAL PRICE'])
+    validation.check_required(['NAME', 'COMPANY', 'UNIT'])
 
     # check columns that should be unique
-    columns_to_check = ['NAME']
-    for column in columns_to_check:
-        column_records = df[column].unique()
-        field_name = 'name'
-        if column == 'NAME':
-            field_name = 'name'
+    validation.check_unique('NAME')
     if mode == 'INSERT':
-        should_be('NOT EXISTING', Item, 'Item', field_name, column_records)
+        validation.check_existing(
+            'NAME', Item, 'Item', 'name', mode='NOT EXISTING')
     elif mode == 'UPDATE':
-        should_be('EXISTING', Item, 'Item', field_name, column_records)
+        validation.check_existing('NAME', Item, 'Item', 'name')
 
     # Verify if values exists
-    columns_to_check = ['COMPANY', 'UNIT']
-    for column in columns_to_check:
-        column_records = df[column].unique()
-        field_name = 'name'
-        if column == 'COMPANY':
-            model = Company
-            model_name = 'Company'
-        elif column == 'UNIT':
-            model = ItemUnit
-            model_name = 'ItemUnit'
-
-        should_be('EXISTING', model, model_name, field_name, column_records)
+    validation.check_existing('COMPANY', Company, 'Company', 'name')
+    validation.check_existing('UNIT', ItemUnit, 'ItemUnit', 'name')
+
+    validation.raise_problems()
 
     return df
 
 
 def verify_excel_items_price_adjustments(df, mode='INSERT'):
     required_columns = ['ITEM', 'DATE', 'NEW PRICE']
+    validation = SheetValidation(df, required_columns)
 
-    if not all(col in df.columns for col in required_columns):
-        missing_columns = [
-            col for col in required_columns if col not in df.columns]
-        raise CommandError(f"Missing required columns: {
-                           ', '.join(missing_columns)}")
-
-    df['ITEM'] = df['ITEM'].fillna('').astype(str).str.strip().str.upper()
-    df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
-    df['DATE'] = df['DATE'].map(lambda x: x.strftime('%Y-%m-%d'))
-    df['NEW PRICE'] = df['NEW PRICE'].fillna(0)
-
-    # Validate required columns should have values
-    for col in required_columns:
-        for _, row in df.iterrows():
-            if row[col] == '':
-                raise CommandError(f"Missing values in some {col} rows.")
+    validation.clean_text(['ITEM'], upper=True)
+    validation.clean_dates(['DATE'])
+    validation.clean_numbers(['NEW PRICE'])
+    validation.check_required(['ITEM'])
 
     # Verify if values exists
-    columns_to_check = ['ITEM']
-    for column in columns_to_check:
-        column_records = df[column].unique()
-        field_name = 'name'
-        if column == 'ITEM':
-            model = Item
-            model_name = 'Item'
+    validation.check_existing('ITEM', Item, 'Item', 'name')
 
-        should_be('EXISTING', model, model_name, field_name, column_records)
+    validation.raise_problems()
 
     return df
 
 
-def insert_excel_items(df):
-    # First, verify and clean the input DataFrame
-    df = verify_excel_items(df, 'INSERT')
-
-    # Load foreign key references
-    foreign_keys = load_foreign_keys()
+def insert_excel_items(df, metrics=None):
+    # metrics, a commons.metrics.TaskMetrics, times the verify, resolve and write phases
 
-    # Insert new items
-    items = []
+    # First, verify and clean the input DataFrame
+    with task_phase(metrics, 'verify'):
+        df = verify_excel_items(df, 'INSERT')
 
-    for _, row in df.iterrows():
+    with task_phase(metrics, 'resolve'):
+        # Load foreign key references
+        foreign_keys = load_foreign_keys()
 
-        # Create item instance
-        item = Item(
-            name=row['NAME'],
-            weight=row['WEIGHT'],
-            unit=None if pd.isna(foreign_keys['units'].get(
-                row['UNIT'], None)) else foreign_keys['units'].get(row['UNIT'].upper(), None),
-            num_per_unit=row['NUM PER UNIT'],
-            company=None if pd.isna(foreign_keys['companies'].get(
-                row['COMPANY'], None)) else foreign_keys['companies'].get(row['COMPANY'].upper(), None),
-            price=row['ORIGINAL PRICE']
-        )
+        # Insert new items
+        items = []
 
-        items.append(item)
+        for _, row in df.iterrows():
 
-    with transaction.atomic():
+            # Create item instance
+            item = Item(
+                name=row['NAME'],
+                weight=row['WEIGHT'],
+                unit=None if pd.isna(foreign_keys['units'].get(
+                    row['UNIT'], None)) else foreign_keys['units'].get(row['UNIT'].upper(), None),
+                num_per_unit=row['NUM PER UNIT'],
+                company=None if pd.isna(foreign_keys['companies'].get(
+                    row['COMPANY'], None)) else foreign_keys['companies'].get(row['COMPANY'].upper(), None),
+                price=row['ORIGINAL PRICE']
+            )
+
+            items.append(item)
+
+    with task_phase(metrics, 'write'), transaction.atomic():
         #
         Item.objects.bulk_create(items)
+        bump_data_version_on_commit(Item)
 
     return True
 
 
-def update_excel_items(df):
+def update_excel_items(df, metrics=None):
+    # metrics, a commons.metrics.TaskMetrics, times the verify, resolve and write phases
+
     # First, verify and clean the input DataFrame
-    df = verify_excel_items(df, 'UPDATE')
+    with task_phase(metrics, 'verify'):
+        df = verify_excel_items(df, 'UPDATE')
 
     # Load foreign key references
-    foreign_keys = load_foreign_keys()
+    with task_phase(metrics, 'resolve'):
+        foreign_keys = load_foreign_keys()
 
     # Prepare lists for bulk updates
     items_to_update = []
 
     try:
         with transaction.atomic():
-            for _, row in df.iterrows():
-                try:
-                    # Fetch the existing Item record by unique identifier
-                    item = Item.objects.select_related(
-                        'unit', 'company').get(name=row['NAME'])
-
-                    # Update Item fields
-                    item.weight = row['WEIGHT']
-                    item.unit = None if pd.isna(foreign_keys['units'].get(
-                        row['UNIT'], None)) else foreign_keys['units'].get(row['UNIT'].upper(), None)
-                    item.num_per_unit = row['NUM PER UNIT']
-                    item.company = None if pd.isna(foreign_keys['companies'].get(
-                        row['COMPANY'], None)) else foreign_keys['companies'].get(row['COMPANY'].upper(), None)
-                    item.price = row['ORIGINAL PRICE']
-
-                    items_to_update.append(item)
-
-                except ObjectDoesNotExist:
-                    # Handle the case where an employee does not exist, if needed
-                    continue
-
-            # Perform bulk update on Items
-            Item.objects.bulk_update(items_to_update, [
-                'weight',
-                'unit',
-                'num_per_unit',
-                'company',
-                'price'
-            ])
+            with task_phase(metrics, 'resolve'):
+                for _, row in df.iterrows():
+                    try:
+                        # Fetch the existing Item record by unique identifier
+                        item = Item.objects.select_related(
+                            'unit', 'company').get(name=row['NAME'])
+
+                        # Update Item fields
+                        item.weight = row['WEIGHT']
+                        item.unit = None if pd.isna(foreign_keys['units'].get(
+                            row['UNIT'], None)) else foreign_keys['units'].get(row['UNIT'].upper(), None)
+                        item.num_per_unit = row['NUM PER UNIT']
+                        item.company = None if pd.isna(foreign_keys['companies'].get(
+                            row['COMPANY'], None)) else foreign_keys['companies'].get(row['COMPANY'].upper(), None)
+                        item.price = row['ORIGINAL PRICE']
+
+                        items_to_update.append(item)
+
+                    except ObjectDoesNotExist:
+                        # Handle the case where an employee does not exist, if needed
+                        continue
+
+            with task_phase(metrics, 'write'):
+                # Perform bulk update on Items
+                Item.objects.bulk_update(items_to_update, [
+                    'weight',
+                    'unit',
+                    'num_per_unit',
+                    'company',
+                    'price'
+                ])
+                bump_data_version_on_commit(Item)
+                # bulk_update sends no post_save
+                invalidate_price_timelines(
+                    [item.id for item in items_to_update])
+                # kilos in the daily rollups and header totals follow num_per_unit and weight
+                mark_rollups_dirty(
+                    item_ids=[item.id for item in items_to_update])
+                TransactHeader.objects.filter(id__in=TransactDetail.objects.filter(
+                    item__in=items_to_update).values('transact_header_id')).refresh_totals()
 
         return True
 
@@ -211,7 +195,7 @@ def insert_excel_items_price_adjustments(df):
         item_price_adjustment = ItemPriceAdjustment(
             item=None if pd.isna(foreign_keys['items'].get(
                 row['ITEM'], None)) else foreign_keys['items'].get(row['ITEM'].upper(), None),
-            date=parse_date(row.get('DATE')),
+            date=row['DATE'],
             new_price=row['NEW PRICE']
         )
 
@@ -220,13 +204,176 @@ def insert_excel_items_price_adjustments(df):
     with transaction.atomic():
         #
         ItemPriceAdjustment.objects.bulk_create(price_adjustments)
+        bump_data_version_on_commit(ItemPriceAdjustment)
+        # bulk_create sends no post_save
+        invalidate_price_timelines(
+            [adjustment.item_id for adjustment in price_adjustments])
 
     return True
 
 
-def handle_uploaded_file(f):
-    file_path = os.path.join(settings.MEDIA_ROOT, 'uploads', f.name)
-    with open(file_path, 'wb+') as destination:
-        for chunk in f.chunks():
-            destination.write(chunk)
-    return file_path
+def price_timeline_key(item_id):
+    return f'price_timeline:{item_id}'
+
+
+def build_price_timelines(item_ids):
+    # two queries no matter how many items
+    timelines = {
+        item_id: {'price': price, 'dates': [], 'prices': []}
+        for item_id, price in Item.objects.filter(id__in=item_ids).values_list('id', 'price')
+    }
+
+    adjustments = ItemPriceAdjustment.objects.filter(
+        item_id__in=timelines.keys()).order_by('date').values_list('item_id', 'date', 'new_price')
+    for item_id, date, new_price in adjustments:
+        timelines[item_id]['dates'].append(date)
+        timelines[item_id]['prices'].append(new_price)
+
+    for timeline in timelines.values():
+        # Build remarks column
+        remarks = f"Original Price {timeline['price']}."
+        for date, new_price in zip(timeline['dates'], timeline['prices']):
+            remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
+        timeline['remarks'] = remarks
+
+    return timelines
+
+
+def get_price_timelines(item_ids):
+    """
+    Price timeline of each item keyed by item id: the original price, the adjustment dates and prices
+    sorted by date, and the pre-rendered remarks string.
+    Read from the cache in one round trip and only the missing items are rebuilt.
+    """
+    keys = {price_timeline_key(item_id): item_id for item_id in set(item_ids)}
+    cached = cache.get_many(keys.keys())
+
+    timelines = {keys[key]: timeline for key, timeline in cached.items()}
+    missing = [item_id for key, item_id in keys.items() if key not in cached]
+
+    if missing:
+        built = build_price_timelines(missing)
+        cache.set_many({price_timeline_key(item_id): timeline for item_id, timeline in built.items()},
+                       settings.PRICE_TIMELINE_CACHE_TIMEOUT)
+        timelines.update(built)
+
+    return timelines
+
+
+def invalidate_price_timelines(item_ids):
+    # after the commit, so a concurrent read cannot cache the old history again
+    keys = [price_timeline_key(item_id) for item_id in set(item_ids)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def price_on(timeline, date):
+    # price in effect on date, the original price before the first adjustment
+    position = bisect_right(timeline['dates'], date)
+    return timeline['prices'][position - 1] if position else timeline['price']
+
+
+ITEM_SEARCH_LIMIT = 20
+
+
+def search_items(query, limit=ITEM_SEARCH_LIMIT):
+    """
+    [id, name] of up to limit items for the item picker. Names starting with query come first
+    (btree prefix scan), then names containing it (trigram index) once the query is long enough.
+    Cached per query under the Item data version, so any item change drops every cached result.
+    """
+    query = query.strip().upper()
+    if not query:
+        return []
+
+    digest = hashlib.sha1(query.encode()).hexdigest()
+    key = f'item_search:{get_data_version(Item)}:{limit}:{digest}'
+
+    results = cache.get(key)
+    if results is None:
+        results = list(Item.objects.filter(name__istartswith=query).order_by(
+            'name').values_list('id', 'name')[:limit])
+
+        # trigrams need at least three characters to narrow anything down
+        if len(results) < limit and len(query) >= 3:
+            results += Item.objects.filter(name__icontains=query).exclude(
+                name__istartswith=query).order_by('name').values_list('id', 'name')[:limit - len(results)]
+
+        results = [list(result) for result in results]
+        cache.set(key, results, settings.ITEM_SEARCH_CACHE_TIMEOUT)
+
+    return results
+
+
+ITEM_EXPORT_HEADERS = ['NAME', 'COMPANY', 'UNIT',
+                       'NUM PER UNIT', 'WEIGHT', 'ORIGINAL PRICE', 'Remarks']
+ITEM_EXPORT_SCHEMA = pa.schema([
+    ('name', pa.string()),
+    ('company', pa.string()),
+    ('unit', pa.string()),
+    ('num_per_unit', pa.int64()),
+    ('weight', pa.decimal128(10, 5)),
+    ('price', pa.decimal128(10, 2)),
+    ('remarks', pa.string()),
+])
+
+
+def export_items(items, file_path, progress=None, export_format='xlsx'):
+    timelines = get_price_timelines(items.values_list('id', flat=True))
+
+    def to_row(item):
+        return [
+            item.name,
+            item.company.name if item.company else '',
+            item.unit.name if item.unit else '',
+            item.num_per_unit,
+            item.weight,
+            item.price,
+            timelines[item.id]['remarks'],
+        ]
+
+    def to_record(item):
+        return [
+            item.name,
+            item.company.name if item.company else None,
+            item.unit.name if item.unit else None,
+            item.num_per_unit,
+            item.weight,
+            item.price,
+            timelines[item.id]['remarks'],
+        ]
+
+    return export_queryset(
+        file_path, export_format, ITEM_EXPORT_HEADERS, ITEM_EXPORT_SCHEMA,
+        items.select_related('unit', 'company'), to_row, to_record, progress=progress)
+
+
+def get_item_export_queryset(params, filtered=True):
+    # params holds the DataTables request parameters (request.GET or the dict passed to the export task)
+    items = Item.objects.select_related(
+        'unit', 'company'
+    )
+
+    if filtered:
+        #
+        search_value = params.get('search[value]', '')
+        #
+        company_filter = params.getlist('company[]', [])
+        unit_filter = params.getlist('unit[]', [])
+
+        # Apply search filtering
+        if search_value:
+            items = items.filter(
+
+                Q(name__icontains=search_value)
+
+            ).distinct()
+
+        if company_filter:
+            items = items.filter(
+                company__name__in=company_filter)
+
+        if unit_filter:
+            items = items.filter(
+                unit__name__in=unit_filter)
+
+    return items
@@ -1,7 +1,11 @@
-import pandas as pd
 import os
 from django.shortcuts import render, redirect, reverse, get_object_or_404
 from django.core.paginator import Paginator
+from commons.pagination import keyset_paginate
+from commons.counts import cached_count, table_count
+from commons.exports import get_export_format
+from commons.progress import get_task_status
+from commons.uploads import start_import
 from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.utils import timezone
@@ -13,10 +17,9 @@ from django.db.models.functions import Coalesce
 from items.models import ItemUnit, Item, ItemPriceAdjustment
 from companies.models import Company
 from items.forms import ItemForm, ItemPriceAdjustmentForm, ItemExcelUploadForm
-from items.utils import insert_excel_items, update_excel_items, handle_uploaded_file
-from items.tasks import import_items_task
+from items.utils import insert_excel_items, update_excel_items, get_price_timelines, search_items
+from items.tasks import import_items_task, export_items_task
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
-from celery.result import AsyncResult
 
 
 class ItemListView(LoginRequiredMixin, ListView):
@@ -116,6 +119,14 @@ class ItemPriceAdjustmentUpdateView(LoginRequiredMixin, UpdateView):
         return super().form_invalid(form)
 
 
+@login_required
+def ajx_item_search(request):
+    # typeahead source of the item picker, see items.forms.ItemPickerWidget
+    results = search_items(request.GET.get('q', ''))
+
+    return JsonResponse({'results': [{'id': item_id, 'text': name} for item_id, name in results]})
+
+
 @login_required
 def ajx_item_list(request):
 
@@ -174,29 +185,30 @@ def ajx_item_list(request):
     items = items.select_related(
         'unit', 'company')
 
-    paginator = Paginator(items, length)
-    total_records = paginator.count
-    items_page = paginator.get_page(start // length + 1)
+    records_total = table_count(Item)
+    records_filtered = cached_count(items)
 
-    # Fetch price adjustment history for each item
-    item_ids = {i.id for i in items_page}
-    price_histories = {item_id: [] for item_id in item_ids}
+    if request.GET.get('pagination') == 'keyset':
+        # seek pagination on the whitelisted sort column plus id. the front end sends back next_cursor
+        order_field = order_column.lstrip('-')
+        if order_field not in ('id', 'name', 'company__name', 'unit__name', 'num_per_unit', 'weight'):
+            order_field = 'id'
+        items_page, next_cursor = keyset_paginate(
+            items, order_field, order_direction, length, request.GET.get('cursor'))
+    else:
+        paginator = Paginator(items, length)
+        # reuse the cached count instead of another COUNT(*)
+        paginator.count = records_filtered
+        items_page = paginator.get_page(start // length + 1)
+        next_cursor = None
 
-    adjustments = ItemPriceAdjustment.objects.filter(
-        item_id__in=item_ids).order_by('date')
-    for adj in adjustments:
-        price_histories[adj.item_id].append((adj.date, adj.new_price))
+    # cached price history and remarks of each item on the page
+    timelines = get_price_timelines([i.id for i in items_page])
 
     #
     data = []
 
     for i in items_page:
-        # Build remarks column
-        remarks = f"Original Price {i.price}."
-        if price_histories[i.id]:
-            for date, new_price in price_histories[i.id]:
-                remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
-
         data.append({
             'name': f"<a href='/items/{i.id}/'>{i.name}</a>",
             'company': i.company.name if i.company else '',
@@ -204,13 +216,14 @@ def ajx_item_list(request):
             'num_per_unit': i.num_per_unit if i.num_per_unit else 0,
             'weight': i.weight if i.weight else 0.0,
             'convert_kilo': (i.num_per_unit * i.weight) if i.num_per_unit and i.weight else 0.0,
-            'remarks': remarks
+            'remarks': timelines[i.id]['remarks']
         })
 
     response = {
         'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'next_cursor': next_cursor,
         'data': data
     }
 
@@ -256,8 +269,13 @@ def ajx_item_price_adjustment_list(request):
             order_column = f'-{order_column}'
         price_adjustments = price_adjustments.order_by(order_column)
 
-    paginator = Paginator(price_adjustments, length)
-    total_records = paginator.count
+    records_total = table_count(ItemPriceAdjustment)
+    records_filtered = cached_count(price_adjustments)
+
+    # the item name of every row comes from the same query
+    paginator = Paginator(price_adjustments.select_related('item'), length)
+    # reuse the cached count instead of another COUNT(*)
+    paginator.count = records_filtered
     price_adjustments_page = paginator.get_page(start // length + 1)
 
     #
@@ -272,8 +290,8 @@ def ajx_item_price_adjustment_list(request):
 
     response = {
         'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
         'data': data
     }
 
@@ -282,119 +300,26 @@ def ajx_item_price_adjustment_list(request):
 
 @login_required
 def ajx_export_excel_all_items(request):
+    # the worker builds the queryset and writes the file, the request only queues it
+    if get_export_format(request.GET) is None:
+        return JsonResponse({'status': 'error', 'message': "EV40: Unknown export format."})
 
-    #
-    items = Item.objects.all()
-
-    #
-    items = items.select_related(
-        'unit', 'company')
-
-    # Fetch price adjustment history for each item
-    item_ids = {i.id for i in items}
-    price_histories = {item_id: [] for item_id in item_ids}
-
-    adjustments = ItemPriceAdjustment.objects.filter(
-        item_id__in=item_ids).order_by('date')
-    for adj in adjustments:
-        price_histories[adj.item_id].append((adj.date, adj.new_price))
-
-    # Data to be exported
-    data = []
-    for item in items:
-        # Build remarks column
-        remarks = f"Original Price {item.price}."
-        if price_histories[item.id]:
-            for date, new_price in price_histories[item.id]:
-                remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
-
-        data.append({
-            'NAME': item.name,
-            'COMPANY': item.company.name,
-            'UNIT': item.unit.name,
-            'NUM PER UNIT': item.num_per_unit,
-            'WEIGHT': item.weight,
-            'ORIGINAL PRICE': item.price,
-            'Remarks': remarks
-        })
+    task = export_items_task.delay(
+        dict(request.GET.lists()), filtered=False)
 
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
-
-    # Generate the Excel file
-    filename = f"item_records_{
-        timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    df.to_excel(os.path.join('media', filename), index=False)
-
-    return JsonResponse({'filename': filename, 'status': 'success'})
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Export Process TaskID {task.id} started. Please wait..."})
 
 
 @login_required
 def ajx_export_excel_filtered_items(request):
-    #
-    search_value = request.GET.get('search[value]', '')
-    #
-    company_filter = request.GET.getlist('company[]', [])
-    unit_filter = request.GET.getlist('unit[]', [])
-
-    # Initial query with select_related for reducing the number of queries
-    items = Item.objects.select_related(
-        'unit', 'company'
-    )
-
-    # Apply search filtering
-    if search_value:
-        items = items.filter(
-
-            Q(name__icontains=search_value)
-
-        ).distinct()
-
-    if company_filter:
-        items = items.filter(
-            company__name__in=company_filter)
+    # the worker rebuilds the same filtered queryset from the DataTables parameters
+    if get_export_format(request.GET) is None:
+        return JsonResponse({'status': 'error', 'message': "EV40: Unknown export format."})
 
-    if unit_filter:
-        items = items.filter(
-            unit__name__in=unit_filter)
+    task = export_items_task.delay(
+        dict(request.GET.lists()), filtered=True)
 
-    # Fetch price adjustment history for each item
-    item_ids = {i.id for i in items}
-    price_histories = {item_id: [] for item_id in item_ids}
-
-    adjustments = ItemPriceAdjustment.objects.filter(
-        item_id__in=item_ids).order_by('date')
-    for adj in adjustments:
-        price_histories[adj.item_id].append((adj.date, adj.new_price))
-
-    # Data to be exported
-    data = []
-    for item in items:
-        # Build remarks column
-        remarks = f"Original Price {item.price}."
-        if price_histories[item.id]:
-            for date, new_price in price_histories[item.id]:
-                remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
-
-        data.append({
-            'NAME': item.name,
-            'COMPANY': item.company.name,
-            'UNIT': item.unit.name,
-            'NUM PER UNIT': item.num_per_unit,
-            'WEIGHT': item.weight,
-            'ORIGINAL PRICE': item.price,
-            'Remarks': remarks
-        })
-
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
-
-    # Generate the Excel file
-    filename = f"filtered_item_records_{
-        timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    df.to_excel(os.path.join('media', filename), index=False)
-
-    return JsonResponse({'filename': filename, 'status': 'success'})
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Export Process TaskID {task.id} started. Please wait..."})
 
 
 @login_required
@@ -405,17 +330,14 @@ def ajx_import_insert_excel_items_celery(request):
         if form.is_valid():
             file = request.FILES['file']
             try:
-                # upload the file first in our system so we can have a path
-                file_path = handle_uploaded_file(file)
-
-                # start import of data using celery
-                # this returns a task.id even if import_items_task def has only pass. This means that we don't need to return anything from this def because .delay still returns a task even if there's none. It also doesn't matter if we return True or False to the function that we're calling
-                # return JsonResponse({'status': 'testing', 'message': f"task is {task} and task.id is {task.id}"})
-                task = import_items_task.delay(file_path, mode='INSERT')
+                # upload the file first in our system so we can have a path, then start import of data using celery.
+                # the same file already imported, or still importing, returns that task instead, see commons.uploads.start_import
+                upload, started = start_import(
+                    file, 'items.INSERT', lambda file_path, task_id: import_items_task.apply_async((file_path, 'INSERT'), task_id=task_id), request.user)
 
-                return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Import Insert Process TaskID {task.id} started. Please wait..."})
+                return JsonResponse({'status': 'started', 'task_id': upload.task_id, 'duplicate': not started, 'message': f"Import Insert Process TaskID {upload.task_id} started. Please wait..." if started else f"The same file was already uploaded, TaskID {upload.task_id} ({upload.status})."})
             except FileNotFoundError:
-                # mostly it goes here if media/uploads directory doesn't exist or handle_uploaded_file not able to upload the file correctly
+                # mostly it goes here if the upload could not be stored in media/uploads
                 return JsonResponse({'status': 'error', 'message': f"EV31: {str(FileNotFoundError)}. Check file or directory location"})
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': f"EV30: {type(e)} | {str(e)}"})
@@ -431,10 +353,10 @@ def ajx_import_update_excel_items_celery(request):
         if form.is_valid():
             file = request.FILES['file']
             try:
-                file_path = handle_uploaded_file(file)
-                task = import_items_task.delay(file_path, mode='UPDATE')
+                upload, started = start_import(
+                    file, 'items.UPDATE', lambda file_path, task_id: import_items_task.apply_async((file_path, 'UPDATE'), task_id=task_id), request.user)
 
-                return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Import Update Process TaskID {task.id} started. Please wait..."})
+                return JsonResponse({'status': 'started', 'task_id': upload.task_id, 'duplicate': not started, 'message': f"Import Update Process TaskID {upload.task_id} started. Please wait..." if started else f"The same file was already uploaded, TaskID {upload.task_id} ({upload.status})."})
             except FileNotFoundError:
                 return JsonResponse({'status': 'error', 'message': f"EV33: {str(FileNotFoundError)}. Check file or directory location"})
             except Exception as e:
@@ -445,13 +367,8 @@ def ajx_import_update_excel_items_celery(request):
 
 @login_required
 def ajx_tasks_status(request, task_id):
-    # task.state might return PENDING, SUCCESS, or FAILURE
-    # FAILURE triggers when function called by .delay raise an error
-    task = AsyncResult(task_id)
-
-    return JsonResponse({
-        'status': task.state,
-        'task_id': task_id,
-        # task.result has value only when function called by .delay raise an error
-        'message': str(task.result),
-    })
+    # status might be PENDING, STARTED, PROGRESS, SUCCESS, or FAILURE
+    # FAILURE triggers when function called by .delay raise an error, message has the error then
+    # progress has the rows done, estimated total and ETA while an import or export is running,
+    # result the counts of a finished import or the download reference of a finished export
+    return JsonResponse(get_task_status(task_id))
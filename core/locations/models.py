@@ -1,9 +1,20 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 
 
 class Location(models.Model):
     name = models.CharField(max_length=200, unique=True)
     address = models.CharField(max_length=250)
 
+    class Meta:
+        indexes = [
+            # trigram index behind name__icontains searches
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                     name='location_name_trgm'),
+            # UPPER(name) = ANY(...) existence checks of the imports, see commons.utils.get_existing_names_case_insensitive
+            models.Index(Upper('name'), name='location_name_upper'),
+        ]
+
     def __str__(self):
         return f'{self.name} - {self.address}'
@@ -1,41 +1,28 @@
 import pandas as pd
 from django.db import transaction
-from django.core.management.base import CommandError
-from commons.utils import should_be
+from commons.validation import SheetValidation
+from commons.counts import bump_data_version_on_commit
 from locations.models import Location
 
 
 def verify_excel_locations(df, mode='INSERT'):
     required_columns = ['NAME', 'ADDRESS']
+    # every problem of the sheet is collected and raised together, see commons.validation
+    validation = SheetValidation(df, required_columns)
 
-    if not all(col in df.columns for col in required_columns):
-        missing_columns = [
-            col for col in required_columns if col not in df.columns]
-        raise CommandError(f"Missing required columns: {
-                           ', '.join(missing_columns)}")
-
-    df['NAME'] = df['NAME'].fillna(
-        '').astype(str).str.strip().str.upper()
-    df['ADDRESS'] = df['ADDRESS'].fillna('').astype(str).str.strip()
-
-    # Validate required columns should have values
-    for col in required_columns:
-        for _, row in df.iterrows():
-            if row[col] == '':
-                raise CommandError(f"Missing values in some {col} rows.")
+    validation.clean_text(['NAME'], upper=True)
+    validation.clean_text(['ADDRESS'])
+    validation.check_required(required_columns)
 
     # check columns that should be unique
-    columns_to_check = ['NAME']
-    for column in columns_to_check:
-        column_records = df[column].unique()
-        field_name = 'name'
-        if column == 'NAME':
-            field_name = 'name'
+    validation.check_unique('NAME')
     if mode == 'INSERT':
-        should_be('NOT EXISTING', Location, 'Location',
-                  field_name, column_records)
+        validation.check_existing(
+            'NAME', Location, 'Location', 'name', mode='NOT EXISTING')
     elif mode == 'UPDATE':
-        should_be('EXISTING', Location, 'Location', field_name, column_records)
+        validation.check_existing('NAME', Location, 'Location', 'name')
+
+    validation.raise_problems()
 
     return df
 
@@ -61,5 +48,6 @@ def insert_excel_locations(df):
     with transaction.atomic():
         #
         Location.objects.bulk_create(locations)
+        bump_data_version_on_commit(Location)
 
     return True
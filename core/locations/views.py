@@ -1,5 +1,7 @@
 from django.shortcuts import render, redirect, reverse, get_object_or_404
 from django.core.paginator import Paginator
+from commons.pagination import keyset_paginate
+from commons.counts import cached_count, table_count
 from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.contrib import messages
@@ -77,9 +79,22 @@ def ajx_location_list(request):
         order_column = f'-{order_column}'
     locations = locations.order_by(order_column)
 
-    paginator = Paginator(locations, length)
-    total_records = paginator.count
-    locations_page = paginator.get_page(start // length + 1)
+    records_total = table_count(Location)
+    records_filtered = cached_count(locations)
+
+    if request.GET.get('pagination') == 'keyset':
+        # seek pagination on the whitelisted sort column plus id. the front end sends back next_cursor
+        order_field = order_column.lstrip('-')
+        if order_field not in ('id', 'name', 'address'):
+            order_field = 'id'
+        locations_page, next_cursor = keyset_paginate(
+            locations, order_field, order_direction, length, request.GET.get('cursor'))
+    else:
+        paginator = Paginator(locations, length)
+        # reuse the cached count instead of another COUNT(*)
+        paginator.count = records_filtered
+        locations_page = paginator.get_page(start // length + 1)
+        next_cursor = None
 
     #
     data = []
@@ -92,8 +107,9 @@ def ajx_location_list(request):
 
     response = {
         'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'next_cursor': next_cursor,
         'data': data
     }
 
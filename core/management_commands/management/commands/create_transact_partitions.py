@@ -0,0 +1,27 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from transacts.partitions import add_months, ensure_month_partitions, get_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create the monthly TransactDetail partitions up to some months ahead, moving their rows out of the default partition.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='min_date', type=datetime.date.fromisoformat,
+            help='Create partitions from the month of this date (YYYY-MM-DD). Defaults to the current month.')
+        parser.add_argument(
+            '--months', type=int, default=3, help='Number of months after the current one to create partitions for.')
+
+    def handle(self, *args, **options):
+        today = datetime.date.today()
+        date_from = options['min_date'] or today
+
+        try:
+            created = ensure_month_partitions(
+                date_from, add_months(today, options['months']))
+        except Exception as e:
+            raise CommandError(f"Error creating transact partitions: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} transact partition(s). {len(get_partitions())} partition(s) in total."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from transacts.models import TransactDailyRollup
+from transacts.rollups import refresh_daily_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the TransactDailyRollup rows from the transact details.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='min_date', type=str, help='Only rebuild days on or after this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--to', dest='max_date', type=str, help='Only rebuild days on or before this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--item', dest='item_ids', type=int, action='append', help='Only rebuild rollups of this item id. Can be repeated.')
+
+    def handle(self, *args, **options):
+        try:
+            refresh_daily_rollups(
+                date_from=options['min_date'],
+                date_to=options['max_date'],
+                item_ids=options['item_ids'],
+            )
+        except Exception as e:
+            raise CommandError(f"Error rebuilding transact rollups: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt transact rollups. {TransactDailyRollup.objects.count()} rollup row(s) in total."))
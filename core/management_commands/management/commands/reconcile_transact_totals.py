@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from transacts.models import TransactHeader
+
+
+class Command(BaseCommand):
+    help = 'Recompute the line count, quantity, kilos and amount totals of the transact headers from their details.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='min_date', type=str, help='Only reconcile headers dated on or after this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--to', dest='max_date', type=str, help='Only reconcile headers dated on or before this date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        headers = TransactHeader.objects.all()
+
+        if options['min_date']:
+            headers = headers.filter(date__gte=options['min_date'])
+        if options['max_date']:
+            headers = headers.filter(date__lte=options['max_date'])
+
+        try:
+            with transaction.atomic():
+                changed = headers.refresh_totals()
+        except Exception as e:
+            raise CommandError(f"Error reconciling transact totals: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled transact totals. {changed} header(s) had drifted and were corrected."))
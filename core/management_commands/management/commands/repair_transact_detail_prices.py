@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from transacts.models import TransactDetail
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair TransactDetail.price_posted and amount from the item price adjustments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from', dest='min_date', type=str, help='Only repair transacts dated on or after this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--to', dest='max_date', type=str, help='Only repair transacts dated on or before this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--item', dest='item_ids', type=int, action='append', help='Only repair details of this item id. Can be repeated.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help='Number of rows to update per statement.')
+
+    def handle(self, *args, **options):
+        details = TransactDetail.objects.all()
+
+        if options['min_date']:
+            details = details.filter(date__gte=options['min_date'])
+        if options['max_date']:
+            details = details.filter(date__lte=options['max_date'])
+        if options['item_ids']:
+            details = details.filter(item_id__in=options['item_ids'])
+
+        try:
+            with transaction.atomic():
+                changed = details.reprice(batch_size=options['batch_size'])
+        except Exception as e:
+            raise CommandError(f"Error repairing posted prices: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Repaired posted prices of {changed} transact detail(s)."))
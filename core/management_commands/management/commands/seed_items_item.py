@@ -1,6 +1,5 @@
-import pandas as pd
 from django.core.management.base import BaseCommand, CommandError
-from django.core.exceptions import ValidationError
+from commons.imports import import_sheet
 from items.utils import insert_excel_items
 
 
@@ -14,18 +13,10 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         filename = kwargs['filename']
 
-        # Load the file into a DataFrame
-        if filename.endswith('.csv'):
-            # df = pd.read_csv(filename, engine='python',
-            #                  encoding='latin-1', date_format='%Y-%m-%d')
-            df = pd.read_csv(filename, engine='python')
-        elif filename.endswith('.xlsx'):
-            df = pd.read_excel(filename)
-        else:
-            raise CommandError("The file must be a XLSX format.")
+        if not filename.endswith(('.csv', '.xlsx')):
+            raise CommandError("The file must be a XLSX or CSV format.")
 
-        if insert_excel_items(df):
-            self.stdout.write(self.style.SUCCESS(
-                'Successfully inserted new items.'))
-        else:
-            raise CommandError("Command insert_excel_items fail")
+        # read, checked and inserted chunk by chunk in one transaction, see commons.imports.import_sheet
+        rows, results = import_sheet(filename, insert_excel_items)
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully inserted {rows} new items.'))
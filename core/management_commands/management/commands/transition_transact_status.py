@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.datastructures import MultiValueDict
+from transacts.statuses import select_transact_headers, transition_transact_status
+
+
+class Command(BaseCommand):
+    help = 'Move a set of transact headers to another status in one UPDATE, e.g. FILED to CANCELLED.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status', required=True, help='Status to move the transacts to, e.g. CANCELLED.')
+        parser.add_argument(
+            '--from-status', dest='from_statuses', action='append', help='Only move transacts in this status. Can be repeated.')
+        parser.add_argument(
+            '--id', dest='ids', type=int, action='append', help='Transact header id to move. Can be repeated.')
+        parser.add_argument(
+            '--from', dest='min_date', type=str, help='Select transacts dated on or after this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--to', dest='max_date', type=str, help='Select transacts dated on or before this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--company', dest='company_ids', type=int, action='append', help='Select transacts of this company id. Can be repeated.')
+        parser.add_argument(
+            '--search', type=str, help='Select transacts whose SI number, company or location contains this text.')
+        parser.add_argument(
+            '--dry-run', action='store_true', help='Only report what would change.')
+
+    def handle(self, *args, **options):
+        # the same selection the transact list and the bulk endpoint take
+        params = MultiValueDict({
+            'id': [str(i) for i in options['ids'] or []],
+            'minDate': [options['min_date'] or ''],
+            'maxDate': [options['max_date'] or ''],
+            'company': [str(i) for i in options['company_ids'] or []],
+            'search[value]': [options['search'] or ''],
+        })
+
+        headers = select_transact_headers(params)
+        if headers is None:
+            raise CommandError(
+                "Select the transacts with --id, --from, --to, --company or --search.")
+
+        result = transition_transact_status(
+            headers, options['status'], options['from_statuses'], dry_run=options['dry_run'])
+
+        updated_from = ', '.join(
+            f"{count} from {name}" for name, count in result['updated_from'].items()) or 'none'
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would move' if result['dry_run'] else 'Moved'} {result['updated']} of {result['matched']} matched transact(s) "
+            f"to {result['to_status']} ({updated_from}). {result['skipped']} skipped."))
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TransactsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'transacts'
+
+    def ready(self):
+        import transacts.signals
@@ -1,6 +1,17 @@
 from django import forms
+from django.db.models import F
+from django.utils.functional import cached_property
+from commons.counts import bump_data_version_on_commit
+from items.models import Item
+from items.forms import ItemChoiceField
+from items.utils import get_price_timelines, price_on
 from transacts.models import TransactStatus, TransactHeader, TransactDetail
-from django.forms import modelformset_factory, inlineformset_factory
+from django.forms import modelformset_factory, inlineformset_factory, BaseInlineFormSet
+from transacts.rollups import mark_rollups_dirty
+
+
+class TransactExcelUploadForm(forms.Form):
+    file = forms.FileField()
 
 
 class TransactHeaderForm(forms.ModelForm):
@@ -34,9 +45,122 @@ class TransactHeaderForm(forms.ModelForm):
 
 
 class TransactDetailForm(forms.ModelForm):
+    # typeahead picker instead of an <option> per catalog item on every row.
+    # kept out of Meta.fields: ItemChoiceField already checked the item exists and model validation
+    # would query it again per row, clean() puts it on the instance
+    item = ItemChoiceField()
+    field_order = ['item', 'quantity']
+
     class Meta:
         model = TransactDetail
-        fields = ['item', 'quantity']
+        fields = ['quantity']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.item_id is not None:
+            self.initial.setdefault('item', self.instance.item_id)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('item') is not None:
+            self.instance.item = cleaned_data['item']
+        return cleaned_data
+
+
+class BaseTransactInlineFormSet(BaseInlineFormSet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the header form assigns the new date before the header is saved, bulk_save() compares against this
+        self.loaded_header_date = getattr(self.instance, '_loaded_date', None)
+
+    @cached_property
+    def forms(self):
+        forms = super().forms
+
+        # the items of every row, submitted or saved, in one query. rendering and validating
+        # the rows then reads from this dict instead of querying the catalog per row
+        item_ids = {
+            int(value) for value in (form['item'].value() for form in forms)
+            if str(value).isdigit()
+        }
+        items = Item.objects.in_bulk(item_ids)
+        for form in forms:
+            form.fields['item'].set_items(items)
+
+        return forms
+
+    def bulk_save(self):
+        """
+        Save a valid formset with one bulk_create, bulk_updates and one delete instead of a statement per row,
+        then refresh the header totals and mark the rollups once. Call it inside the transaction that saved the header.
+        Posted prices follow TransactDetail.save(): resolved here for new rows and rows whose item changed, frozen otherwise.
+        A new header date is repriced by TransactHeader.save() alone, so the other changed rows keep the price it wrote.
+        """
+        header = self.instance
+        date_changed = self.loaded_header_date is not None and self.loaded_header_date != header.date
+
+        self.new_objects = []
+        self.changed_objects = []
+        self.deleted_objects = []
+
+        for form in self.initial_forms:
+            if form.instance.pk is None:
+                continue
+            if self.can_delete and self._should_delete_form(form):
+                self.deleted_objects.append(form.instance)
+            elif form.has_changed():
+                self.changed_objects.append((form.instance, form.changed_data))
+
+        for form in self.extra_forms:
+            if form.has_changed() and not (self.can_delete and self._should_delete_form(form)):
+                form.instance.transact_header = header
+                form.instance.date = header.date
+                self.new_objects.append(form.instance)
+
+        changed = [obj for obj, changed_data in self.changed_objects]
+        item_changed = [obj for obj in changed if obj.item_id != obj._loaded_item_id]
+        quantity_changed = [obj for obj in changed if obj.item_id == obj._loaded_item_id]
+
+        repriced = self.new_objects + item_changed
+        timelines = get_price_timelines({obj.item_id for obj in repriced})
+        for obj in repriced:
+            obj.price_posted = price_on(timelines[obj.item_id], header.date)
+            obj.amount = obj.quantity * obj.price_posted
+        for obj in quantity_changed:
+            # the price loaded with the row is stale once the header save repriced it for the new date
+            obj.amount = F('price_posted') * obj.quantity if date_changed else obj.quantity * obj.price_posted
+
+        # the rollup groups the rows leave and join
+        rollup_pairs = {(header.pk, obj.item_id) for obj in self.new_objects + changed} | \
+            {(header.pk, obj._loaded_item_id) for obj in changed}
+
+        if self.deleted_objects:
+            # one DELETE, TransactDetailQuerySet.delete() refreshes the totals once
+            TransactDetail.objects.filter(
+                pk__in=[obj.pk for obj in self.deleted_objects]).delete()
+        if self.new_objects:
+            TransactDetail.objects.bulk_create(self.new_objects)
+        if item_changed:
+            TransactDetail.objects.bulk_update(
+                item_changed, ['item', 'quantity', 'price_posted', 'amount'])
+        if quantity_changed:
+            TransactDetail.objects.bulk_update(
+                quantity_changed, ['quantity', 'amount'])
+
+        for obj in self.new_objects + changed:
+            obj._loaded_item_id = obj.item_id
+        if date_changed:
+            for obj in quantity_changed:
+                # the amount the F() wrote is loaded again on access
+                del obj.amount
+
+        # bulk_create and bulk_update send no signals
+        if self.new_objects or changed:
+            TransactHeader.objects.filter(pk=header.pk).refresh_totals()
+            bump_data_version_on_commit(TransactDetail)
+            mark_rollups_dirty(pairs=rollup_pairs)
+
+        return self.new_objects + changed
 
 
 # in use for extra 1
@@ -44,7 +168,8 @@ TransactInlineFormSet = inlineformset_factory(
     TransactHeader,
     TransactDetail,
     form=TransactDetailForm,
-    fields=['item', 'quantity'],
+    formset=BaseTransactInlineFormSet,
+    fields=['quantity'],
     extra=1,  # Set the number of empty forms to display
     can_delete=True,
 )
@@ -54,7 +179,8 @@ TransactInlineFormSetNoExtra = inlineformset_factory(
     TransactHeader,
     TransactDetail,
     form=TransactDetailForm,
-    fields=['item', 'quantity'],
+    formset=BaseTransactInlineFormSet,
+    fields=['quantity'],
     extra=0,  # Set the number of empty forms to display
     can_delete=True,
 )
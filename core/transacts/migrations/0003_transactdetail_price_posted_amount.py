@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:31
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacts', '0002_alter_transactheader_creator'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactdetail',
+            name='amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='transactdetail',
+            name='price_posted',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        # backfill existing rows. repair_transact_detail_prices does the same for later repairs
+        migrations.RunSQL(
+            sql="""
+                UPDATE transacts_transactdetail AS d
+                SET price_posted = p.price, amount = d.quantity * p.price
+                FROM (
+                    SELECT d2.id, COALESCE((
+                        SELECT a.new_price
+                        FROM items_itempriceadjustment AS a
+                        WHERE a.item_id = d2.item_id AND a.date <= h.date
+                        ORDER BY a.date DESC
+                        LIMIT 1
+                    ), i.price) AS price
+                    FROM transacts_transactdetail AS d2
+                    INNER JOIN items_item AS i ON i.id = d2.item_id
+                    LEFT OUTER JOIN transacts_transactheader AS h ON h.id = d2.transact_header_id
+                ) AS p
+                WHERE p.id = d.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
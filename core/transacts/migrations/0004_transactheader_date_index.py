@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:44
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacts', '0003_transactdetail_price_posted_amount'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transactheader',
+            name='date',
+            field=models.DateField(db_index=True, default=datetime.datetime.now),
+        ),
+    ]
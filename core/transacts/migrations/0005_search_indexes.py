@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:48
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        # gin_trgm_ops
+        ('commons', '0001_trigram_extension'),
+        ('transacts', '0004_transactheader_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transactheader',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('si_no'), name='gin_trgm_ops'), name='transact_si_no_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='transactheader',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('si_no'), name='text_pattern_ops'), name='transact_si_no_prefix'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 16:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_search_indexes'),
+        ('items', '0003_search_indexes'),
+        ('locations', '0002_search_indexes'),
+        ('transacts', '0005_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('line_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveBigIntegerField(default=0)),
+                ('kilos', models.DecimalField(decimal_places=5, default=Decimal('0.00000'), max_digits=18)),
+                ('amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=18)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='companies.company')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='items.item')),
+                ('location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='locations.location')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'company', 'location', 'item'), name='unique_transact_daily_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,128 @@
+import datetime
+from django.db import migrations, models
+
+
+TABLE = 'transacts_transactdetail'
+OLD_TABLE = f'{TABLE}_old'
+SEQUENCE = f'{TABLE}_id_seq'
+# months ahead of today to create partitions for, later ones come from the create_transact_partitions command
+MONTHS_AHEAD = 3
+
+
+def add_months(date, months):
+    month = date.month - 1 + months
+    return datetime.date(date.year + month // 12, month % 12 + 1, 1)
+
+
+def get_table_definition(cursor, table):
+    # index and foreign key definitions of the table, apart from the primary key
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname NOT IN ("
+        "    SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p')",
+        [table, table])
+    indexes = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table])
+    foreign_keys = cursor.fetchall()
+
+    return indexes, foreign_keys
+
+
+def rebuild_table(schema_editor, partitioned):
+    """
+    Copy transacts_transactdetail into a new table, range partitioned by month on date or a plain one again.
+    The primary key of a partitioned table has to include the partition key, so it becomes (id, date).
+    Nothing references the details, so the (id) key is not needed elsewhere.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys = get_table_definition(cursor, TABLE)
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {OLD_TABLE}")
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {OLD_TABLE} DROP CONSTRAINT {name}")
+        for index in indexes:
+            cursor.execute(
+                f"DROP INDEX {index.split(' INDEX ')[1].split(' ON ')[0]}")
+        cursor.execute(
+            f"ALTER TABLE {OLD_TABLE} ALTER COLUMN id DROP IDENTITY IF EXISTS, ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"DROP SEQUENCE IF EXISTS {SEQUENCE}")
+
+        if partitioned:
+            cursor.execute(
+                f"CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING CONSTRAINTS) PARTITION BY RANGE (date)")
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+            cursor.execute(f"SELECT MIN(date) FROM {OLD_TABLE}")
+            first_date = cursor.fetchone()[0] or datetime.date.today()
+            month = first_date.replace(day=1)
+            last_month = add_months(datetime.date.today(), MONTHS_AHEAD)
+            while month <= last_month:
+                cursor.execute(
+                    f"CREATE TABLE {TABLE}_p{month.strftime('%Y%m')} PARTITION OF {TABLE} FOR VALUES FROM (%s) TO (%s)",
+                    [month, add_months(month, 1)])
+                month = add_months(month, 1)
+        else:
+            cursor.execute(
+                f"CREATE TABLE {TABLE} (LIKE {OLD_TABLE} INCLUDING CONSTRAINTS)")
+
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {OLD_TABLE}")
+        cursor.execute(f"DROP TABLE {OLD_TABLE}")
+
+        primary_key = '(id, date)' if partitioned else '(id)'
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY {primary_key}")
+
+        for index in indexes:
+            cursor.execute(index)
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+        # a partitioned table cannot have an identity column on postgres 16, so id gets a plain sequence
+        cursor.execute(f"CREATE SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+        cursor.execute(
+            f"SELECT setval('{SEQUENCE}', COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)")
+
+        cursor.execute(f"ANALYZE {TABLE}")
+
+
+def partition_table(apps, schema_editor):
+    rebuild_table(schema_editor, partitioned=True)
+
+
+def unpartition_table(apps, schema_editor):
+    rebuild_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacts', '0006_transactdailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactdetail',
+            name='date',
+            field=models.DateField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE transacts_transactdetail d SET date = h.date
+            FROM transacts_transactheader h WHERE h.id = d.transact_header_id;
+            UPDATE transacts_transactdetail SET date = CURRENT_DATE WHERE date IS NULL;
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='transactdetail',
+            name='date',
+            field=models.DateField(db_index=True, editable=False),
+        ),
+        migrations.RunPython(partition_table, unpartition_table),
+    ]
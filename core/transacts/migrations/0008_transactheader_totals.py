@@ -0,0 +1,59 @@
+# Generated by Django 5.1.6 on 2026-10-18 17:14
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacts', '0007_transactdetail_date_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transactheader',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='transactheader',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='transactheader',
+            name='total_kilos',
+            field=models.DecimalField(decimal_places=5, default=Decimal('0.00000'), editable=False, max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='transactheader',
+            name='total_quantity',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE transacts_transactheader header SET
+                line_count = totals.line_count,
+                total_quantity = totals.total_quantity,
+                total_kilos = totals.total_kilos,
+                total_amount = totals.total_amount
+            FROM (
+                SELECT d.transact_header_id AS id,
+                       COUNT(*) AS line_count,
+                       SUM(d.quantity) AS total_quantity,
+                       SUM(d.quantity * COALESCE(i.num_per_unit, 0) * COALESCE(i.weight, 0)) AS total_kilos,
+                       SUM(d.amount) AS total_amount
+                FROM transacts_transactdetail d
+                JOIN items_item i ON i.id = d.item_id
+                GROUP BY d.transact_header_id
+            ) totals
+            WHERE header.id = totals.id;
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='transactheader',
+            index=models.Index(fields=['total_amount', 'id'], name='transact_total_amount'),
+        ),
+    ]
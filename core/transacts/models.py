@@ -1,10 +1,15 @@
 from datetime import datetime
-from django.db import models
+from decimal import Decimal
+from django.db import connection, models, transaction
+from django.db.models import F, DecimalField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from locations.models import Location
 from customers.models import Customer
 from companies.models import Company
 from employees.models import Employee
-from items.models import Item
+from items.models import Item, ItemPriceAdjustment
+from commons.counts import bump_data_version_on_commit
 
 
 class TransactStatus(models.Model):
@@ -19,9 +24,56 @@ class TransactStatus(models.Model):
         return self.name
 
 
+# columns of TransactHeader written only by TransactHeaderQuerySet.refresh_totals
+HEADER_TOTAL_FIELDS = ['line_count', 'total_quantity', 'total_kilos', 'total_amount']
+
+
+class TransactHeaderQuerySet(models.QuerySet):
+    def refresh_totals(self):
+        """
+        Recompute line_count, total_quantity, total_kilos and total_amount of every header in the queryset
+        from its details. One UPDATE that only writes the headers whose totals actually changed.
+        Call it inside the transaction that changed the details, so the totals commit with them.
+        Returns the number of headers changed.
+        """
+        header_sql, header_params = self.order_by().values('id').query.sql_with_params()
+
+        sql = f"""
+            UPDATE {TransactHeader._meta.db_table} header SET
+                line_count = totals.line_count,
+                total_quantity = totals.total_quantity,
+                total_kilos = totals.total_kilos,
+                total_amount = totals.total_amount
+            FROM (
+                SELECT h.id,
+                       COUNT(d.id) AS line_count,
+                       COALESCE(SUM(d.quantity), 0) AS total_quantity,
+                       COALESCE(SUM(d.quantity * COALESCE(i.num_per_unit, 0) * COALESCE(i.weight, 0)), 0) AS total_kilos,
+                       COALESCE(SUM(d.amount), 0) AS total_amount
+                FROM {TransactHeader._meta.db_table} h
+                LEFT JOIN {TransactDetail._meta.db_table} d ON d.transact_header_id = h.id
+                LEFT JOIN {Item._meta.db_table} i ON i.id = d.item_id
+                WHERE h.id IN ({header_sql})
+                GROUP BY h.id
+            ) totals
+            WHERE header.id = totals.id
+              AND (header.line_count, header.total_quantity, header.total_kilos, header.total_amount)
+                  IS DISTINCT FROM (totals.line_count, totals.total_quantity, totals.total_kilos, totals.total_amount)
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, header_params)
+            changed = cursor.rowcount
+
+        if changed:
+            bump_data_version_on_commit(TransactHeader)
+
+        return changed
+
+
 class TransactHeader(models.Model):
     si_no = models.CharField(max_length=100)
-    date = models.DateField(default=datetime.now)
+    date = models.DateField(default=datetime.now, db_index=True)
     creator = models.ForeignKey(Employee, on_delete=models.CASCADE,
                                 blank=True, null=True, related_name="transact_creator")
     location = models.ForeignKey(Location, on_delete=models.CASCADE)
@@ -29,16 +81,131 @@ class TransactHeader(models.Model):
         Customer, on_delete=models.CASCADE, blank=True, null=True)
     company = models.ForeignKey(Company, on_delete=models.CASCADE)
     status = models.ForeignKey(TransactStatus, on_delete=models.CASCADE)
+    # totals of the details, kept up to date by refresh_totals() in the transaction that changes them
+    line_count = models.PositiveIntegerField(default=0, editable=False)
+    total_quantity = models.PositiveBigIntegerField(default=0, editable=False)
+    total_kilos = models.DecimalField(
+        max_digits=18, decimal_places=5, default=Decimal("0.00000"), editable=False)
+    total_amount = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal("0.00"), editable=False)
+
+    objects = TransactHeaderQuerySet.as_manager()
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
                 fields=['si_no', 'company'], name='unique_transact')
         ]
+        indexes = [
+            # transact list sorted by invoice value, walked in either direction with id as the keyset tie breaker
+            models.Index(fields=['total_amount', 'id'],
+                         name='transact_total_amount'),
+            # icontains compiles to UPPER(si_no) LIKE UPPER(%...%), which a trigram index on the same expression serves
+            GinIndex(OpClass(Upper('si_no'), name='gin_trgm_ops'),
+                     name='transact_si_no_trgm'),
+            # istartswith compiles to UPPER(si_no) LIKE UPPER(...%), a btree prefix scan with text_pattern_ops
+            models.Index(OpClass(Upper('si_no'), name='text_pattern_ops'),
+                         name='transact_si_no_prefix'),
+        ]
 
     def __str__(self):
         return f"TransactHeader #{self.id} - Company: {self.company.name} - SI No: {self.si_no} - Date: {self.date} - Status: {self.status}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the loaded date so save() can tell if the details need repricing
+        instance._loaded_date = instance.__dict__.get('date')
+        # and the rollup key and status, see transacts.signals
+        instance._loaded_rollup_fields = instance.get_rollup_fields()
+        return instance
+
+    def get_rollup_fields(self):
+        return tuple(self.__dict__.get(field) for field in ('date', 'company_id', 'location_id', 'status_id'))
+
+    def save(self, *args, **kwargs):
+        date_changed = not self._state.adding and \
+            self.date != getattr(self, '_loaded_date', self.date)
+
+        # an instance loaded before its details changed holds stale totals, never write them back
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in HEADER_TOTAL_FIELDS
+            ]
+
+        # one transaction, so the rollups refreshed on commit see the repriced details
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            # details carry the header date as their partition key, and posted prices depend on it
+            if date_changed:
+                self.transactdetail_set.update(date=self.date)
+                bump_data_version_on_commit(TransactDetail)
+                self.transactdetail_set.all().reprice()
+        self._loaded_date = self.date
+        self._loaded_rollup_fields = self.get_rollup_fields()
+
+
+class TransactDetailQuerySet(models.QuerySet):
+    def with_resolved_price(self):
+        # latest price adjustment on or before the transaction date, else the item's original price
+        latest_price_adjustment = ItemPriceAdjustment.objects.filter(
+            item=OuterRef('item'),
+            date__lte=OuterRef('transact_header__date')
+        ).order_by('-date').values('new_price')[:1]
+
+        return self.annotate(
+            resolved_price=Coalesce(
+                Subquery(latest_price_adjustment, output_field=DecimalField()),
+                F('item__price')
+            )
+        )
+
+    def reprice(self, batch_size=1000):
+        # re-resolve price_posted and amount for every row in the queryset. returns the number of rows changed
+        details = self.with_resolved_price().only(
+            'id', 'transact_header', 'quantity', 'price_posted', 'amount').order_by('id')
+
+        changed = 0
+        batch = []
+        header_ids = set()
+        for detail in details.iterator(chunk_size=batch_size):
+            amount = detail.quantity * detail.resolved_price
+            if detail.price_posted == detail.resolved_price and detail.amount == amount:
+                continue
+
+            detail.price_posted = detail.resolved_price
+            detail.amount = amount
+            batch.append(detail)
+            header_ids.add(detail.transact_header_id)
+
+            if len(batch) >= batch_size:
+                TransactDetail.objects.bulk_update(
+                    batch, ['price_posted', 'amount'])
+                changed += len(batch)
+                batch = []
+
+        if batch:
+            TransactDetail.objects.bulk_update(
+                batch, ['price_posted', 'amount'])
+            changed += len(batch)
+
+        if changed:
+            bump_data_version_on_commit(TransactDetail)
+            # bulk_update sends no post_save, the headers' total_amount is refreshed here
+            TransactHeader.objects.filter(id__in=header_ids).refresh_totals()
+
+        return changed
+
+    def delete(self):
+        # the headers' totals are refreshed once for all the rows instead of by the post_delete of each
+        header_ids = set(self.values_list('transact_header_id', flat=True))
+        deleted = super().delete()
+        if header_ids:
+            TransactHeader.objects.filter(id__in=header_ids).refresh_totals()
+        return deleted
+
 
 class TransactDetail(models.Model):
     transact_header = models.ForeignKey(
@@ -46,6 +213,69 @@ class TransactDetail(models.Model):
     item = models.ForeignKey(
         Item, on_delete=models.CASCADE, related_name="transact_item")
     quantity = models.PositiveIntegerField(default=0, blank=False, null=False)
+    # frozen when the detail is created or its item/date changes. see save()
+    price_posted = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        db_index=True
+    )
+    amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal("0.00")
+    )
+    # copy of transact_header.date. the table is range partitioned by month on it, see transacts.partitions
+    date = models.DateField(editable=False, db_index=True)
+
+    objects = TransactDetailQuerySet.as_manager()
 
     def __str__(self):
         return f"TransactDetail #{self.id}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_item_id = instance.__dict__.get('item_id')
+        return instance
+
+    def resolve_price_posted(self):
+        # same cached timelines and lookup as BaseTransactInlineFormSet.bulk_save and the import.
+        # items.utils imports this module, hence the import here
+        from items.utils import get_price_timelines, price_on
+
+        date = self.transact_header.date if self.transact_header else datetime.now().date()
+        return price_on(get_price_timelines([self.item_id])[self.item_id], date)
+
+    def save(self, *args, **kwargs):
+        self.date = self.transact_header.date if self.transact_header else datetime.now().date()
+        if self._state.adding or self.item_id != getattr(self, '_loaded_item_id', None):
+            self.price_posted = self.resolve_price_posted()
+        self.amount = self.quantity * self.price_posted
+
+        super().save(*args, **kwargs)
+        self._loaded_item_id = self.item_id
+
+
+class TransactDailyRollup(models.Model):
+    # quantity, kilos and amount per day x company x location x item of every transact that is not CANCELLED.
+    # maintained by transacts.rollups, never written directly
+    date = models.DateField()
+    company = models.ForeignKey(Company, on_delete=models.CASCADE)
+    location = models.ForeignKey(Location, on_delete=models.CASCADE)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE)
+    line_count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveBigIntegerField(default=0)
+    kilos = models.DecimalField(
+        max_digits=18, decimal_places=5, default=Decimal("0.00000"))
+    amount = models.DecimalField(
+        max_digits=18, decimal_places=2, default=Decimal("0.00"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'company', 'location', 'item'], name='unique_transact_daily_rollup')
+        ]
+
+    def __str__(self):
+        return f"TransactDailyRollup {self.date} - Company: {self.company_id} - Location: {self.location_id} - Item: {self.item_id}"
@@ -0,0 +1,67 @@
+import datetime
+from django.db import connection, transaction
+from transacts.models import TransactDetail
+
+
+# TransactDetail is range partitioned by month on its date column (the header date), see migration 0007.
+# rows outside every month partition land in the default partition until their month is created
+PARTITIONED_TABLE = TransactDetail._meta.db_table
+DEFAULT_PARTITION = f'{PARTITIONED_TABLE}_default'
+
+
+def month_start(date):
+    return date.replace(day=1)
+
+
+def add_months(date, months):
+    month = date.month - 1 + months
+    return datetime.date(date.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARTITIONED_TABLE}_p{month.strftime("%Y%m")}'
+
+
+def get_partitions():
+    # names of the partitions attached to the partitioned table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass ORDER BY c.relname", [PARTITIONED_TABLE])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def create_month_partition(month):
+    """
+    Create and attach the partition of the month starting at month, moving its rows out of the default partition.
+    ATTACH builds the parent's indexes and foreign keys on it, and scans the default partition for rows of the month,
+    which finds none since they were just moved out.
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= %s AND date < %s RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved", [start, end])
+            cursor.execute(
+                f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", [start, end])
+
+    return name
+
+
+def ensure_month_partitions(date_from, date_to):
+    # partitions of every month from date_from to date_to. returns the names of the ones created
+    existing = set(get_partitions())
+    created = []
+
+    month = month_start(date_from)
+    while month <= date_to:
+        if partition_name(month) not in existing:
+            created.append(create_month_partition(month))
+        month = add_months(month, 1)
+
+    return created
@@ -0,0 +1,140 @@
+import glob
+import hashlib
+import os
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import F, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.template.loader import render_to_string
+from pypdf import PdfWriter
+from xhtml2pdf import pisa
+from transacts.models import TransactDetail
+from transacts.reports import filter_transact_headers
+
+
+TRANSACT_PDF_DIR = 'transact_pdfs'
+TRANSACT_PDF_TEMPLATE = 'transacts/transact_pdf.html'
+
+
+def filter_pdf_headers(params):
+    # batch print picks the transacts with the transact list filters
+    return filter_transact_headers(params).order_by('date', 'si_no', 'id')
+
+
+def get_pdf_details(header_ids):
+    # details of every header in one query, same columns as the transact detail page
+    details = TransactDetail.objects.select_related('item').filter(
+        transact_header_id__in=header_ids
+    ).annotate(
+        num_per_unit=Coalesce(F('item__num_per_unit'), 0),
+        weight=Coalesce(F('item__weight'), Decimal('0.0')),
+        convert_to_kilos=ExpressionWrapper(
+            F('item__num_per_unit') * F('item__weight'),
+            output_field=DecimalField()
+        ),
+        delivered_in_kilos=ExpressionWrapper(
+            F('quantity') * F('item__num_per_unit') * F('item__weight'),
+            output_field=DecimalField()
+        )
+    ).order_by('id')
+
+    details_by_header = defaultdict(list)
+    for detail in details:
+        details_by_header[detail.transact_header_id].append(detail)
+
+    return details_by_header
+
+
+def render_transact_html(header, details):
+    return render_to_string(TRANSACT_PDF_TEMPLATE, {
+        'object': header,
+        'details': details,
+        'total_quantity': sum(detail.quantity for detail in details),
+        'total_amount': sum((detail.amount for detail in details), Decimal('0.00')),
+    })
+
+
+def transact_pdf_version(html):
+    # the rendered html is the content version. any change to the header, its details,
+    # the names it shows or the template gives a new version, and nothing else does
+    return hashlib.sha1(html.encode()).hexdigest()
+
+
+def transact_pdf_path(header_id, version=None):
+    directory = os.path.join(settings.MEDIA_ROOT, TRANSACT_PDF_DIR)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"transact_{header_id}_{version or '*'}.pdf")
+
+
+def render_pdf(html, file_path):
+    # write to a temporary name first, so a concurrent reader never sees a half written pdf
+    tmp_path = f'{file_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        result = pisa.CreatePDF(html, dest=f)
+
+    if result.err:
+        os.remove(tmp_path)
+        raise ValueError(f"Error rendering {os.path.basename(file_path)}")
+
+    os.replace(tmp_path, file_path)
+
+
+def get_transact_pdf(header, details):
+    """
+    Path of the header's pdf, rendered only when no pdf of its current content version exists yet.
+    Returns the path and whether it had to be rendered.
+    """
+    html = render_transact_html(header, details)
+    file_path = transact_pdf_path(header.id, transact_pdf_version(html))
+
+    if os.path.exists(file_path):
+        return file_path, False
+
+    render_pdf(html, file_path)
+
+    # older versions of the same header can never be served again
+    for old_path in glob.glob(transact_pdf_path(header.id)):
+        if old_path != file_path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+
+    return file_path, True
+
+
+def get_transact_pdfs(headers, chunk_size=100):
+    """
+    Yield (header, path, rendered) for every header, loading headers and their details chunk_size headers at a time.
+    """
+    headers = headers.select_related(
+        'company', 'location', 'status', 'creator')
+
+    chunk = []
+    for header in headers.iterator(chunk_size=chunk_size):
+        chunk.append(header)
+        if len(chunk) >= chunk_size:
+            yield from get_transact_pdf_chunk(chunk)
+            chunk = []
+
+    if chunk:
+        yield from get_transact_pdf_chunk(chunk)
+
+
+def get_transact_pdf_chunk(headers):
+    details_by_header = get_pdf_details([header.id for header in headers])
+
+    for header in headers:
+        file_path, rendered = get_transact_pdf(
+            header, details_by_header[header.id])
+        yield header, file_path, rendered
+
+
+def merge_pdfs(paths, file_path):
+    writer = PdfWriter()
+    for path in paths:
+        writer.append(path)
+
+    with open(file_path, 'wb') as f:
+        writer.write(f)
@@ -0,0 +1,111 @@
+import datetime
+import hashlib
+import json
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from commons.counts import get_data_versions
+from locations.models import Location
+from items.models import Item
+from transacts.models import TransactDailyRollup
+
+
+# pivot rows -> (id field, name field, model of the names) on TransactDailyRollup
+PIVOT_ROWS = {
+    'location': ('location_id', 'location__name', Location),
+    'item': ('item_id', 'item__name', Item),
+}
+# delivered kilos or quantity per row and day
+PIVOT_VALUES = ['kilos', 'quantity']
+PIVOT_FILTERS = {
+    'company': 'company_id',
+    'location': 'location_id',
+    'item': 'item_id',
+}
+PIVOT_MAX_DAYS = 366
+
+
+def get_pivot_days(date_from, date_to):
+    return [day.date().isoformat() for day in pd.date_range(date_from, date_to, freq='D')]
+
+
+def build_pivot(date_from, date_to, rows='location', value='kilos', filters=None):
+    """
+    DataFrame of id, name, total and one column per day from date_from to date_to (ISO date labels),
+    one row per location or item with anything delivered in the range, sorted by name.
+    One GROUP BY on the daily rollups, reshaped with pandas. Days without deliveries are 0.
+    """
+    id_field, name_field = PIVOT_ROWS[rows][:2]
+
+    rollups = TransactDailyRollup.objects.filter(
+        date__gte=date_from, date__lte=date_to)
+    for group, ids in (filters or {}).items():
+        if ids:
+            rollups = rollups.filter(**{f'{PIVOT_FILTERS[group]}__in': ids})
+
+    records = rollups.values(id_field, name_field, 'date').annotate(
+        value=Sum(value)).order_by()
+
+    days = get_pivot_days(date_from, date_to)
+    df = pd.DataFrame.from_records(
+        list(records), columns=[id_field, name_field, 'date', 'value'])
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    # kilos are Decimal from the database, summed as float like the rollup list returns them
+    df['value'] = df['value'].astype(float if value == 'kilos' else 'int64')
+
+    pivot = df.pivot_table(
+        index=[id_field, name_field], columns='date', values='value', aggfunc='sum', fill_value=0
+    ).reindex(columns=days, fill_value=0).astype(df['value'].dtype)
+    pivot.columns.name = None
+
+    pivot.insert(0, 'total', pivot.sum(axis=1))
+    pivot = pivot.reset_index().rename(
+        columns={id_field: 'id', name_field: 'name'})
+
+    return pivot.sort_values('name', kind='stable', ignore_index=True)
+
+
+def get_pivot(date_from, date_to, rows='location', value='kilos', filters=None):
+    """
+    build_pivot cached per range, rows, value and filters. The key carries the data versions of the rollups
+    and of the row names, so any refreshed rollup or renamed location/item builds a new pivot.
+    """
+    filters = {group: sorted(ids) for group, ids in (filters or {}).items() if ids}
+    versions = get_data_versions([TransactDailyRollup, PIVOT_ROWS[rows][2]])
+    digest = hashlib.sha1(json.dumps(
+        [str(date_from), str(date_to), rows, value, filters, *versions]).encode()).hexdigest()
+    key = f'transact_pivot:{digest}'
+
+    pivot = cache.get(key)
+    if pivot is None:
+        pivot = build_pivot(date_from, date_to, rows, value, filters)
+        cache.set(key, pivot, settings.PIVOT_CACHE_TIMEOUT)
+
+    return pivot
+
+
+def parse_pivot_params(params):
+    """
+    minDate/maxDate (both required, at most PIVOT_MAX_DAYS days), rows=location|item, value=kilos|quantity
+    and repeatable company, location, item ids. Returns the get_pivot arguments, raises ValueError on a bad range.
+    """
+    try:
+        date_from = datetime.date.fromisoformat(params.get('minDate', ''))
+        date_to = datetime.date.fromisoformat(params.get('maxDate', ''))
+    except ValueError:
+        raise ValueError("minDate and maxDate are required as YYYY-MM-DD.")
+
+    if date_to < date_from:
+        raise ValueError("maxDate is before minDate.")
+    if (date_to - date_from).days + 1 > PIVOT_MAX_DAYS:
+        raise ValueError(f"The range is limited to {PIVOT_MAX_DAYS} days.")
+
+    rows = params.get('rows') if params.get('rows') in PIVOT_ROWS else 'location'
+    value = params.get('value') if params.get('value') in PIVOT_VALUES else 'kilos'
+    filters = {
+        group: [int(i) for i in params.getlist(group) if i.isdigit()]
+        for group in PIVOT_FILTERS
+    }
+
+    return date_from, date_to, rows, value, filters
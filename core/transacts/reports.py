@@ -0,0 +1,198 @@
+from decimal import Decimal
+from django.db.models import Q, F, DecimalField, ExpressionWrapper, Value
+from django.db.models.functions import Coalesce, Concat
+from companies.models import Company
+from locations.models import Location
+from items.models import Item
+from transacts.models import TransactHeader, TransactDetail
+
+
+# DataTables column -> (attribute on the row, annotation). stored columns need no annotation.
+# only the columns a request actually uses get annotated, so their joins are only paid for when needed
+REPORT_COLUMNS = {
+    'transact_id': ('transact_id', F('transact_header_id')),
+    'si_no': ('si_no', F('transact_header__si_no')),
+    'company': ('company_name', F('transact_header__company__name')),
+    'date': ('date', None),
+    'creator': ('creator_name', Concat(F('transact_header__creator__user__first_name'), Value(
+        ' '), F('transact_header__creator__user__last_name'))),
+    'location': ('location_name', F('transact_header__location__name')),
+    'item': ('item_name', F('item__name')),
+    'unit': ('unit_name', F('item__unit__name')),
+    'num_per_unit': ('num_per_unit', Coalesce(F('item__num_per_unit'), 0)),
+    'weight': ('weight', Coalesce(F('item__weight'), Decimal('0.0'))),
+    'convert_to_kilos': ('convert_to_kilos', ExpressionWrapper(
+        F('item__num_per_unit') * F('item__weight'),
+        output_field=DecimalField()
+    )),
+    'quantity': ('quantity', None),
+    'delivered_in_kilos': ('delivered_in_kilos', ExpressionWrapper(
+        F('quantity') * F('item__num_per_unit') * F('item__weight'),
+        output_field=DecimalField()
+    )),
+    'price_posted': ('price_posted', None),
+    'amount': ('amount', None),
+    # remarks come from the cached price timeline of the item, see items.utils.get_price_timelines
+    'remarks': ('item_id', None),
+}
+
+UNSORTABLE_COLUMNS = ['remarks']
+
+
+def search_transact_headers(search_value):
+    """
+    Q for the headers whose SI number, company or location contains search_value.
+    Each match is its own indexed query (trigram GIN on UPPER(name) / UPPER(si_no), then the foreign key index)
+    and the ids are unioned, instead of OR-ing icontains across joined tables, which can only seq scan.
+    """
+    header_ids = TransactHeader.objects.filter(si_no__icontains=search_value).values('id').union(
+        TransactHeader.objects.filter(company__in=Company.objects.filter(
+            name__icontains=search_value)).values('id'),
+        TransactHeader.objects.filter(location__in=Location.objects.filter(
+            name__icontains=search_value)).values('id'),
+    )
+
+    return Q(id__in=header_ids)
+
+
+def search_transact_details(search_value):
+    # details of a matching header, or of a matching item
+    detail_ids = TransactDetail.objects.filter(
+        transact_header__in=TransactHeader.objects.filter(
+            search_transact_headers(search_value))
+    ).values('id').union(
+        TransactDetail.objects.filter(item__in=Item.objects.filter(
+            name__icontains=search_value)).values('id'),
+    )
+
+    return Q(id__in=detail_ids)
+
+
+def get_column_search(params, column):
+    # DataTables per column search value, columns[i][search][value]
+    i = 0
+    while f'columns[{i}][data]' in params:
+        if params[f'columns[{i}][data]'] == column:
+            return params.get(f'columns[{i}][search][value]', '')
+        i += 1
+
+    return ''
+
+
+def filter_transact_headers(params):
+    """
+    Transact headers matching the transact list filters: search[value], the SI number column search,
+    minDate/maxDate and repeatable company ids. The batch print and the bulk status change select with it too.
+    """
+    headers = TransactHeader.objects.all()
+
+    search_value = params.get('search[value]', '')
+    if search_value:
+        # index backed search, see search_transact_headers
+        headers = headers.filter(search_transact_headers(search_value))
+
+    # SI number column search is a prefix match on the UPPER(si_no) btree
+    si_no_search = get_column_search(params, 'si_no')
+    if si_no_search:
+        headers = headers.filter(si_no__istartswith=si_no_search)
+
+    if params.get('minDate'):
+        headers = headers.filter(date__gte=params['minDate'])
+    if params.get('maxDate'):
+        headers = headers.filter(date__lte=params['maxDate'])
+
+    company_ids = [i for i in params.getlist('company') if i.isdigit()]
+    if company_ids:
+        headers = headers.filter(company_id__in=company_ids)
+
+    return headers
+
+
+def filter_transact_details(params, filtered=True):
+    """
+    Transact details matching the DataTables search and date range, without any annotation.
+    This is also the query the filtered count runs on.
+    """
+    transacts = TransactDetail.objects.all()
+
+    if not filtered:
+        return transacts
+
+    # id subqueries, so rows cannot be duplicated and no distinct() is needed
+    search_value = params.get('search[value]', '')
+    if search_value:
+        transacts = transacts.filter(search_transact_details(search_value))
+
+    # SI number column search is a prefix match on the UPPER(si_no) btree
+    si_no_search = get_column_search(params, 'si_no')
+    if si_no_search:
+        transacts = transacts.filter(
+            transact_header__si_no__istartswith=si_no_search)
+
+    # date range filter on the detail's own copy of the header date, so only the partitions of those months are scanned
+    if params.get('minDate'):
+        transacts = transacts.filter(date__gte=params['minDate'])
+
+    if params.get('maxDate'):
+        transacts = transacts.filter(date__lte=params['maxDate'])
+
+    return transacts
+
+
+def get_report_columns(params):
+    # the columns DataTables asked for, in order
+    columns = []
+    while f'columns[{len(columns)}][data]' in params:
+        columns.append(params[f'columns[{len(columns)}][data]'])
+
+    return [column for column in columns if column in REPORT_COLUMNS]
+
+
+def get_report_ordering(params):
+    order_column_index = int(params.get('order[0][column]', 0))
+    order_direction = 'desc' if params.get(
+        'order[0][dir]') == 'desc' else 'asc'
+    order_column = params.get(
+        f'columns[{order_column_index}][data]', 'transact_id')
+
+    if order_column not in REPORT_COLUMNS or order_column in UNSORTABLE_COLUMNS:
+        order_column = 'transact_id'
+
+    return order_column, order_direction
+
+
+def build_transact_detail_report(transacts, params, columns=None):
+    """
+    Annotate and sort filtered transact details for the detail list and its exports.
+    Only the requested output columns and the sort column are annotated, every column if columns is None.
+    Returns the queryset, the sort field and the sort direction.
+    """
+    order_column, order_direction = get_report_ordering(params)
+
+    columns = set(columns or REPORT_COLUMNS)
+    columns.add(order_column)
+
+    annotations = {}
+    for column in columns:
+        name, expression = REPORT_COLUMNS[column]
+        if expression is not None:
+            annotations[name] = expression
+
+    transacts = transacts.annotate(**annotations).only(
+        'transact_header', 'item', 'quantity', 'date', 'price_posted', 'amount')
+
+    order_field = REPORT_COLUMNS[order_column][0]
+
+    if order_field in ('price_posted', 'amount'):
+        # stored NOT NULL columns, no NULLS LAST needed. price_posted is indexed, so postgres can walk
+        # that index in both directions. amount has no index and is sorted
+        if order_direction == 'desc':
+            transacts = transacts.order_by(f'-{order_field}')
+        else:
+            transacts = transacts.order_by(order_field)
+    elif order_direction == 'desc':
+        transacts = transacts.order_by(F(order_field).desc(nulls_last=True))
+    else:
+        transacts = transacts.order_by(F(order_field).asc(nulls_last=True))
+
+    return transacts, order_field, order_direction
@@ -0,0 +1,149 @@
+from django.db import connection, transaction
+from commons.counts import bump_data_version_on_commit
+from items.models import Item
+from transacts.models import TransactStatus, TransactHeader, TransactDetail, TransactDailyRollup
+
+
+CANCELLED_STATUS = 'CANCELLED'
+
+
+def refresh_daily_rollups(keys=None, date_from=None, date_to=None, item_ids=None):
+    """
+    Recompute the TransactDailyRollup rows for the given (date, company_id, location_id, item_id) keys,
+    or for everything in the date range / items when keys is None (everything at all with no arguments).
+    Groups that no longer have any detail are deleted. One statement, so concurrent refreshes
+    of the same keys just upsert the same totals.
+    """
+    source_where = []
+    rollup_where = []
+    source_params = []
+    rollup_params = []
+
+    if keys is not None:
+        keys = list(keys)
+        if not keys:
+            return
+        key_arrays = [list(column) for column in zip(*keys)]
+        source_where.append(
+            "(h.date, h.company_id, h.location_id, d.item_id) IN "
+            "(SELECT * FROM unnest(%s::date[], %s::bigint[], %s::bigint[], %s::bigint[]))")
+        rollup_where.append(
+            "(r.date, r.company_id, r.location_id, r.item_id) IN "
+            "(SELECT * FROM unnest(%s::date[], %s::bigint[], %s::bigint[], %s::bigint[]))")
+        source_params += key_arrays
+        rollup_params += key_arrays
+    if date_from:
+        source_where.append("d.date >= %s")
+        rollup_where.append("r.date >= %s")
+        source_params.append(date_from)
+        rollup_params.append(date_from)
+    if date_to:
+        source_where.append("d.date <= %s")
+        rollup_where.append("r.date <= %s")
+        source_params.append(date_to)
+        rollup_params.append(date_to)
+    if item_ids:
+        item_ids = list(item_ids)
+        source_where.append("d.item_id = ANY(%s::bigint[])")
+        rollup_where.append("r.item_id = ANY(%s::bigint[])")
+        source_params.append(item_ids)
+        rollup_params.append(item_ids)
+
+    source_where = ' AND '.join(source_where) or 'TRUE'
+    rollup_where = ' AND '.join(rollup_where) or 'TRUE'
+
+    sql = f"""
+        WITH source AS (
+            SELECT h.date, h.company_id, h.location_id, d.item_id,
+                   COUNT(*) AS line_count,
+                   SUM(d.quantity) AS quantity,
+                   SUM(d.quantity * COALESCE(i.num_per_unit, 0) * COALESCE(i.weight, 0)) AS kilos,
+                   SUM(d.amount) AS amount
+            FROM {TransactDetail._meta.db_table} d
+            JOIN {TransactHeader._meta.db_table} h ON h.id = d.transact_header_id
+            JOIN {TransactStatus._meta.db_table} s ON s.id = h.status_id
+            JOIN {Item._meta.db_table} i ON i.id = d.item_id
+            WHERE s.name <> %s AND {source_where}
+            GROUP BY h.date, h.company_id, h.location_id, d.item_id
+        ), stale AS (
+            DELETE FROM {TransactDailyRollup._meta.db_table} r
+            WHERE {rollup_where} AND NOT EXISTS (
+                SELECT 1 FROM source
+                WHERE source.date = r.date AND source.company_id = r.company_id
+                  AND source.location_id = r.location_id AND source.item_id = r.item_id
+            )
+        )
+        INSERT INTO {TransactDailyRollup._meta.db_table}
+            (date, company_id, location_id, item_id, line_count, quantity, kilos, amount)
+        SELECT date, company_id, location_id, item_id, line_count, quantity, kilos, amount FROM source
+        ON CONFLICT (date, company_id, location_id, item_id) DO UPDATE SET
+            line_count = EXCLUDED.line_count,
+            quantity = EXCLUDED.quantity,
+            kilos = EXCLUDED.kilos,
+            amount = EXCLUDED.amount
+    """
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [CANCELLED_STATUS, *source_params, *rollup_params])
+        bump_data_version_on_commit(TransactDailyRollup)
+
+
+def rollup_keys_for_headers(header_ids):
+    return set(TransactDetail.objects.filter(transact_header_id__in=header_ids).values_list(
+        'transact_header__date', 'transact_header__company_id', 'transact_header__location_id', 'item_id'
+    ).distinct())
+
+
+def rollup_keys_for_pairs(pairs):
+    # (transact_header_id, item_id) -> rollup key, with the header as it is now
+    headers = {
+        header_id: (date, company_id, location_id)
+        for header_id, date, company_id, location_id in TransactHeader.objects.filter(
+            id__in={header_id for header_id, item_id in pairs}
+        ).values_list('id', 'date', 'company_id', 'location_id')
+    }
+
+    return {
+        (*headers[header_id], item_id)
+        for header_id, item_id in pairs if header_id in headers
+    }
+
+
+def get_dirty_rollups():
+    # changes are collected per connection and refreshed once, after the outermost commit
+    dirty = getattr(connection, 'dirty_transact_rollups', None)
+    if dirty is None:
+        dirty = connection.dirty_transact_rollups = {
+            'keys': set(), 'pairs': set(), 'item_ids': set()}
+    return dirty
+
+
+def flush_dirty_rollups():
+    dirty = getattr(connection, 'dirty_transact_rollups', None)
+    if not dirty:
+        return
+    del connection.dirty_transact_rollups
+
+    keys = dirty['keys'] | rollup_keys_for_pairs(dirty['pairs'])
+    if keys:
+        refresh_daily_rollups(keys=keys)
+    if dirty['item_ids']:
+        refresh_daily_rollups(item_ids=dirty['item_ids'])
+
+
+def mark_rollups_dirty(keys=(), pairs=(), item_ids=()):
+    """
+    Queue rollup keys, (transact_header_id, item_id) pairs or whole items for a refresh after commit.
+    Pairs are resolved to keys at flush time, so they follow the header's date/company/location after the change.
+    Keys of the header before the change have to be passed as keys.
+    """
+    dirty = get_dirty_rollups()
+    dirty['keys'].update(keys)
+    dirty['pairs'].update(pairs)
+    dirty['item_ids'].update(item_ids)
+
+    # on_commit callbacks of an inner savepoint that rolls back are dropped, so register on every call.
+    # the first one to run flushes everything, the rest find nothing
+    transaction.on_commit(flush_dirty_rollups)
@@ -0,0 +1,94 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from items.models import Item
+from transacts.models import TransactHeader, TransactDetail
+from transacts.rollups import mark_rollups_dirty, rollup_keys_for_headers
+
+
+# keep TransactDailyRollup in step with the transacts. see transacts.rollups
+
+@receiver(pre_save, sender=TransactHeader)
+def remember_header_rollups(sender, instance, **kwargs):
+    instance._previous_rollup_keys = None
+    if instance._state.adding:
+        # a new header has no details yet, they mark themselves
+        return
+
+    loaded = getattr(instance, '_loaded_rollup_fields', None)
+    if loaded == instance.get_rollup_fields():
+        return
+
+    # date, company, location or status changed (or unknown). the groups the header is leaving
+    # can only be read before the save, they are marked with the new ones after it
+    instance._previous_rollup_keys = rollup_keys_for_headers([instance.pk])
+
+
+@receiver(post_save, sender=TransactHeader)
+def mark_header_rollups(sender, instance, **kwargs):
+    previous_keys = getattr(instance, '_previous_rollup_keys', None)
+    if previous_keys is None:
+        return
+
+    mark_rollups_dirty(keys=previous_keys, pairs={
+        (instance.pk, item_id) for item_id in instance.transactdetail_set.values_list('item_id', flat=True)
+    })
+    instance._previous_rollup_keys = None
+
+
+@receiver(pre_delete, sender=TransactHeader)
+def remember_deleted_header_rollups(sender, instance, **kwargs):
+    instance._previous_rollup_keys = rollup_keys_for_headers([instance.pk])
+
+
+@receiver(post_delete, sender=TransactHeader)
+def mark_deleted_header_rollups(sender, instance, **kwargs):
+    mark_rollups_dirty(keys=getattr(instance, '_previous_rollup_keys', None) or ())
+
+
+@receiver(post_save, sender=TransactDetail)
+def mark_detail_rollups(sender, instance, **kwargs):
+    if instance.transact_header_id is None:
+        return
+
+    pairs = {(instance.transact_header_id, instance.item_id)}
+    # _loaded_item_id is only updated after post_save, so it is still the previous item here
+    loaded_item_id = getattr(instance, '_loaded_item_id', None)
+    if loaded_item_id and loaded_item_id != instance.item_id:
+        pairs.add((instance.transact_header_id, loaded_item_id))
+    mark_rollups_dirty(pairs=pairs)
+
+
+@receiver(post_delete, sender=TransactDetail)
+def mark_deleted_detail_rollups(sender, instance, **kwargs):
+    if instance.transact_header_id is not None:
+        mark_rollups_dirty(pairs={(instance.transact_header_id, instance.item_id)})
+
+
+@receiver(pre_save, sender=Item)
+def remember_item_kilos(sender, instance, **kwargs):
+    # kilos depend on the item's num_per_unit and weight, other item edits leave the rollups alone
+    instance._kilos_changed = not instance._state.adding and not Item.objects.filter(
+        pk=instance.pk, num_per_unit=instance.num_per_unit, weight=instance.weight).exists()
+
+
+@receiver(post_save, sender=Item)
+def mark_item_rollups(sender, instance, **kwargs):
+    if getattr(instance, '_kilos_changed', False):
+        mark_rollups_dirty(item_ids=[instance.pk])
+        TransactHeader.objects.filter(id__in=TransactDetail.objects.filter(
+            item_id=instance.pk).values('transact_header_id')).refresh_totals()
+        instance._kilos_changed = False
+
+
+# and the header totals, right away so they commit with the details. see TransactHeaderQuerySet.refresh_totals
+
+@receiver(post_save, sender=TransactDetail)
+@receiver(post_delete, sender=TransactDetail)
+def refresh_detail_header_totals(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, QuerySet) and origin.model is TransactDetail:
+        # TransactDetailQuerySet.delete() refreshes them once for all its rows
+        return
+    if instance.transact_header_id is not None:
+        TransactHeader.objects.filter(
+            pk=instance.transact_header_id).refresh_totals()
@@ -106,7 +106,100 @@ $(document).ready(function() {
         handleExport("/transacts/details/ajx_export_filtered_transact_detail_list?" + queryString);
     });
 
+    $('#import-new-transact-btn').click(function () {
+        handleImport("/transacts/details/ajx_import_insert_excel_transacts_celery");
+    });
+
+    function handleImport(url) {
+        let fileInput = document.createElement('input');
+        fileInput.type = 'file';
+        fileInput.accept = '.xlsx, .xls';
+        fileInput.onchange = function(event) {
+            let file = event.target.files[0];
+            let formData = new FormData();
+            formData.append('file', file);
+
+            $.ajax({
+                url: url,
+                type: 'POST',
+                data: formData,
+                contentType: false,
+                processData: false,
+                headers: {
+                    'X-CSRFToken': csrfToken,
+                },
+                beforeSend: function(xhr) {
+                    disableControls();
+                    $('#loader').show();
+                    $('#message').hide();
+                    $("#message").removeClass();
+                },
+                success: function(data) {
+                    if (data.status == 'started') {
+                        $("#message").addClass("alert alert-info");
+                        $('#message').text(data.message);
+                        $('#message').show();
+                        checkImportStatus(data.task_id);
+                    }
+                    else {
+                        $('#loader').hide();
+                        $("#message").addClass("alert alert-warning");
+                        $('#message').text(data.message);
+                        $('#message').show();
+                        enableControls();
+                    }
+                },
+                error: function(jqXHR, textStatus, errorThrown) {
+                    $('#loader').hide();
+                    $("#message").addClass("alert alert-warning");
+                    $('#message').text(errorThrown);
+                    $('#message').show();
+                    enableControls();
+                },
+                complete: function() {}
+            });
+        };
+        fileInput.click();
+    }
+
+    function checkImportStatus(taskId) {
+        $.get('/transacts/ajx_tasks_status/' + taskId, function(data) {
+            if (data.status == 'SUCCESS') {
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-success");
+                $('#message').text('Importing Successful. ' + data.result.details_created + ' transact details added. ' + data.result.messages.join(' '));
+                $('#message').show();
+                table.ajax.reload();
+
+                enableControls();
+            }
+            else if (data.status == 'PENDING' || data.status == 'STARTED' || data.status == 'PROGRESS') {
+                if (data.progress) {
+                    $('#message').text('Importing... ' + data.progress.rows + ' of about ' + (data.progress.total ?? '?') + ' rows done'
+                        + (data.progress.eta_seconds != null ? ', about ' + data.progress.eta_seconds + 's left.' : '.'));
+                }
+                setTimeout(function() {
+                    checkImportStatus(taskId);
+                }, 2000);
+            }
+            else {
+                error_msg = data.message ?? '';
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-warning");
+                $('#message').text('Importing Fail. ' + error_msg);
+                $('#message').show();
+
+                enableControls();
+            }
+        });
+    }
+
     function handleExport(url) {
+        // xlsx, or parquet / arrow for a typed columnar file
+        url += (url.indexOf('?') === -1 ? '?' : '&') + 'format=' + $('#export-format').val();
         $.ajax({
             url: url,
             method: 'GET',
@@ -117,19 +210,18 @@ $(document).ready(function() {
                 $("#message").removeClass();
             },
             success: function (data) {
-                $('#loader').hide();
-                if (data.status === 'success') {
-                    let downloadLink = document.getElementById('download-link');
-                    downloadLink.href = '/media/' + data.filename; 
-                    downloadLink.download = data.filename; 
-                    downloadLink.click();
-                    $("#message").addClass("alert alert-success");
-                    $('#message').text('File generated and downloaded successfully.');
-                    $('#message').show().delay(5000).slideUp(500);
+                if (data.status === 'started') {
+                    // the file is written by a celery worker, poll until it is ready
+                    $("#message").addClass("alert alert-info");
+                    $('#message').text(data.message);
+                    $('#message').show();
+                    checkExportStatus(data.task_id);
                 } else {
+                    $('#loader').hide();
                     $("#message").addClass("alert alert-warning");
                     $('#message').text('An error occurred while generating the file.');
                     $('#message').show();
+                    enableControls();
                 }
             },
             error: function () {
@@ -137,8 +229,44 @@ $(document).ready(function() {
                 $("#message").addClass("alert alert-warning");
                 $('#message').text('An error occurred while generating the file.');
                 $('#message').show();
+                enableControls();
             },
-            complete: function() {
+            complete: function() {}
+        });
+    }
+
+    function checkExportStatus(taskId) {
+        $.get('/transacts/ajx_tasks_status/' + taskId, function(data) {
+            if (data.status == 'SUCCESS') {
+                let downloadLink = document.getElementById('download-link');
+                downloadLink.href = data.result.url;
+                downloadLink.download = data.result.filename;
+                downloadLink.click();
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-success");
+                $('#message').text('File generated and downloaded successfully. ' + data.result.rows + ' rows.');
+                $('#message').show().delay(5000).slideUp(500);
+
+                enableControls();
+            }
+            else if (data.status == 'PENDING' || data.status == 'STARTED' || data.status == 'PROGRESS') {
+                if (data.progress) {
+                    $('#message').text('Exporting... ' + data.progress.rows + ' of about ' + data.progress.total + ' rows written.');
+                }
+                setTimeout(function() {
+                    checkExportStatus(taskId);
+                }, 2000);
+            }
+            else {
+                error_msg = data.message ?? '';
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-warning");
+                $('#message').text('An error occurred while generating the file. ' + error_msg);
+
                 enableControls();
             }
         });
@@ -147,14 +275,16 @@ $(document).ready(function() {
     function disableControls() {
         $('#export-all-btn').prop('disabled', true);
         $('#export-filtered-btn').prop('disabled', true);
-        // $('#import-new-employee-btn').prop('disabled', true);
+        $('#export-format').prop('disabled', true);
+        $('#import-new-transact-btn').prop('disabled', true);
         // $('#import-update-employee-btn').prop('disabled', true);
     }
 
     function enableControls() {
         $('#export-all-btn').prop('disabled', false);
         $('#export-filtered-btn').prop('disabled', false);
-        // $('#import-new-employee-btn').prop('disabled', false);
+        $('#export-format').prop('disabled', false);
+        $('#import-new-transact-btn').prop('disabled', false);
         // $('#import-update-employee-btn').prop('disabled', false);
     }
 
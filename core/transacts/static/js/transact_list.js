@@ -8,7 +8,10 @@ $(document).ready(function() {
         ajax: {
             url: "/transacts/ajx_transact_list/",
             type: 'GET',
-            data: function(d) {}
+            data: function(d) {
+                d.minDate = $('#minDate').val();
+                d.maxDate = $('#maxDate').val();
+            }
         },
         columns: [
             { data: 'transact_id' },
@@ -19,6 +22,10 @@ $(document).ready(function() {
             { data: 'location' },
             // { data: 'customer' },
             { data: 'status' },
+            { data: 'line_count' },
+            { data: 'total_quantity' },
+            { data: 'total_kilos' },
+            { data: 'total_amount' },
         ],
         layout: {
             // topStart: 'pageLength',
@@ -39,5 +46,88 @@ $(document).ready(function() {
         order: [[0, 'desc']],
         pageLength: 50,
     });
-    
+
+    $('#minDate, #maxDate').on('change', function() {
+        table.draw();
+    });
+
+    $('#print-filtered-btn').click(function () {
+        var searchParams = table.ajax.params();
+        var queryString = $.param({
+            'minDate': searchParams.minDate,
+            'maxDate': searchParams.maxDate,
+            'search[value]': searchParams.search.value,
+        });
+
+        $.ajax({
+            url: "/transacts/ajx_print_transacts/?" + queryString,
+            method: 'GET',
+            beforeSend: function(xhr) {
+                $('#print-filtered-btn').prop('disabled', true);
+                $('#loader').show();
+                $('#message').hide();
+                $("#message").removeClass();
+            },
+            success: function (data) {
+                if (data.status == 'error') {
+                    $('#loader').hide();
+                    $("#message").addClass("alert alert-warning");
+                    $('#message').text(data.message);
+                    $('#message').show();
+                    $('#print-filtered-btn').prop('disabled', false);
+                    return;
+                }
+
+                // the invoices are rendered by a celery worker, poll until the pdf is ready
+                $("#message").addClass("alert alert-info");
+                $('#message').text(data.message);
+                $('#message').show();
+                checkPrintStatus(data.task_id);
+            },
+            error: function () {
+                $('#loader').hide();
+                $("#message").addClass("alert alert-warning");
+                $('#message').text('An error occurred while generating the file.');
+                $('#message').show();
+                $('#print-filtered-btn').prop('disabled', false);
+            },
+        });
+    });
+
+    function checkPrintStatus(taskId) {
+        $.get('/transacts/ajx_tasks_status/' + taskId, function(data) {
+            if (data.status == 'SUCCESS') {
+                let downloadLink = document.getElementById('download-link');
+                downloadLink.href = data.result.url;
+                downloadLink.click();
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-success");
+                $('#message').text('File generated successfully. ' + data.result.rows + ' transacts.');
+                $('#message').show().delay(5000).slideUp(500);
+
+                $('#print-filtered-btn').prop('disabled', false);
+            }
+            else if (data.status == 'PENDING' || data.status == 'STARTED' || data.status == 'PROGRESS') {
+                if (data.progress) {
+                    $('#message').text('Printing... ' + data.progress.rows + ' of ' + data.progress.total + ' transacts.');
+                }
+                setTimeout(function() {
+                    checkPrintStatus(taskId);
+                }, 2000);
+            }
+            else {
+                error_msg = data.message ?? '';
+
+                $('#loader').hide();
+                $("#message").removeClass();
+                $("#message").addClass("alert alert-warning");
+                $('#message').text('An error occurred while generating the file. ' + error_msg);
+
+                $('#print-filtered-btn').prop('disabled', false);
+            }
+        });
+    }
+
 });
\ No newline at end of file
@@ -0,0 +1,96 @@
+from collections import Counter
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from commons.counts import bump_data_version_on_commit
+from transacts.models import TransactStatus, TransactHeader
+from transacts.reports import filter_transact_headers
+from transacts.rollups import mark_rollups_dirty, rollup_keys_for_headers
+
+
+def get_statuses(names):
+    # TransactStatus by upper cased name, raising on any name that does not exist
+    names = {name.strip().upper() for name in names if name and name.strip()}
+    statuses = {status.name: status for status in TransactStatus.objects.filter(name__in=names)}
+
+    missing = names - set(statuses)
+    if missing:
+        raise CommandError(
+            f"Unknown transact status: {', '.join(sorted(missing))}")
+
+    return statuses
+
+
+def select_transact_headers(params):
+    """
+    Headers picked by repeatable id params, else by the transact list filters (see filter_transact_headers).
+    None when neither is given, so an empty request can never select every transact.
+    """
+    ids = [i for i in params.getlist('id') if i.isdigit()]
+    if ids:
+        return TransactHeader.objects.filter(id__in=ids)
+
+    headers = filter_transact_headers(params)
+    if not headers.query.where:
+        return None
+
+    return headers
+
+
+def transition_transact_status(headers, status_name, from_status_names=None, dry_run=False):
+    """
+    Move every header of the queryset that is in one of from_status_names (any status if not given)
+    to status_name, in one UPDATE. The daily rollups of the moved headers are refreshed after commit,
+    since CANCELLED transacts drop out of them. Header totals do not depend on the status.
+    Returns the matched, updated and skipped counts, and the updated count per previous status.
+    With dry_run nothing is written and updated is what would have changed.
+    """
+    if not status_name or not status_name.strip():
+        raise CommandError("A target status is required.")
+
+    status = get_statuses([status_name])[status_name.strip().upper()]
+    from_statuses = get_statuses(from_status_names or [])
+
+    matched = headers.count()
+
+    candidates = headers.exclude(status=status)
+    if from_statuses:
+        candidates = candidates.filter(status__in=from_statuses.values())
+
+    status_names = dict(TransactStatus.objects.values_list('id', 'name'))
+
+    if dry_run:
+        previous = Counter(candidates.values_list('status_id', flat=True))
+        updated_ids = None
+    else:
+        candidate_sql, candidate_params = candidates.order_by().values('id').query.sql_with_params()
+        table = TransactHeader._meta.db_table
+
+        with transaction.atomic():
+            # the joined row is the one before the update, so RETURNING reports the status each header left
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    UPDATE {table} header SET status_id = %s
+                    FROM {table} previous
+                    WHERE previous.id = header.id AND header.id IN ({candidate_sql})
+                    RETURNING header.id, previous.status_id
+                """, [status.id, *candidate_params])
+                rows = cursor.fetchall()
+
+            updated_ids = [header_id for header_id, status_id in rows]
+            previous = Counter(status_id for header_id, status_id in rows)
+
+            # a queryset UPDATE sends no signals
+            if updated_ids:
+                bump_data_version_on_commit(TransactHeader)
+                mark_rollups_dirty(keys=rollup_keys_for_headers(updated_ids))
+
+    updated = sum(previous.values())
+
+    return {
+        'to_status': status.name,
+        'matched': matched,
+        'updated': updated,
+        'skipped': matched - updated,
+        'updated_from': {status_names[status_id]: count for status_id, count in sorted(previous.items())},
+        'dry_run': dry_run,
+    }
@@ -0,0 +1,78 @@
+from celery import shared_task
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from commons.counts import cached_count
+from commons.imports import import_sheet, import_task_progress
+from commons.exports import EXPORT_FORMATS, get_export_format, export_file_path, export_file_url, export_task_progress
+from commons.metrics import TaskMetrics
+from transacts.reports import filter_transact_details
+from transacts.pdfs import filter_pdf_headers, get_transact_pdfs, merge_pdfs
+from transacts.utils import get_transact_detail_export_queryset, export_transact_details, insert_excel_transacts, sum_import_results
+
+
+@shared_task(bind=True)
+def import_transacts_task(self, file_path):
+    # raise inside insert_excel_transacts to mark the celery task FAILURE, nothing is saved then
+    metrics = TaskMetrics('import_transacts')
+    # read and inserted chunk by chunk in one transaction, see commons.imports.import_sheet. PROGRESS after every chunk
+    rows, results = import_sheet(
+        file_path, lambda df: insert_excel_transacts(df, metrics=metrics), dtype=str, metrics=metrics,
+        progress=import_task_progress(self, file_path))
+    result = sum_import_results(results)
+
+    return {**result, **metrics.finish(result['rows'])}
+
+
+@shared_task(bind=True)
+def export_transact_details_task(self, params, filtered=False):
+    # params is dict(request.GET.lists()) from the export view, so getlist() keeps working on multi-value filters
+    params = MultiValueDict(params)
+    export_format = get_export_format(params)
+    if export_format is None:
+        raise ValueError(f"Unknown export format {params.get('format')}")
+    transacts = get_transact_detail_export_queryset(params, filtered=filtered)
+    metrics = TaskMetrics('export_transact_details')
+    with metrics.phase('count'):
+        # the unannotated filter query, so the estimate shares its cached count with the detail list
+        total = cached_count(filter_transact_details(params, filtered=filtered))
+
+    prefix = 'filtered_' if filtered else ''
+    filename = f"{prefix}transact_detail_records_{
+        timezone.now().strftime('%Y%m%d_%H%M%S')}_{self.request.id[:8]}.{EXPORT_FORMATS[export_format]}"
+
+    with metrics.phase('write'):
+        stats = export_transact_details(
+            transacts, export_file_path(filename), progress=export_task_progress(self, total), export_format=export_format)
+
+    return {'filename': filename, 'url': export_file_url(filename), **metrics.finish(stats['rows'])}
+
+
+@shared_task(bind=True)
+def print_transacts_task(self, params):
+    """
+    One pdf of every transact matching the batch print filters, see transacts.pdfs.filter_pdf_headers.
+    Each invoice is only rendered when its content changed since it was last printed.
+    """
+    params = MultiValueDict(params)
+    headers = filter_pdf_headers(params)
+    metrics = TaskMetrics('print_transacts')
+    with metrics.phase('count'):
+        total = cached_count(headers)
+    progress = export_task_progress(self, total)
+
+    paths = []
+    rendered = 0
+    progress(0)
+    with metrics.phase('render'):
+        for header, file_path, was_rendered in get_transact_pdfs(headers):
+            paths.append(file_path)
+            rendered += was_rendered
+            if len(paths) % 50 == 0:
+                progress(len(paths))
+
+    filename = f"transacts_{
+        timezone.now().strftime('%Y%m%d_%H%M%S')}_{self.request.id[:8]}.pdf"
+    with metrics.phase('merge'):
+        merge_pdfs(paths, export_file_path(filename))
+
+    return {'filename': filename, 'url': export_file_url(filename), 'rendered': rendered, **metrics.finish(len(paths))}
@@ -1,5 +1,5 @@
 from django.urls import path
-from transacts.views import TransactCreateView, TransactUpdateView, TransactListView, TransactDetailView, TransactDetailListView, ajx_transact_list, ajx_transact_detail_list, ajx_export_transact_detail_list, ajx_export_filtered_transact_detail_list
+from transacts.views import TransactCreateView, TransactUpdateView, TransactListView, TransactDetailView, TransactDetailListView, transact_pdf, ajx_transact_list, ajx_transact_detail_list, ajx_export_transact_detail_list, ajx_export_filtered_transact_detail_list, ajx_transact_rollup_list, ajx_transact_pivot, ajx_print_transacts, ajx_transact_status_transition, ajx_import_insert_excel_transacts_celery, ajx_tasks_status
 
 app_name = 'transacts'
 
@@ -8,6 +8,7 @@ urlpatterns = [
     path('create/', TransactCreateView.as_view(), name='transact-create'),
     path('<int:pk>/update/', TransactUpdateView.as_view(), name='transact-update'),
     path('<int:pk>/', TransactDetailView.as_view(), name='transact-detail'),
+    path('<int:pk>/pdf/', transact_pdf, name='transact-pdf'),
     path('ajx_transact_list/', ajx_transact_list, name='ajx_transact_list'),
     path('details/ajx_transact_detail_list/', ajx_transact_detail_list,
          name='ajx_transact_detail_list'),
@@ -15,6 +16,18 @@ urlpatterns = [
          name='ajx_export_transact_detail_list'),
     path('details/ajx_export_filtered_transact_detail_list/', ajx_export_filtered_transact_detail_list,
          name='ajx_export_filtered_transact_detail_list'),
+    path('details/ajx_import_insert_excel_transacts_celery', ajx_import_insert_excel_transacts_celery,
+         name='ajx_import_insert_excel_transacts_celery'),
+    path('ajx_print_transacts/', ajx_print_transacts,
+         name='ajx_print_transacts'),
+    path('ajx_transact_status_transition/', ajx_transact_status_transition,
+         name='ajx_transact_status_transition'),
+    path('rollups/ajx_transact_rollup_list/', ajx_transact_rollup_list,
+         name='ajx_transact_rollup_list'),
+    path('rollups/ajx_transact_pivot/', ajx_transact_pivot,
+         name='ajx_transact_pivot'),
+    path('ajx_tasks_status/<str:task_id>', ajx_tasks_status,
+         name='ajx_tasks_status'),
     path('details/', TransactDetailListView.as_view(),
          name='transact-detail-list'),
     path('', TransactListView.as_view(), name='transact-list'),
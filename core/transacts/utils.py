@@ -0,0 +1,277 @@
+import pandas as pd
+import pyarrow as pa
+from django.core.management.base import CommandError
+from django.db import connection
+from commons.counts import bump_data_version_on_commit
+from commons.exports import export_queryset
+from commons.metrics import task_phase
+from commons.validation import SheetValidation, require_columns
+from companies.models import Company
+from locations.models import Location
+from items.models import Item
+from items.utils import get_price_timelines, price_on
+from transacts.models import TransactStatus, TransactHeader, TransactDetail
+from transacts.reports import filter_transact_details, build_transact_detail_report
+from transacts.rollups import mark_rollups_dirty
+
+
+TRANSACT_DETAIL_EXPORT_HEADERS = ['DATE', 'COMPANY', 'SI NO', 'LOCATION', 'CREATED BY', 'ITEM', 'UNIT', 'PACKS PER UNIT', 'WEIGHT',
+                                  'CONVERT TO KILOS', 'QUANTITY', 'DELIVERED IN KILOS', 'PRICE POSTED', 'AMOUNT', 'REMARKS']
+TRANSACT_DETAIL_EXPORT_COLUMNS = ['date', 'company', 'si_no', 'location', 'creator', 'item', 'unit', 'num_per_unit', 'weight',
+                                  'convert_to_kilos', 'quantity', 'delivered_in_kilos', 'price_posted', 'amount', 'remarks']
+# the same columns typed for the parquet and arrow exports. kilos carry the 5 decimals of Item.weight
+TRANSACT_DETAIL_EXPORT_SCHEMA = pa.schema([
+    ('date', pa.date32()),
+    ('company', pa.string()),
+    ('si_no', pa.string()),
+    ('location', pa.string()),
+    ('creator', pa.string()),
+    ('item', pa.string()),
+    ('unit', pa.string()),
+    ('num_per_unit', pa.int64()),
+    ('weight', pa.decimal128(10, 5)),
+    ('convert_to_kilos', pa.decimal128(28, 5)),
+    ('quantity', pa.int64()),
+    ('delivered_in_kilos', pa.decimal128(38, 5)),
+    ('price_posted', pa.decimal128(10, 2)),
+    ('amount', pa.decimal128(14, 2)),
+    ('remarks', pa.string()),
+])
+
+
+def export_transact_details(transacts, file_path, progress=None, export_format='xlsx'):
+    # transacts comes from build_transact_detail_report with TRANSACT_DETAIL_EXPORT_COLUMNS
+
+    # one cached timeline per distinct item instead of rebuilding the remarks on every row
+    timelines = get_price_timelines(
+        transacts.order_by().values_list('item_id', flat=True).distinct())
+
+    def to_row(t):
+        return [
+            t.date.strftime('%Y-%m-%d'),
+            t.company_name,
+            t.si_no,
+            t.location_name,
+            t.creator_name,
+            t.item_name,
+            t.unit_name or '',
+            t.num_per_unit,
+            t.weight,
+            t.convert_to_kilos,
+            t.quantity,
+            t.delivered_in_kilos,
+            float(t.price_posted),
+            float(t.amount),
+            timelines[t.item_id]['remarks'],
+        ]
+
+    def to_record(t):
+        return [
+            t.date,
+            t.company_name,
+            t.si_no,
+            t.location_name,
+            t.creator_name,
+            t.item_name,
+            t.unit_name,
+            t.num_per_unit,
+            t.weight,
+            t.convert_to_kilos,
+            t.quantity,
+            t.delivered_in_kilos,
+            t.price_posted,
+            t.amount,
+            timelines[t.item_id]['remarks'],
+        ]
+
+    return export_queryset(
+        file_path, export_format, TRANSACT_DETAIL_EXPORT_HEADERS, TRANSACT_DETAIL_EXPORT_SCHEMA,
+        transacts, to_row, to_record, progress=progress)
+
+
+def get_transact_detail_export_queryset(params, filtered=True):
+    # params holds the DataTables request parameters (request.GET or the dict passed to the export task)
+    # the search and date range only apply to the filtered export, sorting applies to both
+    transacts, order_field, order_direction = build_transact_detail_report(
+        filter_transact_details(params, filtered=filtered), params, TRANSACT_DETAIL_EXPORT_COLUMNS)
+
+    return transacts
+
+
+TRANSACT_IMPORT_BATCH_SIZE = 5000
+
+
+def verify_excel_transacts(df):
+    required_columns = ['DATE', 'COMPANY',
+                        'SI NO', 'LOCATION', 'ITEM', 'QUANTITY']
+    require_columns(df, required_columns)
+
+    # whole column operations, no per row python
+    df = df[required_columns].copy()
+    validation = SheetValidation(df, required_columns)
+    validation.clean_dates(['DATE'])
+    validation.raise_problems()
+    df['COMPANY'] = df['COMPANY'].fillna(
+        '').astype(str).str.strip().str.upper()
+    df['SI NO'] = df['SI NO'].fillna('').astype(
+        str).str.strip().str.upper().replace(" ", "-", regex=True)
+    df['LOCATION'] = df['LOCATION'].fillna(
+        '').astype(str).str.strip().str.upper()
+    df['ITEM'] = df['ITEM'].fillna('').astype(str).str.strip().str.upper()
+    df['QUANTITY'] = pd.to_numeric(
+        df['QUANTITY'], errors='coerce').fillna(0).astype(int)
+
+    return df
+
+
+def resolve_names(model, names):
+    # name -> id for every existing name, one query per dimension
+    return dict(model.objects.filter(name__in=list(names)).values_list('name', 'id'))
+
+
+def create_transact_headers(headers, status):
+    """
+    Insert (si_no, company_id, date, location_id) headers in one statement, skipping the ones that already exist
+    on (si_no, company). Returns the ids of the headers actually inserted, which leaves out any another writer
+    created first, as bulk_create(ignore_conflicts=True) cannot tell.
+    Like bulk_create it sends no signals, the caller bumps the TransactHeader data version.
+    """
+    if not headers:
+        return []
+
+    si_nos, company_ids, dates, location_ids = (list(column) for column in zip(*headers))
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {TransactHeader._meta.db_table}
+                (si_no, company_id, date, location_id, status_id, line_count, total_quantity, total_kilos, total_amount)
+            SELECT new.si_no, new.company_id, new.date, new.location_id, %s, 0, 0, 0, 0
+            FROM unnest(%s::varchar[], %s::bigint[], %s::date[], %s::bigint[]) AS new(si_no, company_id, date, location_id)
+            ON CONFLICT (si_no, company_id) DO NOTHING
+            RETURNING id
+        """, [status.id, si_nos, company_ids, dates, location_ids])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def insert_excel_transacts(df, batch_size=TRANSACT_IMPORT_BATCH_SIZE, metrics=None):
+    """
+    Set based import of transact rows (DATE, COMPANY, SI NO, LOCATION, ITEM, QUANTITY).
+    Foreign keys are resolved with one query per dimension, the missing headers are created with one
+    INSERT (see create_transact_headers) and the details with batched bulk_create, with price_posted taken from the cached price timelines.
+    Rows of an unknown company, location or item are skipped. Details are added to headers that already exist.
+    Returns the counts and the skip messages. Run it inside transaction.atomic().
+    metrics, a commons.metrics.TaskMetrics, times the verify, resolve and write phases.
+    """
+    with task_phase(metrics, 'verify'):
+        df = verify_excel_transacts(df)
+    messages = []
+
+    with task_phase(metrics, 'resolve'):
+        status = TransactStatus.objects.filter(name="FILED").first()
+        if not status:
+            raise CommandError(
+                "TransactStatus 'FILED' not found. Please create it first.")
+
+        companies = resolve_names(Company, df['COMPANY'].unique())
+        locations = resolve_names(Location, df['LOCATION'].unique())
+        items = resolve_names(Item, df['ITEM'].unique())
+
+        df['COMPANY ID'] = df['COMPANY'].map(companies)
+        df['LOCATION ID'] = df['LOCATION'].map(locations)
+        df['ITEM ID'] = df['ITEM'].map(items)
+
+        for column, name in (('COMPANY', 'Company'), ('LOCATION', 'Location'), ('ITEM', 'Item')):
+            missing = df.loc[df[f'{column} ID'].isna(), column].value_counts()
+            for value, rows in missing.items():
+                messages.append(
+                    f"Skipping {rows} row(s): {name} '{value}' does not exist.")
+
+        df = df.dropna(subset=['COMPANY ID', 'LOCATION ID', 'ITEM ID'])
+        if df.empty:
+            return {'rows': 0, 'headers_created': 0, 'details_created': 0, 'messages': messages}
+
+        df = df.astype({'COMPANY ID': int, 'LOCATION ID': int, 'ITEM ID': int})
+
+        # headers are unique on (si_no, company), so one SI NO cannot carry two dates or locations
+        headers_df = df.drop_duplicates(
+            ['SI NO', 'COMPANY ID', 'DATE', 'LOCATION ID'])
+        conflicts = headers_df[headers_df.duplicated(
+            ['SI NO', 'COMPANY ID'], keep=False)]
+        if not conflicts.empty:
+            raise CommandError(f"The following SI NO values have more than one DATE or LOCATION: {
+                               ', '.join(sorted(set(conflicts['SI NO'] + ' ' + conflicts['COMPANY'])))}")
+
+    def load_headers():
+        return {
+            (si_no, company_id): (header_id, date, location_id)
+            for header_id, si_no, company_id, date, location_id in TransactHeader.objects.filter(
+                si_no__in=headers_df['SI NO'].unique().tolist(),
+                company_id__in=headers_df['COMPANY ID'].unique().tolist(),
+            ).values_list('id', 'si_no', 'company_id', 'date', 'location_id')
+        }
+
+    with task_phase(metrics, 'resolve'):
+        existing = load_headers()
+        new_headers = [
+            (si_no, company_id, date, location_id)
+            for si_no, company_id, date, location_id in zip(
+                *(headers_df[column].tolist() for column in ['SI NO', 'COMPANY ID', 'DATE', 'LOCATION ID']))
+            if (si_no, company_id) not in existing
+        ]
+    with task_phase(metrics, 'write'):
+        # a header created meanwhile by someone else is skipped here and picked up by the reload
+        headers_created = len(create_transact_headers(new_headers, status))
+    with task_phase(metrics, 'resolve'):
+        headers = load_headers()
+
+        mismatched = [
+            f"{si_no} {company}" for si_no, company, company_id, date, location_id in zip(
+                *(headers_df[column].tolist() for column in ['SI NO', 'COMPANY', 'COMPANY ID', 'DATE', 'LOCATION ID']))
+            if headers[(si_no, company_id)][1:] != (date, location_id)
+        ]
+        if mismatched:
+            raise CommandError(f"The following SI NO values already exist with another DATE or LOCATION: {
+                               ', '.join(sorted(mismatched))}")
+
+        timelines = get_price_timelines(df['ITEM ID'].unique().tolist())
+
+        details = []
+        rollup_keys = set()
+        # tolist() gives python ints, which the database adapter accepts and numpy ints it does not
+        for si_no, company_id, location_id, date, item_id, quantity in zip(
+                *(df[column].tolist() for column in ['SI NO', 'COMPANY ID', 'LOCATION ID', 'DATE', 'ITEM ID', 'QUANTITY'])):
+            price_posted = price_on(timelines[item_id], date)
+            details.append(TransactDetail(
+                transact_header_id=headers[(si_no, company_id)][0],
+                item_id=item_id,
+                quantity=quantity,
+                date=date,
+                price_posted=price_posted,
+                amount=quantity * price_posted,
+            ))
+            rollup_keys.add((date, company_id, location_id, item_id))
+
+    with task_phase(metrics, 'write'):
+        TransactDetail.objects.bulk_create(details, batch_size=batch_size)
+
+        # bulk_create sends no signals
+        TransactHeader.objects.filter(
+            id__in={detail.transact_header_id for detail in details}).refresh_totals()
+        bump_data_version_on_commit(TransactHeader, TransactDetail)
+        mark_rollups_dirty(keys=rollup_keys)
+
+    return {
+        'rows': len(details),
+        'headers_created': headers_created,
+        'details_created': len(details),
+        'messages': messages,
+    }
+
+
+def sum_import_results(results):
+    # the insert_excel_transacts results of the chunks of one sheet, as one
+    return {
+        'rows': sum(result['rows'] for result in results),
+        'headers_created': sum(result['headers_created'] for result in results),
+        'details_created': sum(result['details_created'] for result in results),
+        'messages': [message for result in results for message in result['messages']],
+    }
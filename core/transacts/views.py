@@ -1,25 +1,35 @@
-import pandas as pd
-import os
-from datetime import datetime
+import logging
 from decimal import Decimal
-from django.shortcuts import redirect, render
+from django.shortcuts import get_object_or_404
 # from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse, HttpResponseRedirect
+from commons.pagination import keyset_paginate
+from commons.counts import cached_count, table_count
+from commons.exports import get_export_format
+from commons.progress import get_task_status
+from commons.uploads import start_import
+from commons.queries import count_queries
+from django.http import JsonResponse, HttpResponseRedirect, FileResponse
 from django.contrib import messages
+from django.core.management.base import CommandError
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, F, Prefetch, DecimalField, ExpressionWrapper, OuterRef, Subquery, Value
-from django.db.models.functions import Coalesce, Concat
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.template.loader import get_template
+from django.db import transaction
+from django.db.models import F, DecimalField, ExpressionWrapper, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from django.urls import reverse_lazy
-from django.utils import timezone
-from transacts.models import TransactStatus, TransactHeader, TransactDetail
-from items.models import ItemPriceAdjustment
-from transacts.forms import TransactHeaderForm, TransactDetailForm, TransactInlineFormSet, TransactInlineFormSetNoExtra
-from django.views import View
-from xhtml2pdf import pisa
+from transacts.models import TransactHeader, TransactDetail, TransactDailyRollup
+from items.utils import get_price_timelines
+from transacts.reports import REPORT_COLUMNS, filter_transact_headers, filter_transact_details, get_report_columns, build_transact_detail_report
+from transacts.tasks import export_transact_details_task, print_transacts_task, import_transacts_task
+from transacts.pdfs import get_pdf_details, get_transact_pdf
+from transacts.pivots import get_pivot, parse_pivot_params
+from transacts.statuses import select_transact_headers, transition_transact_status
+from transacts.forms import TransactHeaderForm, TransactInlineFormSet, TransactInlineFormSetNoExtra, TransactExcelUploadForm
+
+
+logger = logging.getLogger(__name__)
 
 
 class TransactCreateView(LoginRequiredMixin, CreateView):
@@ -46,15 +56,21 @@ class TransactCreateView(LoginRequiredMixin, CreateView):
         formset = context['formset']
 
         if formset.is_valid():
-            transact_header = form.save()
-            formset.instance = transact_header
-            formset.save()
+            # one commit for the header and its details, so the daily rollups refresh once
+            with count_queries() as counter, transaction.atomic():
+                transact_header = form.save()
+                formset.instance = transact_header
+                formset.bulk_save()
+            logger.info(
+                f"Created transact {transact_header.id} with {len(formset.new_objects)} detail(s) in {counter.count} statements")
 
             #
             messages.success(
                 self.request, 'Transact created successfully.')
 
-            return super().form_valid(form)
+            # the header is already saved, super().form_valid() would save it a second time
+            self.object = transact_header
+            return HttpResponseRedirect(self.get_success_url())
         else:
             #
             messages.warning(self.request, 'Please check errors below')
@@ -85,18 +101,22 @@ class TransactUpdateView(LoginRequiredMixin, UpdateView):
         formset = context['formset']
 
         if formset.is_valid():
-            # Save the updated header instance
-            transact_header = form.save()
+            with count_queries() as counter, transaction.atomic():
+                # Save the updated header instance
+                transact_header = form.save()
 
-            # Save the updated details for the header instance
-            formset.instance = transact_header
-            formset.save()
+                # Save the updated details for the header instance
+                formset.instance = transact_header
+                formset.bulk_save()
+            logger.info(
+                f"Updated transact {transact_header.id}, {len(formset.new_objects)} new, {len(formset.changed_objects)} changed and {len(formset.deleted_objects)} deleted detail(s) in {counter.count} statements")
 
             #
             messages.success(
                 self.request, 'Transact updated successfully.')
 
-            return super().form_valid(form)
+            self.object = transact_header
+            return HttpResponseRedirect(self.get_success_url())
         else:
             #
             messages.warning(self.request, 'Please check errors below')
@@ -111,13 +131,7 @@ class TransactDetailView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Subquery to get the latest price adjustment before or on the transaction date
-        latest_price_adjustment = ItemPriceAdjustment.objects.filter(
-            item=OuterRef('item'),
-            date__lte=self.object.date  # Ensure we filter based on the transaction date
-        ).order_by('-date').values('new_price')[:1]
-
-        # Fetch TransactDetails with annotations
+        # Fetch TransactDetails with annotations. price_posted and amount are stored on the row
         context['details'] = TransactDetail.objects.select_related('item').filter(
             transact_header=self.object
         ).annotate(
@@ -130,16 +144,23 @@ class TransactDetailView(LoginRequiredMixin, DetailView):
             delivered_in_kilos=ExpressionWrapper(
                 F('quantity') * F('item__num_per_unit') * F('item__weight'),
                 output_field=DecimalField()
-            ),
-            price_posted=Coalesce(
-                Subquery(latest_price_adjustment, output_field=DecimalField()),
-                F('item__price')
             )
         )
 
         return context
 
 
+@login_required
+def transact_pdf(request, pk):
+    # one invoice renders quickly, and only once per content version. batches go through ajx_print_transacts
+    header = get_object_or_404(TransactHeader.objects.select_related(
+        'company', 'location', 'status', 'creator'), pk=pk)
+    file_path, rendered = get_transact_pdf(
+        header, get_pdf_details([header.id])[header.id])
+
+    return FileResponse(open(file_path, 'rb'), content_type='application/pdf', filename=f"{header.si_no}.pdf")
+
+
 class TransactListView(LoginRequiredMixin, ListView):
     model = TransactHeader
     template_name = 'transacts/transact_list.html'
@@ -156,19 +177,9 @@ def ajx_transact_list(request):
     draw = int(request.GET.get('draw', 1))
     start = int(request.GET.get('start', 0))
     length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
-
-    #
-    transacts = TransactHeader.objects.all()
 
-    if search_value:
-        transacts = transacts.filter(
-
-            Q(si_no__icontains=search_value) |
-            Q(company__name__icontains=search_value) |
-            Q(location__name__icontains=search_value)
-
-        ).distinct()
+    # search, SI number column search and date range, shared with the batch print and bulk status change
+    transacts = filter_transact_headers(request.GET)
 
     #
     order_column_index = int(request.GET.get('order[0][column]', 0))
@@ -231,11 +242,25 @@ def ajx_transact_list(request):
 
     #
     transacts = transacts.select_related(
-        'creator', 'customer', 'location', 'company', 'status')
-
-    paginator = Paginator(transacts, length)
-    total_records = paginator.count
-    transacts_page = paginator.get_page(start // length + 1)
+        'creator__user', 'customer', 'location', 'company', 'status')
+
+    records_total = table_count(TransactHeader)
+    records_filtered = cached_count(transacts)
+
+    if request.GET.get('pagination') == 'keyset':
+        # seek pagination on the whitelisted sort column plus id. the front end sends back next_cursor
+        order_field = order_column.lstrip('-')
+        if order_field not in ('id', 'si_no', 'date', 'creator__user__first_name', 'location__name', 'company__name', 'status__name',
+                               'line_count', 'total_quantity', 'total_kilos', 'total_amount'):
+            order_field = 'id'
+        transacts_page, next_cursor = keyset_paginate(
+            transacts, order_field, order_direction, length, request.GET.get('cursor'))
+    else:
+        paginator = Paginator(transacts, length)
+        # reuse the cached count instead of another COUNT(*)
+        paginator.count = records_filtered
+        transacts_page = paginator.get_page(start // length + 1)
+        next_cursor = None
 
     #
     data = []
@@ -244,7 +269,7 @@ def ajx_transact_list(request):
         fullname_creator = ''
         if t.creator:
             fullname_creator = f'{t.creator.user.first_name} {t.creator.user.last_name}'
-            fullname_creator = f'{fullname_creator} {t.creator.user.employee.middle_name}' if t.creator.user.employee.middle_name else fullname_creator
+            fullname_creator = f'{fullname_creator} {t.creator.middle_name}' if t.creator.middle_name else fullname_creator
 
         fullname_customer = ''
         if t.customer:
@@ -261,13 +286,18 @@ def ajx_transact_list(request):
             'location': t.location.name if t.location else '',
             # 'customer': fullname_customer,
             'status': t.status.name if t.status else '',
+            'line_count': t.line_count,
+            'total_quantity': t.total_quantity,
+            'total_kilos': float(t.total_kilos),
+            'total_amount': float(t.total_amount),
 
         })
 
     response = {
         'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'next_cursor': next_cursor,
         'data': data
     }
 
@@ -279,129 +309,55 @@ def ajx_transact_detail_list(request):
     draw = int(request.GET.get('draw', 1))
     start = int(request.GET.get('start', 0))
     length = int(request.GET.get('length', 10))
-    search_value = request.GET.get('search[value]', '')
 
-    # Subquery to get the most recent price adjustment before or on the transaction date
-    latest_price_adjustment = ItemPriceAdjustment.objects.filter(
-        item=OuterRef('item'),
-        date__lte=OuterRef('transact_header__date')
-    ).order_by('-date').values('new_price')[:1]
-
-    transacts = TransactDetail.objects.select_related(
-        'transact_header__creator',
-        'transact_header__company',
-        'transact_header__location',
-        'item'
-    ).annotate(
-        transact_id=F('transact_header__id'),
-        si_no=F('transact_header__si_no'),
-        company_name=F('transact_header__company__name'),
-        date=F('transact_header__date'),
-        creator_name=Concat(F('transact_header__creator__user__first_name'), Value(
-            ' '), F('transact_header__creator__user__last_name')),
-        location_name=F('transact_header__location__name'),
-        num_per_unit=Coalesce(F('item__num_per_unit'), 0),
-        weight=Coalesce(F('item__weight'), Decimal('0.0')),
-        convert_to_kilos=ExpressionWrapper(
-            F('item__num_per_unit') * F('item__weight'),
-            output_field=DecimalField()
-        ),
-        delivered_in_kilos=ExpressionWrapper(
-            F('quantity') * F('item__num_per_unit') * F('item__weight'),
-            output_field=DecimalField()
-        ),
-        price_posted=Coalesce(Subquery(
-            latest_price_adjustment, output_field=DecimalField()), F('item__price'))
-    )
+    # only the columns this table shows and sorts on get annotated
+    columns = get_report_columns(request.GET)
+    filtered_transacts = filter_transact_details(request.GET)
+    transacts, order_column, order_direction = build_transact_detail_report(
+        filtered_transacts, request.GET, columns)
 
-    if search_value:
-        transacts = transacts.filter(
-            Q(transact_header__si_no__icontains=search_value) |
-            Q(transact_header__company__name__icontains=search_value) |
-            Q(transact_header__location__name__icontains=search_value) |
-            Q(item__name__icontains=search_value)
-        ).distinct()
-
-    # date range filter
-    if request.GET.get('minDate'):
-        min_date = request.GET['minDate']
-        transacts = transacts.filter(date__gte=min_date)
+    records_total = table_count(TransactDetail)
+    # counted without the annotations, so the same count is shared by every sorting and projection
+    records_filtered = cached_count(filtered_transacts)
 
-    if request.GET.get('maxDate'):
-        max_date = request.GET['maxDate']
-        transacts = transacts.filter(date__lte=max_date)
-
-    # Sorting Fix
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_direction = request.GET.get('order[0][dir]', 'asc')
-    order_column = request.GET.get(
-        f'columns[{order_column_index}][data]', 'transact_id')
-
-    column_map = {
-        'transact_id': 'transact_id',
-        'si_no': 'si_no',
-        'company': 'company_name',
-        'date': 'date',
-        'creator': 'creator_name',
-        'location': 'location_name',
-        'item': 'item__name',
-        'num_per_unit': 'num_per_unit',
-        'weight': 'weight',
-        'convert_to_kilos': 'convert_to_kilos',
-        'quantity': 'quantity',
-        'delivered_in_kilos': 'delivered_in_kilos',
-        'price_posted': 'price_posted',
-    }
-
-    order_column = column_map.get(order_column, 'transact_id')
-
-    if order_direction == 'desc':
-        transacts = transacts.order_by(F(order_column).desc(nulls_last=True))
+    if request.GET.get('pagination') == 'keyset':
+        # seek pagination on the sort column plus id. the report builder already whitelists the sort column
+        transacts_page, next_cursor = keyset_paginate(
+            transacts, order_column, order_direction, length, request.GET.get('cursor'))
     else:
-        transacts = transacts.order_by(F(order_column).asc(nulls_last=True))
-
-    paginator = Paginator(transacts, length)
-    total_records = paginator.count
-    transacts_page = paginator.get_page(start // length + 1)
+        paginator = Paginator(transacts, length)
+        # reuse the cached count instead of another COUNT(*)
+        paginator.count = records_filtered
+        transacts_page = paginator.get_page(start // length + 1)
+        next_cursor = None
 
-    # Fetch price adjustment history for each item
-    item_ids = {t.item.id for t in transacts_page}
-    price_histories = {item_id: [] for item_id in item_ids}
-
-    adjustments = ItemPriceAdjustment.objects.filter(
-        item_id__in=item_ids).order_by('date')
-    for adj in adjustments:
-        price_histories[adj.item_id].append((adj.date, adj.new_price))
+    # cached price history and remarks of each item on the page
+    timelines = get_price_timelines(
+        [t.item_id for t in transacts_page]) if 'remarks' in columns else {}
 
     data = []
     for t in transacts_page:
-        # Build remarks column
-        remarks = f"Original Price {t.item.price}."
-        if price_histories[t.item.id]:
-            for date, new_price in price_histories[t.item.id]:
-                remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
-
-        data.append({
-            'transact_id': f"<a href='/transacts/{t.transact_id}/'>{t.transact_id}</a>",
-            'si_no': t.si_no,
-            'company': t.company_name,
-            'date': t.date.strftime('%Y-%m-%d'),
-            'creator': t.creator_name,
-            'location': t.location_name,
-            'item': t.item.name,
-            'num_per_unit': t.num_per_unit,
-            'weight': t.weight,
-            'convert_to_kilos': t.convert_to_kilos,
-            'quantity': t.quantity,
-            'delivered_in_kilos': t.delivered_in_kilos,
-            'price_posted': float(t.price_posted),
-            'remarks': remarks
-        })
+        row = {column: getattr(t, REPORT_COLUMNS[column][0])
+               for column in columns}
+
+        if 'transact_id' in row:
+            row['transact_id'] = f"<a href='/transacts/{t.transact_id}/'>{t.transact_id}</a>"
+        if 'date' in row:
+            row['date'] = t.date.strftime('%Y-%m-%d')
+        if 'price_posted' in row:
+            row['price_posted'] = float(t.price_posted)
+        if 'amount' in row:
+            row['amount'] = float(t.amount)
+        if 'remarks' in row:
+            row['remarks'] = timelines[t.item_id]['remarks']
+
+        data.append(row)
 
     response = {
         'draw': draw,
-        'recordsTotal': total_records,
-        'recordsFiltered': total_records,
+        'recordsTotal': records_total,
+        'recordsFiltered': records_filtered,
+        'next_cursor': next_cursor,
         'data': data
     }
 
@@ -410,238 +366,204 @@ def ajx_transact_detail_list(request):
 
 @login_required
 def ajx_export_transact_detail_list(request):
+    # only the sorting applies to the full export, the same way the page requested it
+    if get_export_format(request.GET) is None:
+        return JsonResponse({'status': 'error', 'message': "EV40: Unknown export format."})
 
-    # Subquery to get the most recent price adjustment before or on the transaction date
-    latest_price_adjustment = ItemPriceAdjustment.objects.filter(
-        item=OuterRef('item'),
-        date__lte=OuterRef('transact_header__date')
-    ).order_by('-date').values('new_price')[:1]
-
-    transacts = TransactDetail.objects.select_related(
-        'transact_header__creator',
-        'transact_header__company',
-        'transact_header__location',
-        'item'
-    ).annotate(
-        transact_id=F('transact_header__id'),
-        si_no=F('transact_header__si_no'),
-        company_name=F('transact_header__company__name'),
-        date=F('transact_header__date'),
-        creator_name=Concat(F('transact_header__creator__user__first_name'), Value(
-            ' '), F('transact_header__creator__user__last_name')),
-        location_name=F('transact_header__location__name'),
-        num_per_unit=Coalesce(F('item__num_per_unit'), 0),
-        weight=Coalesce(F('item__weight'), Decimal('0.0')),
-        convert_to_kilos=ExpressionWrapper(
-            F('item__num_per_unit') * F('item__weight'),
-            output_field=DecimalField()
-        ),
-        delivered_in_kilos=ExpressionWrapper(
-            F('quantity') * F('item__num_per_unit') * F('item__weight'),
-            output_field=DecimalField()
-        ),
-        price_posted=Coalesce(Subquery(
-            latest_price_adjustment, output_field=DecimalField()), F('item__price'))
-    )
-
-    # Sorting Fix
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_direction = request.GET.get('order[0][dir]', 'asc')
-    order_column = request.GET.get(
-        f'columns[{order_column_index}][data]', 'transact_id')
-
-    column_map = {
-        'transact_id': 'transact_id',
-        'si_no': 'si_no',
-        'company': 'company_name',
-        'date': 'date',
-        'creator': 'creator_name',
-        'location': 'location_name',
-        'item': 'item__name',
-        'num_per_unit': 'num_per_unit',
-        'weight': 'weight',
-        'convert_to_kilos': 'convert_to_kilos',
-        'quantity': 'quantity',
-        'delivered_in_kilos': 'delivered_in_kilos',
-        'price_posted': 'price_posted',
-    }
+    task = export_transact_details_task.delay(
+        dict(request.GET.lists()), filtered=False)
 
-    order_column = column_map.get(order_column, 'transact_id')
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Export Process TaskID {task.id} started. Please wait..."})
 
-    if order_direction == 'desc':
-        transacts = transacts.order_by(F(order_column).desc(nulls_last=True))
-    else:
-        transacts = transacts.order_by(F(order_column).asc(nulls_last=True))
 
-    # Fetch price adjustment history for each item
-    item_ids = {t.item.id for t in transacts}
-    price_histories = {item_id: [] for item_id in item_ids}
+@login_required
+def ajx_export_filtered_transact_detail_list(request):
+    # the worker rebuilds the same filtered queryset from the DataTables parameters
+    if get_export_format(request.GET) is None:
+        return JsonResponse({'status': 'error', 'message': "EV40: Unknown export format."})
 
-    adjustments = ItemPriceAdjustment.objects.filter(
-        item_id__in=item_ids).order_by('date')
-    for adj in adjustments:
-        price_histories[adj.item_id].append((adj.date, adj.new_price))
+    task = export_transact_details_task.delay(
+        dict(request.GET.lists()), filtered=True)
 
-    data = []
-    for t in transacts:
-        # Build remarks column
-        remarks = f"Original Price {t.item.price}."
-        if price_histories[t.item.id]:
-            for date, new_price in price_histories[t.item.id]:
-                remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Export Process TaskID {task.id} started. Please wait..."})
 
-        data.append({
-            'DATE': t.date.strftime('%Y-%m-%d'),
-            'COMPANY': t.company_name,
-            'SI NO': t.si_no,
-            'LOCATION': t.location_name,
-            'CREATED BY': t.creator_name,
-            'ITEM': t.item.name,
-            'UNIT': t.item.unit.name,
-            'PACKS PER UNIT': t.num_per_unit,
-            'WEIGHT': t.weight,
-            'CONVERT TO KILOS': t.convert_to_kilos,
-            'QUANTITY': t.quantity,
-            'DELIVERED IN KILOS': t.delivered_in_kilos,
-            'PRICE POSTED': float(t.price_posted),
-            'REMARKS': remarks
-        })
 
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
+@login_required
+def ajx_import_insert_excel_transacts_celery(request):
+    #
+    if request.method == 'POST':
+        form = TransactExcelUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            file = request.FILES['file']
+            try:
+                upload, started = start_import(
+                    file, 'transacts.INSERT', lambda file_path, task_id: import_transacts_task.apply_async((file_path,), task_id=task_id), request.user)
 
-    # Generate the Excel file
-    filename = f"transact_detail_records_{
-        timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    df.to_excel(os.path.join('media', filename), index=False)
+                return JsonResponse({'status': 'started', 'task_id': upload.task_id, 'duplicate': not started, 'message': f"Import Insert Process TaskID {upload.task_id} started. Please wait..." if started else f"The same file was already uploaded, TaskID {upload.task_id} ({upload.status})."})
+            except FileNotFoundError:
+                return JsonResponse({'status': 'error', 'message': f"EV31: {str(FileNotFoundError)}. Check file or directory location"})
+            except Exception as e:
+                return JsonResponse({'status': 'error', 'message': f"EV30: {type(e)} | {str(e)}"})
 
-    return JsonResponse({'filename': filename, 'status': 'success'})
+    return JsonResponse({'status': 'error', 'message': 'EV03: Invalid request method.'})
 
 
 @login_required
-def ajx_export_filtered_transact_detail_list(request):
+def ajx_print_transacts(request):
+    # minDate, maxDate, company and search[value] pick the transacts, the worker renders and merges them.
+    # without any of them the batch would be every transact in the database
+    if not filter_transact_headers(request.GET).query.where:
+        return JsonResponse({'status': 'error', 'message': "EV44: Filter the transacts to print by date, company or search first."})
 
-    search_value = request.GET.get('search[value]', '')
+    task = print_transacts_task.delay(dict(request.GET.lists()))
 
-    # Subquery to get the most recent price adjustment before or on the transaction date
-    latest_price_adjustment = ItemPriceAdjustment.objects.filter(
-        item=OuterRef('item'),
-        date__lte=OuterRef('transact_header__date')
-    ).order_by('-date').values('new_price')[:1]
-
-    transacts = TransactDetail.objects.select_related(
-        'transact_header__creator',
-        'transact_header__company',
-        'transact_header__location',
-        'item'
-    ).annotate(
-        transact_id=F('transact_header__id'),
-        si_no=F('transact_header__si_no'),
-        company_name=F('transact_header__company__name'),
-        date=F('transact_header__date'),
-        creator_name=Concat(F('transact_header__creator__user__first_name'), Value(
-            ' '), F('transact_header__creator__user__last_name')),
-        location_name=F('transact_header__location__name'),
-        num_per_unit=Coalesce(F('item__num_per_unit'), 0),
-        weight=Coalesce(F('item__weight'), Decimal('0.0')),
-        convert_to_kilos=ExpressionWrapper(
-            F('item__num_per_unit') * F('item__weight'),
-            output_field=DecimalField()
-        ),
-        delivered_in_kilos=ExpressionWrapper(
-            F('quantity') * F('item__num_per_unit') * F('item__weight'),
-            output_field=DecimalField()
-        ),
-        price_posted=Coalesce(Subquery(
-            latest_price_adjustment, output_field=DecimalField()), F('item__price'))
-    )
+    return JsonResponse({'status': 'started', 'task_id': task.id, 'message': f"Print Process TaskID {task.id} started. Please wait..."})
 
-    if search_value:
-        transacts = transacts.filter(
-            Q(transact_header__si_no__icontains=search_value) |
-            Q(transact_header__company__name__icontains=search_value) |
-            Q(transact_header__location__name__icontains=search_value) |
-            Q(item__name__icontains=search_value)
-        ).distinct()
-
-    # date range filter
-    if request.GET.get('minDate'):
-        min_date = request.GET['minDate']
-        transacts = transacts.filter(date__gte=min_date)
 
-    if request.GET.get('maxDate'):
-        max_date = request.GET['maxDate']
-        transacts = transacts.filter(date__lte=max_date)
+@login_required
+def ajx_transact_status_transition(request):
+    """
+    POST status (the target), optional repeatable from_status, and either repeatable id or the transact list filters.
+    Moves every selected header in one UPDATE and reports the affected rows, see transacts.statuses.
+    dry_run=true only reports what would change.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'EV03: Invalid request method.'})
+
+    headers = select_transact_headers(request.POST)
+    if headers is None:
+        return JsonResponse({'status': 'error', 'message': "EV42: Select the transacts by id or by a filter."})
+
+    try:
+        result = transition_transact_status(
+            headers,
+            request.POST.get('status', ''),
+            request.POST.getlist('from_status'),
+            dry_run=request.POST.get('dry_run') == 'true',
+        )
+    except CommandError as e:
+        return JsonResponse({'status': 'error', 'message': f"EV43: {str(e)}"})
 
-    # Sorting Fix
-    order_column_index = int(request.GET.get('order[0][column]', 0))
-    order_direction = request.GET.get('order[0][dir]', 'asc')
-    order_column = request.GET.get(
-        f'columns[{order_column_index}][data]', 'transact_id')
-
-    column_map = {
-        'transact_id': 'transact_id',
-        'si_no': 'si_no',
-        'company': 'company_name',
-        'date': 'date',
-        'creator': 'creator_name',
-        'location': 'location_name',
-        'item': 'item__name',
-        'num_per_unit': 'num_per_unit',
-        'weight': 'weight',
-        'convert_to_kilos': 'convert_to_kilos',
-        'quantity': 'quantity',
-        'delivered_in_kilos': 'delivered_in_kilos',
-        'price_posted': 'price_posted',
-    }
+    logger.info(
+        f"{request.user} moved {result['updated']} transact(s) to {result['to_status']} from {result['updated_from']}{' (dry run)' if result['dry_run'] else ''}")
+
+    return JsonResponse({'status': 'success', 'result': result})
+
+
+ROLLUP_GROUPS = {
+    'company': ('company_id', 'company__name'),
+    'location': ('location_id', 'location__name'),
+    'item': ('item_id', 'item__name'),
+}
+
+
+@login_required
+def ajx_transact_rollup_list(request):
+    """
+    Quantity, kilos and amount of the non CANCELLED transacts from the daily rollup table.
+    period=day|month, group_by=company|location|item (repeatable, all three by default),
+    minDate/maxDate and repeatable company, location, item ids to filter.
+    """
+    rollups = TransactDailyRollup.objects.all()
+
+    if request.GET.get('minDate'):
+        rollups = rollups.filter(date__gte=request.GET['minDate'])
+    if request.GET.get('maxDate'):
+        rollups = rollups.filter(date__lte=request.GET['maxDate'])
 
-    order_column = column_map.get(order_column, 'transact_id')
+    for group, (id_field, name_field) in ROLLUP_GROUPS.items():
+        ids = [i for i in request.GET.getlist(group) if i.isdigit()]
+        if ids:
+            rollups = rollups.filter(**{f'{id_field}__in': ids})
 
-    if order_direction == 'desc':
-        transacts = transacts.order_by(F(order_column).desc(nulls_last=True))
+    period = 'month' if request.GET.get('period') == 'month' else 'day'
+    if period == 'month':
+        rollups = rollups.annotate(period=TruncMonth('date'))
     else:
-        transacts = transacts.order_by(F(order_column).asc(nulls_last=True))
+        rollups = rollups.annotate(period=F('date'))
 
-    # Fetch price adjustment history for each item
-    item_ids = {t.item.id for t in transacts}
-    price_histories = {item_id: [] for item_id in item_ids}
+    groups = [group for group in request.GET.getlist(
+        'group_by') if group in ROLLUP_GROUPS] or list(ROLLUP_GROUPS)
+    group_fields = [field for group in groups for field in ROLLUP_GROUPS[group]]
 
-    adjustments = ItemPriceAdjustment.objects.filter(
-        item_id__in=item_ids).order_by('date')
-    for adj in adjustments:
-        price_histories[adj.item_id].append((adj.date, adj.new_price))
+    rows = rollups.values('period', *group_fields).annotate(
+        line_count_sum=Sum('line_count'),
+        quantity_sum=Sum('quantity'),
+        kilos_sum=Sum('kilos'),
+        amount_sum=Sum('amount'),
+    ).order_by('period', *group_fields)
 
     data = []
-    for t in transacts:
-        # Build remarks column
-        remarks = f"Original Price {t.item.price}."
-        if price_histories[t.item.id]:
-            for date, new_price in price_histories[t.item.id]:
-                remarks += f" Updated on {date.strftime('%b %d %Y')} to {new_price}."
-
-        data.append({
-            'DATE': t.date.strftime('%Y-%m-%d'),
-            'COMPANY': t.company_name,
-            'SI NO': t.si_no,
-            'LOCATION': t.location_name,
-            'CREATED BY': t.creator_name,
-            'ITEM': t.item.name,
-            'UNIT': t.item.unit.name,
-            'PACKS PER UNIT': t.num_per_unit,
-            'WEIGHT': t.weight,
-            'CONVERT TO KILOS': t.convert_to_kilos,
-            'QUANTITY': t.quantity,
-            'DELIVERED IN KILOS': t.delivered_in_kilos,
-            'PRICE POSTED': float(t.price_posted),
-            'REMARKS': remarks
+    for row in rows:
+        record = {
+            'period': row['period'].strftime('%Y-%m' if period == 'month' else '%Y-%m-%d'),
+        }
+        for group in groups:
+            id_field, name_field = ROLLUP_GROUPS[group]
+            record[group] = row[id_field]
+            record[f'{group}_name'] = row[name_field]
+        record.update({
+            'line_count': row['line_count_sum'],
+            'quantity': row['quantity_sum'],
+            'kilos': float(row['kilos_sum']),
+            'amount': float(row['amount_sum']),
         })
+        data.append(record)
+
+    return JsonResponse({'period': period, 'group_by': groups, 'data': data})
+
+
+@login_required
+def ajx_transact_pivot(request):
+    """
+    DataTables source of delivered kilos or quantity with locations or items as rows and one column per day,
+    see transacts.pivots.parse_pivot_params for the parameters. The whole pivot is cached,
+    a request only sorts it and slices out its page of rows.
+    """
+    draw = int(request.GET.get('draw', 1))
+    start = int(request.GET.get('start', 0))
+    length = int(request.GET.get('length', 10))
+    search_value = request.GET.get('search[value]', '')
 
-    # Create a Pandas DataFrame
-    df = pd.DataFrame(data)
+    try:
+        date_from, date_to, rows, value, filters = parse_pivot_params(
+            request.GET)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': f"EV41: {str(e)}"})
 
-    # Generate the Excel file
-    filename = f"filtered_transact_detail_records_{
-        timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    df.to_excel(os.path.join('media', filename), index=False)
+    pivot = get_pivot(date_from, date_to, rows, value, filters)
+    records_total = len(pivot)
 
-    return JsonResponse({'filename': filename, 'status': 'success'})
+    if search_value:
+        pivot = pivot[pivot['name'].str.contains(
+            search_value, case=False, regex=False)]
+
+    # name, total or any of the day columns
+    order_column_index = int(request.GET.get('order[0][column]', 0))
+    order_column = request.GET.get(
+        f'columns[{order_column_index}][data]', 'name')
+    if order_column not in pivot.columns or order_column == 'id':
+        order_column = 'name'
+    pivot = pivot.sort_values(order_column, ascending=request.GET.get(
+        'order[0][dir]') != 'desc', kind='stable')
+
+    page = pivot if length < 0 else pivot.iloc[start:start + length]
+
+    return JsonResponse({
+        'draw': draw,
+        'recordsTotal': records_total,
+        'recordsFiltered': len(pivot),
+        'rows': rows,
+        'value': value,
+        'days': list(pivot.columns[3:]),
+        'data': page.to_dict('records'),
+    })
+
+
+@login_required
+def ajx_tasks_status(request, task_id):
+    # status might be PENDING, STARTED, PROGRESS, SUCCESS, or FAILURE
+    # FAILURE triggers when function called by .delay raise an error, message has the error then
+    # progress has the rows done, estimated total and ETA while an import or export is running,
+    # result the counts of a finished import or the download reference of a finished export
+    return JsonResponse(get_task_status(task_id))
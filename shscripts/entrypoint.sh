@@ -1,8 +1,14 @@
 #!/bin/sh
 
+# Create the database cache table used by CACHES, before migrate so saves made by migrations can reach the cache
+python manage.py createcachetable
+
 # Apply database migrations
 python manage.py migrate --noinput
 
+# Create the monthly transact detail partitions ahead of the current month
+python manage.py create_transact_partitions
+
 # Collect static files
 python manage.py collectstatic --noinput
 